@@ -1,3 +1,10 @@
+import cPickle as pickle
+import math
+import random
+import threading
+import time
+import urllib
+from collections import OrderedDict
 from piecrust.exceptions import ImproperlyConfigured
 try:
     import pylibmc
@@ -5,6 +12,24 @@ except ImportError:
     pylibmc = None
 
 
+# The longest key memcached accepts.
+MAX_KEY_LENGTH = 250
+
+
+def escape_cache_key_bit(bit):
+    """
+    Escapes a piece of a cache key, so it's free of separators (``:`` &
+    ``=``), whitespace & control characters.
+    """
+    if not isinstance(bit, basestring):
+        bit = unicode(bit)
+
+    if isinstance(bit, unicode):
+        bit = bit.encode('utf-8')
+
+    return urllib.quote(bit, safe='')
+
+
 class NoCache(object):
     """
     A simplified, swappable base class for caching.
@@ -23,8 +48,87 @@ class NoCache(object):
         """
         pass
 
+    def delete(self, key):
+        """
+        No-op for deleting values from the cache.
+        """
+        pass
+
+    def get_many(self, keys):
+        """
+        Returns a ``dict`` of the values for the given ``keys``, leaving out
+        those that aren't cached.
+
+        By default, calls ``get`` for each. Backends with a multi-get should
+        override this.
+        """
+        found = {}
+
+        for key in keys:
+            value = self.get(key)
+
+            if value is not None:
+                found[key] = value
+
+        return found
+
+    def set_many(self, mapping, timeout=60):
+        """
+        Stores each of the values in the ``mapping`` (a ``dict`` of
+        ``key -> value``) for ``timeout`` seconds.
+
+        By default, calls ``set`` for each.
+        """
+        for key, value in mapping.iteritems():
+            self.set(key, value, timeout=timeout)
+
+    def delete_many(self, keys):
+        """
+        Deletes the values for the given ``keys``.
+
+        By default, calls ``delete`` for each.
+        """
+        for key in keys:
+            self.delete(key)
+
+    def get_or_set(self, key, default, timeout=60):
+        """
+        Returns the value for ``key``. If it isn't cached, calls ``default``
+        (with no arguments) to produce it & caches the result, unless it's
+        ``None``.
+        """
+        value = self.get(key)
+
+        if value is None:
+            value = default()
+
+            if value is not None:
+                self.set(key, value, timeout=timeout)
+
+        return value
+
+    def incr(self, key, delta=1, timeout=60):
+        """
+        Adds ``delta`` to the integer stored under ``key`` (starting from
+        ``0`` if there isn't one) & returns the new value. The ``timeout`` is
+        only applied when the value is first created, so a counter expires
+        ``timeout`` seconds after its first increment.
+
+        By default, this is a ``get`` followed by a ``set``, so concurrent
+        increments can be lost. Backends that can increment atomically
+        should override this.
+        """
+        value = (self.get(key) or 0) + delta
+        self.set(key, value, timeout=timeout)
+        return value
+
 
 class MemcacheCache(NoCache):
+    """
+    Caches in memcached, via ``pylibmc``.
+
+    A ``timeout`` of ``0`` or ``None`` means the values never expire.
+    """
     def __init__(self, *args, **kwargs):
         if pylibmc is None:
             raise ImproperlyConfigured("The 'pylibmc' package must be installed to use the 'MemcacheCache'.")
@@ -35,4 +139,423 @@ class MemcacheCache(NoCache):
         return self.conn.get(key)
 
     def set(self, key, value, timeout=60):
-        return self.conn.set(key, value)
+        return self.conn.set(key, value, time=timeout or 0)
+
+    def delete(self, key):
+        return self.conn.delete(key)
+
+    def get_many(self, keys):
+        return self.conn.get_multi(keys)
+
+    def set_many(self, mapping, timeout=60):
+        return self.conn.set_multi(mapping, time=timeout or 0)
+
+    def delete_many(self, keys):
+        return self.conn.delete_multi(keys)
+
+    def incr(self, key, delta=1, timeout=60):
+        """
+        Uses memcached's atomic ``incr``, creating the counter with ``add``
+        (which is also atomic) if it isn't there.
+        """
+        try:
+            return self.conn.incr(key, delta)
+        except pylibmc.NotFound:
+            pass
+
+        if self.conn.add(key, delta, time=timeout or 0):
+            return delta
+
+        # Someone else created it in the meantime.
+        return self.conn.incr(key, delta)
+
+
+class LocalCache(NoCache):
+    """
+    A thread-safe, in-process cache, for use on its own (i.e. in tests or
+    single-process deployments) or in front of a shared cache.
+
+    Accepts a number of optional kwargs::
+
+        * ``max_entries`` - the number of values to hold, after which the
+          least recently used ones are evicted. Default is 1000. ``None``
+          means no limit, so nothing is evicted before it expires.
+        * ``max_bytes`` - the total size of the values to hold, after which
+          the least recently used ones are evicted. Default is ``None``
+          (no limit).
+
+    Values expire after the ``timeout`` they're ``set`` with (in seconds).
+    A ``timeout`` of ``0`` or ``None`` means they never do.
+
+    Like a real cache server, values are stored pickled (save for strings,
+    which are immutable), so changes to a fetched value don't leak back
+    into the cache. That's also how their size is worked out.
+
+    Keeps ``hits``/``misses``/``evictions`` counters & the current total
+    size in ``bytes``. See ``stats``.
+    """
+    def __init__(self, max_entries=1000, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        # ``key -> (stored value, is pickled, size, expiry time)``
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        """
+        Returns the value for ``key``, marking it as recently used, or
+        ``None`` if it isn't present (or has expired).
+        """
+        with self._lock:
+            try:
+                entry = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+
+            if entry[3] is not None and entry[3] <= time.time():
+                self.bytes -= entry[2]
+                self.misses += 1
+                return None
+
+            self._data[key] = entry
+            self.hits += 1
+
+        if entry[1]:
+            return pickle.loads(entry[0])
+
+        return entry[0]
+
+    def set(self, key, value, timeout=60):
+        """
+        Stores ``value`` under ``key`` for ``timeout`` seconds, evicting the
+        least recently used values if there's no room.
+
+        Values bigger than ``max_bytes`` aren't stored.
+        """
+        if isinstance(value, str):
+            stored, pickled = value, False
+        else:
+            stored, pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL), True
+
+        size = len(stored)
+
+        if timeout:
+            expires = time.time() + timeout
+        else:
+            expires = None
+
+        with self._lock:
+            old_entry = self._data.pop(key, None)
+
+            if old_entry is not None:
+                self.bytes -= old_entry[2]
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._data[key] = (stored, pickled, size, expires)
+            self.bytes += size
+            self._evict()
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+
+            if entry is not None:
+                self.bytes -= entry[2]
+
+    def incr(self, key, delta=1, timeout=60):
+        """
+        Increments atomically (under the cache's lock), keeping the
+        counter's original expiry time.
+        """
+        with self._lock:
+            entry = self._data.pop(key, None)
+
+            if entry is not None:
+                self.bytes -= entry[2]
+
+                if entry[3] is not None and entry[3] <= time.time():
+                    entry = None
+
+            if entry is None:
+                value, expires = 0, None
+
+                if timeout:
+                    expires = time.time() + timeout
+            elif entry[1]:
+                value, expires = pickle.loads(entry[0]), entry[3]
+            else:
+                value, expires = int(entry[0]), entry[3]
+
+            value += delta
+            stored = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+            self._data[key] = (stored, True, len(stored), expires)
+            self.bytes += len(stored)
+            self._evict()
+
+        return value
+
+    def _evict(self):
+        """
+        Drops expired values from the least recently used end, then evicts
+        the least recently used values until the cache is within its limits.
+        Must be called with the lock held.
+        """
+        now = time.time()
+
+        while self._data:
+            oldest_key = next(iter(self._data))
+            expires = self._data[oldest_key][3]
+
+            if expires is None or expires > now:
+                break
+
+            self.bytes -= self._data.pop(oldest_key)[2]
+
+        while (self.max_entries is not None and len(self._data) > self.max_entries) or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            evicted_key, evicted_entry = self._data.popitem(last=False)
+            self.bytes -= evicted_entry[2]
+            self.evictions += 1
+
+    def clear(self):
+        """
+        Empties the cache & resets the counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.bytes = 0
+
+    def stats(self):
+        """
+        Returns a ``dict`` of the counters, as well as the current number of
+        ``entries``.
+        """
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self.bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class CachedValue(object):
+    """
+    A value stored by ``TieredCache.get_or_set``, along with when it
+    expires & how long it took to produce (both in seconds), for deciding
+    when to refresh it early.
+    """
+    def __init__(self, value, expires, delta):
+        self.value = value
+        self.expires = expires
+        self.delta = delta
+
+
+class Flight(object):
+    """
+    A ``default`` call in progress in ``TieredCache.get_or_set``, which
+    other threads after the same key wait on.
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TieredCache(NoCache):
+    """
+    Puts a local, in-process cache in front of another (shared) cache.
+
+    Reads are served from the ``local`` cache where possible, falling back
+    to the ``backend``. Writes go to both. As other processes can't
+    invalidate the local copies, they're only kept for ``local_timeout``
+    seconds.
+
+    ``get_or_set`` also protects against stampedes on expiring keys:
+
+        * Concurrent misses on the same key (within the process) are
+          coalesced into a single ``default`` call, which the other threads
+          wait on & share the result of.
+        * Values are refreshed early, before they expire, with a probability
+          that grows as expiry nears & with how long the value took to
+          produce (scaled by ``beta``). So one request usually refreshes a
+          hot key while everyone else still gets the cached value.
+
+    Accepts a number of optional kwargs::
+
+        * ``local`` - the local cache. Default is a ``LocalCache``.
+        * ``local_timeout`` - the longest time (in seconds) to hold values
+          in the local cache. Default is 5 seconds.
+        * ``beta`` - how eagerly to refresh early. ``0`` disables it.
+          Default is 1.0.
+    """
+    def __init__(self, backend, local=None, local_timeout=5, beta=1.0):
+        if local is None:
+            local = LocalCache()
+
+        self.backend = backend
+        self.local = local
+        self.local_timeout = local_timeout
+        self.beta = beta
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.get_entry(key)
+
+        if isinstance(value, CachedValue):
+            return value.value
+
+        return value
+
+    def get_entry(self, key):
+        """
+        Returns what's stored under ``key`` (which may be a ``CachedValue``),
+        from the local cache if possible.
+        """
+        value = self.local.get(key)
+
+        if value is None:
+            value = self.backend.get(key)
+
+            if value is not None:
+                self.local.set(key, value, timeout=self.local_timeout)
+
+        return value
+
+    def set(self, key, value, timeout=60):
+        self.backend.set(key, value, timeout=timeout)
+
+        self.local.set(key, value, timeout=self.get_local_timeout(timeout))
+
+    def get_local_timeout(self, timeout):
+        """
+        Caps a ``timeout`` at the ``local_timeout``.
+        """
+        if timeout:
+            return min(timeout, self.local_timeout)
+
+        return self.local_timeout
+
+    def delete(self, key):
+        self.backend.delete(key)
+        self.local.delete(key)
+
+    def get_many(self, keys):
+        found = self.local.get_many(keys)
+        missing = [key for key in keys if key not in found]
+
+        if missing:
+            fetched = self.backend.get_many(missing)
+
+            if fetched:
+                self.local.set_many(fetched, timeout=self.local_timeout)
+                found.update(fetched)
+
+        for key, value in found.iteritems():
+            if isinstance(value, CachedValue):
+                found[key] = value.value
+
+        return found
+
+    def set_many(self, mapping, timeout=60):
+        self.backend.set_many(mapping, timeout=timeout)
+
+        self.local.set_many(mapping, timeout=self.get_local_timeout(timeout))
+
+    def delete_many(self, keys):
+        self.backend.delete_many(keys)
+        self.local.delete_many(keys)
+
+    def incr(self, key, delta=1, timeout=60):
+        """
+        Increments in the ``backend`` only, dropping any local copy, as
+        counters are shared between processes.
+        """
+        self.local.delete(key)
+        return self.backend.incr(key, delta=delta, timeout=timeout)
+
+    def get_or_set(self, key, default, timeout=60):
+        entry = self.get_entry(key)
+
+        if entry is None:
+            return self.call_once(key, default, timeout)
+
+        if not isinstance(entry, CachedValue):
+            return entry
+
+        if self.should_refresh(entry):
+            # Refresh it now, unless another thread already is.
+            return self.call_once(key, default, timeout, stale=entry)
+
+        return entry.value
+
+    def should_refresh(self, entry):
+        """
+        Decides whether to refresh a ``CachedValue`` ahead of its expiry.
+        """
+        if entry.expires is None or not self.beta:
+            return False
+
+        # ``1.0 - random()`` is in ``(0, 1]``, so its log is ``<= 0``.
+        return time.time() - entry.delta * self.beta * math.log(1.0 - random.random()) >= entry.expires
+
+    def call_once(self, key, default, timeout, stale=None):
+        """
+        Calls ``default`` & caches the result, unless there's already a call
+        for ``key`` in progress. In that case, returns the ``stale`` entry's
+        value if there is one, otherwise waits on the call's result.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if not leader:
+            if stale is not None:
+                return stale.value
+
+            flight.done.wait()
+
+            if flight.error is not None:
+                raise flight.error
+
+            return flight.value
+
+        try:
+            start = time.time()
+            value = default()
+
+            if value is not None:
+                if timeout:
+                    expires = time.time() + timeout
+                else:
+                    expires = None
+
+                self.set(key, CachedValue(value, expires, time.time() - start), timeout=timeout)
+
+            flight.value = value
+            return value
+        except Exception, e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+            flight.done.set()
@@ -0,0 +1,182 @@
+import zlib
+from piecrust.exceptions import ImproperlyConfigured
+from piecrust.utils.lru import LRUCache
+
+
+class NoCompression(object):
+    """
+    A simplified, swappable base class for compressing responses.
+
+    Does nothing save for simulating the compression API.
+    """
+    # The content-encodings on offer.
+    encodings = ()
+
+    def negotiate(self, request):
+        """
+        Returns the content-encoding to use for the response to ``request``,
+        or ``None`` to leave it uncompressed.
+
+        Always returns ``None``.
+        """
+        return None
+
+    def should_compress(self, content):
+        """
+        Returns whether or not the (already serialized) ``content`` is worth
+        compressing.
+
+        Always returns ``False``.
+        """
+        return False
+
+    def compress(self, content, encoding):
+        """
+        Compresses the ``content`` string with the given ``encoding``.
+
+        Returns the ``content`` untouched.
+        """
+        return content
+
+    def compress_iter(self, chunks, encoding):
+        """
+        Compresses an iterable of string chunks (i.e. the ``content`` of a
+        streaming response) with the given ``encoding``, yielding the
+        compressed chunks.
+
+        Yields the ``chunks`` untouched.
+        """
+        return chunks
+
+
+class Compression(NoCompression):
+    """
+    Compresses responses with the standard library's ``zlib``, in whichever
+    of the ``encodings`` the client prefers (per its ``Accept-Encoding``
+    header).
+
+    Accepts a number of optional kwargs::
+
+        * ``encodings`` - the content-encodings to offer, in order of
+          preference. Either/both of ``gzip`` & ``deflate``. Default is
+          ``('gzip', 'deflate')``.
+        * ``min_length`` - the size (in bytes) under which responses are
+          left uncompressed, as the savings don't pay for the CPU (or the
+          gzip header). Default is 1024 bytes.
+        * ``level`` - the ``zlib`` compression level, from 1 (fastest) to
+          9 (smallest). Default is 6.
+    """
+    def __init__(self, encodings=('gzip', 'deflate'), min_length=1024, level=6):
+        for encoding in encodings:
+            if not encoding in ('gzip', 'deflate'):
+                raise ImproperlyConfigured("Unsupported content-encoding '%s'. Choose from: gzip, deflate." % encoding)
+
+        self.encodings = tuple(encodings)
+        self.min_length = min_length
+        self.level = level
+        # Clients send the same few ``Accept-Encoding`` headers over & over.
+        self.negotiated = LRUCache(max_size=64)
+
+    def negotiate(self, request):
+        """
+        Picks the content-encoding with the highest quality value in the
+        request's ``Accept-Encoding`` header, preferring earlier
+        ``encodings`` on a tie.
+
+        Returns ``None`` if the client doesn't accept any of them.
+        """
+        header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+
+        if not header:
+            return None
+
+        # ``False``, rather than ``None``, marks a cached miss.
+        encoding = self.negotiated.get(header)
+
+        if encoding is None:
+            encoding = self.choose_encoding(parse_accept_encoding(header)) or False
+            self.negotiated.set(header, encoding)
+
+        return encoding or None
+
+    def choose_encoding(self, accepted):
+        best, best_quality = None, 0
+
+        for encoding in self.encodings:
+            quality = accepted.get(encoding, accepted.get('*', 0))
+
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+
+        return best
+
+    def should_compress(self, content):
+        return len(content) >= self.min_length
+
+    def get_compressor(self, encoding):
+        """
+        Returns a ``zlib`` compression object producing the given
+        ``encoding``.
+
+        ``gzip`` gets a gzip header & trailer, while ``deflate`` is the
+        zlib format (as HTTP's ``deflate`` is defined), not raw deflate.
+        """
+        if encoding == 'gzip':
+            return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+        return zlib.compressobj(self.level)
+
+    def compress(self, content, encoding):
+        if isinstance(content, unicode):
+            content = content.encode('utf-8')
+
+        compressor = self.get_compressor(encoding)
+        return compressor.compress(content) + compressor.flush()
+
+    def compress_iter(self, chunks, encoding):
+        """
+        Since the size of a stream isn't known up front, streams are
+        compressed regardless of ``min_length``.
+        """
+        compressor = self.get_compressor(encoding)
+
+        for chunk in chunks:
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode('utf-8')
+
+            compressed = compressor.compress(chunk)
+
+            if compressed:
+                yield compressed
+
+        yield compressor.flush()
+
+
+def parse_accept_encoding(header):
+    """
+    Parses an ``Accept-Encoding`` header into a ``dict`` of
+    ``content-encoding -> quality value``.
+    """
+    accepted = {}
+
+    for part in header.split(','):
+        bits = part.strip().split(';')
+        encoding = bits[0].strip().lower()
+
+        if not encoding:
+            continue
+
+        quality = 1.0
+
+        for param in bits[1:]:
+            name, _, value = param.partition('=')
+
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+
+        accepted[encoding] = quality
+
+    return accepted
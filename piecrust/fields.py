@@ -1,8 +1,11 @@
 import datetime
 from dateutil.parser import parse
 from decimal import Decimal
+from operator import attrgetter
 import re
+import threading
 from piecrust.bundle import Bundle
+from piecrust.constants import LOOKUP_SEP
 from piecrust.exceptions import ApiFieldError, NotFound
 from piecrust.utils import dict_strip_unicode_keys
 try:
@@ -26,12 +29,136 @@ DATE_REGEX = re.compile('^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2}).*?$')
 DATETIME_REGEX = re.compile('^(?P<year>\d{4})-(?P<month>\d{2})-(?P<day>\d{2})(T|\s+)(?P<hour>\d{2}):(?P<minute>\d{2}):(?P<second>\d{2}).*?$')
 
 
+# Attribute accessors.
+
+class AttributeAccessor(object):
+    """
+    Pulls an attribute (or a ``__``-separated path through relations, like
+    ``author__name``) off of ``bundle.obj``.
+
+    The path is split once & compiled into an ``operator.attrgetter`` that
+    reaches through the bundle itself (``attrgetter('obj.author.name')``),
+    so each lookup is a single call. ``get`` raises ``AttributeError`` if
+    any step along the way is missing or ``None``.
+    """
+    def __init__(self, attribute):
+        self.attribute = attribute
+        self.path = tuple(attribute.split(LOOKUP_SEP))
+        self.get = attrgetter('.'.join(('obj',) + self.path))
+
+    def __deepcopy__(self, memo):
+        # Accessors never change once built, so copies of a field can share
+        # them (``attrgetter`` can't be copied anyhow).
+        return self
+
+    def find_empty(self, bundle):
+        """
+        Walks the path one step at a time & returns the object and the
+        attribute name where the lookup came up empty.
+
+        Only used to build error messages, so it needn't be fast.
+        """
+        current_object = bundle.obj
+
+        for attr in self.path:
+            previous_object = current_object
+            current_object = getattr(current_object, attr, None)
+
+            if current_object is None:
+                return previous_object, attr
+
+        return current_object, None
+
+
+class CallableAccessor(object):
+    """
+    Calls the provided ``attribute`` with the bundle to get the data.
+    """
+    def __init__(self, attribute):
+        self.attribute = attribute
+        self.path = ()
+        self.get = attribute
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def find_empty(self, bundle):
+        return bundle.obj, getattr(self.attribute, '__name__', repr(self.attribute))
+
+
+def overrides(field, method_name, klass):
+    """
+    Returns whether the ``field``'s class has its own ``method_name``,
+    rather than the one provided by ``klass``.
+
+    Used to fall back to the per-object methods when a subclass customizes
+    them, so the batch versions never skip user code.
+    """
+    return getattr(type(field), method_name) != getattr(klass, method_name)
+
+
+def build_accessor(attribute):
+    """
+    Returns the right accessor for the provided ``attribute``, which may be
+    an attribute name, a ``__``-separated path or a callable.
+    """
+    if callable(attribute):
+        return CallableAccessor(attribute)
+
+    return AttributeAccessor(attribute)
+
+
+# Related resources.
+
+class RelatedResourcePool(object):
+    """
+    Hands out shared instances of related ``Resource`` classes, keyed on the
+    class & the ``api_name``.
+
+    Since ``Resource`` instances hold no per-object state, one instance can
+    dehydrate every related object (from any thread), rather than
+    instantiating a fresh one per related object.
+    """
+    def __init__(self):
+        self._resources = {}
+        self._lock = threading.Lock()
+
+    def get(self, resource_class, api_name=None):
+        """
+        Returns the shared instance of ``resource_class`` for the
+        ``api_name``, creating it if needed.
+        """
+        key = (resource_class, api_name)
+        resource = self._resources.get(key)
+
+        if resource is None:
+            with self._lock:
+                resource = self._resources.get(key)
+
+                if resource is None:
+                    resource = self._resources[key] = resource_class()
+
+        return resource
+
+    def clear(self):
+        """
+        Discards all the pooled instances.
+        """
+        with self._lock:
+            self._resources = {}
+
+
+related_resources = RelatedResourcePool()
+
+
 # All the ApiField variants.
 
 class ApiField(object):
     """The base implementation of a field used by the resources."""
     dehydrated_type = 'string'
     help_text = ''
+    # The compiled accessor for ``attribute`` (see ``get_accessor``).
+    _accessor = None
 
     def __init__(self, attribute=None, default=NOT_PROVIDED, null=False, blank=False, readonly=False, unique=False, help_text=None):
         """
@@ -83,6 +210,9 @@ class ApiField(object):
         self.instance_name = name
         self._resource = cls
 
+        if self.attribute is not None:
+            self.get_accessor()
+
     def has_default(self):
         """Returns a boolean of whether this field has a default value."""
         return self._default is not NOT_PROVIDED
@@ -95,33 +225,39 @@ class ApiField(object):
 
         return self._default
 
+    def get_accessor(self):
+        """
+        Returns the compiled accessor used to pull ``attribute`` off of the
+        object.
+
+        Built once (usually in ``contribute_to_class``) & rebuilt only if
+        ``attribute`` changes.
+        """
+        accessor = self._accessor
+
+        if accessor is None or accessor.attribute is not self.attribute:
+            accessor = self._accessor = build_accessor(self.attribute)
+
+        return accessor
+
     def dehydrate(self, bundle):
         """
         Takes data from the provided object and prepares it for the
         resource.
         """
         if self.attribute is not None:
-            # Check for `__` in the field for looking through the relation.
-            attrs = self.attribute.split('__')
-            current_object = bundle.obj
-
-            for attr in attrs:
-                previous_object = current_object
-                current_object = getattr(current_object, attr, None)
-
-                if current_object is None:
-                    if self.has_default():
-                        current_object = self._default
-                        # Fall out of the loop, given any further attempts at
-                        # accesses will fail miserably.
-                        break
-                    elif self.null:
-                        current_object = None
-                        # Fall out of the loop, given any further attempts at
-                        # accesses will fail miserably.
-                        break
-                    else:
-                        raise ApiFieldError("The object '%r' has an empty attribute '%s' and doesn't allow a default or null value." % (previous_object, attr))
+            accessor = self._accessor
+
+            if accessor is None or accessor.attribute is not self.attribute:
+                accessor = self.get_accessor()
+
+            try:
+                current_object = accessor.get(bundle)
+            except AttributeError:
+                current_object = None
+
+            if current_object is None:
+                current_object = self.empty_value(bundle, accessor)
 
             if callable(current_object):
                 current_object = current_object()
@@ -133,6 +269,55 @@ class ApiField(object):
         else:
             return None
 
+    def empty_value(self, bundle, accessor):
+        """
+        Handles an object that had no data for the ``attribute``.
+
+        Returns the default (or ``None`` if the field is nullable), otherwise
+        raises an ``ApiFieldError``.
+        """
+        if self.has_default():
+            return self._default
+
+        if self.null:
+            return None
+
+        previous_object, attr = accessor.find_empty(bundle)
+        raise ApiFieldError("The object '%r' has an empty attribute '%s' and doesn't allow a default or null value." % (previous_object, attr))
+
+    def dehydrate_many(self, bundles):
+        """
+        Dehydrates the field for a list of bundles at once, returning a list
+        of values in the same order.
+
+        Pulls the raw data off of every object first, then hands the whole
+        column to ``convert_many``. Fields that override ``dehydrate`` are
+        called once per bundle instead.
+        """
+        if self.attribute is None or overrides(self, 'dehydrate', ApiField):
+            dehydrate = self.dehydrate
+            return [dehydrate(bundle) for bundle in bundles]
+
+        accessor = self.get_accessor()
+        get = accessor.get
+        values = []
+
+        for bundle in bundles:
+            try:
+                value = get(bundle)
+            except AttributeError:
+                value = None
+
+            if value is None:
+                value = self.empty_value(bundle, accessor)
+
+            if callable(value):
+                value = value()
+
+            values.append(value)
+
+        return self.convert_many(values)
+
     def convert(self, value):
         """
         Handles conversion between the data found and the type of the field.
@@ -142,6 +327,15 @@ class ApiField(object):
         """
         return value
 
+    def convert_many(self, values):
+        """
+        Converts a whole column of values (see ``dehydrate_many``).
+
+        Extending classes may override this to convert the column in one go.
+        """
+        convert = self.convert
+        return [convert(value) for value in values]
+
     def hydrate(self, bundle):
         """
         Takes data stored in the bundle for the field and returns it. Used for
@@ -191,6 +385,12 @@ class CharField(ApiField):
 
         return unicode(value)
 
+    def convert_many(self, values):
+        if overrides(self, 'convert', CharField):
+            return super(CharField, self).convert_many(values)
+
+        return [None if value is None else unicode(value) for value in values]
+
 
 class FileField(ApiField):
     """
@@ -229,6 +429,12 @@ class IntegerField(ApiField):
 
         return int(value)
 
+    def convert_many(self, values):
+        if overrides(self, 'convert', IntegerField):
+            return super(IntegerField, self).convert_many(values)
+
+        return [None if value is None else int(value) for value in values]
+
 
 class FloatField(ApiField):
     """
@@ -243,6 +449,12 @@ class FloatField(ApiField):
 
         return float(value)
 
+    def convert_many(self, values):
+        if overrides(self, 'convert', FloatField):
+            return super(FloatField, self).convert_many(values)
+
+        return [None if value is None else float(value) for value in values]
+
 
 class DecimalField(ApiField):
     """
@@ -257,6 +469,12 @@ class DecimalField(ApiField):
 
         return Decimal(value)
 
+    def convert_many(self, values):
+        if overrides(self, 'convert', DecimalField):
+            return super(DecimalField, self).convert_many(values)
+
+        return [None if value is None else Decimal(value) for value in values]
+
 
 class BooleanField(ApiField):
     """
@@ -273,6 +491,12 @@ class BooleanField(ApiField):
 
         return bool(value)
 
+    def convert_many(self, values):
+        if overrides(self, 'convert', BooleanField):
+            return super(BooleanField, self).convert_many(values)
+
+        return [None if value is None else bool(value) for value in values]
+
 
 class ListField(ApiField):
     """
@@ -394,9 +618,12 @@ class RelatedField(ApiField):
     dehydrated_type = 'related'
     is_related = True
     self_referential = False
+    # Where related ``Resource`` instances come from. Swap for a
+    # per-API/per-request ``RelatedResourcePool`` if needed.
+    resource_pool = related_resources
     help_text = 'A related resource. Can be either a URI or set of nested resource data.'
 
-    def __init__(self, to, attribute, related_name=None, default=NOT_PROVIDED, null=False, blank=False, readonly=False, full=False, unique=False, help_text=None):
+    def __init__(self, to, attribute, related_name=None, default=NOT_PROVIDED, null=False, blank=False, readonly=False, full=False, unique=False, help_text=None, prefetch_attribute=None):
         """
         Builds the field and prepares it to access to related data.
 
@@ -431,6 +658,11 @@ class RelatedField(ApiField):
         Optionally accepts ``help_text``, which lets you provide a
         human-readable description of the field exposed at the schema level.
         Defaults to the per-Field definition.
+
+        Optionally accepts a ``prefetch_attribute``, which enables fetching
+        the related objects for a whole list of objects at once (see
+        ``prefetch``). What it names differs between ``ToOneField`` &
+        ``ToManyField``. Defaults to ``None`` (no prefetching).
         """
         self.instance_name = None
         self._resource = None
@@ -442,9 +674,10 @@ class RelatedField(ApiField):
         self.blank = blank
         self.readonly = readonly
         self.full = full
-        self.api_name = None
-        self.resource_name = None
+        self._api_name = None
+        self._resource_name = None
         self.unique = unique
+        self.prefetch_attribute = prefetch_attribute
         self._to_class = None
 
         if self.to == 'self':
@@ -454,6 +687,39 @@ class RelatedField(ApiField):
         if help_text:
             self.help_text = help_text
 
+    @property
+    def api_name(self):
+        """
+        The ``api_name`` of the ``Resource`` this field is attached to.
+
+        Read through from the resource's ``Meta`` (so the field never needs
+        updating per-request) unless explicitly assigned.
+        """
+        if self._api_name is None and self._resource is not None:
+            return self._resource._meta.api_name
+
+        return self._api_name
+
+    @api_name.setter
+    def api_name(self, value):
+        self._api_name = value
+
+    @property
+    def resource_name(self):
+        """
+        The ``resource_name`` of the ``Resource`` this field is attached to.
+
+        Read through from the resource's ``Meta`` unless explicitly assigned.
+        """
+        if self._resource_name is None and self._resource is not None:
+            return self._resource._meta.resource_name
+
+        return self._resource_name
+
+    @resource_name.setter
+    def resource_name(self, value):
+        self._resource_name = value
+
     def contribute_to_class(self, cls, name):
         super(RelatedField, self).contribute_to_class(cls, name)
 
@@ -463,19 +729,25 @@ class RelatedField(ApiField):
         if self.self_referential or self.to == 'self':
             self._to_class = cls
 
-    def get_related_resource(self, related_instance):
+    def get_related_resource(self, related_instance=None):
         """
-        Instaniates the related resource.
+        Returns the related resource, shared via the ``resource_pool``.
+
+        The resource holds no per-object state. The ``related_instance`` is
+        accepted for backward-compatibility but should be passed along
+        explicitly (in a ``Bundle``) instead.
         """
-        related_resource = self.to_class()
+        api_name = None
+
+        if self._resource is not None:
+            api_name = self._resource._meta.api_name
+
+        related_resource = self.resource_pool.get(self.to_class, api_name)
 
         # Fix the ``api_name`` if it's not present.
-        if related_resource._meta.api_name is None:
-            if self._resource and not self._resource._meta.api_name is None:
-                related_resource._meta.api_name = self._resource._meta.api_name
+        if related_resource._meta.api_name is None and api_name is not None:
+            related_resource._meta.api_name = api_name
 
-        # Try to be efficient about DB queries.
-        related_resource.instance = related_instance
         return related_resource
 
     @property
@@ -508,6 +780,28 @@ class RelatedField(ApiField):
 
         return self._to_class
 
+    def get_related_storage(self):
+        """
+        Returns the storage of the related resource, used by ``prefetch``.
+        """
+        return self.get_related_resource()._meta.storage
+
+    def prefetch(self, bundles):
+        """
+        The bulk loader for the related data.
+
+        Given all the bundles about to be dehydrated, fetches all of their
+        related objects with a single call to the related resource's storage
+        & returns them in a ``dict``, which ``dehydrate_many`` then serves
+        them from (rather than one lookup per object).
+
+        Returns ``None`` if the field shouldn't (or can't) prefetch, in
+        which case each bundle is dehydrated on its own. By default, only
+        fields with a ``prefetch_attribute`` prefetch. Override this to
+        provide a custom loader.
+        """
+        return None
+
     def dehydrate_related(self, bundle, related_resource):
         """
         Based on the ``full_resource``, returns either the endpoint or the data
@@ -518,7 +812,7 @@ class RelatedField(ApiField):
             return related_resource.get_resource_uri(bundle)
         else:
             # ZOMG extra data and big payloads.
-            bundle = related_resource.build_bundle(obj=related_resource.instance, request=bundle.request)
+            bundle = related_resource.build_bundle(obj=bundle.obj, request=bundle.request)
             return related_resource.full_dehydrate(bundle)
 
     def resource_from_uri(self, fk_resource, uri, request=None, related_obj=None, related_name=None):
@@ -585,7 +879,7 @@ class RelatedField(ApiField):
         Accepts either a URI, a data dictionary (or dictionary-like structure)
         or an object with a ``pk``.
         """
-        self.fk_resource = self.to_class()
+        fk_resource = self.get_related_resource()
         kwargs = {
             'request': request,
             'related_obj': related_obj,
@@ -594,15 +888,15 @@ class RelatedField(ApiField):
 
         if isinstance(value, basestring):
             # We got a URI. Load the object and assign it.
-            return self.resource_from_uri(self.fk_resource, value, **kwargs)
+            return self.resource_from_uri(fk_resource, value, **kwargs)
         elif hasattr(value, 'items'):
             # We've got a data dictionary.
             # Since this leads to creation, this is the only one of these
             # methods that might care about "parent" data.
-            return self.resource_from_data(self.fk_resource, value, **kwargs)
+            return self.resource_from_data(fk_resource, value, **kwargs)
         elif hasattr(value, 'pk'):
             # We've got an object with a primary key.
-            return self.resource_from_pk(self.fk_resource, value, **kwargs)
+            return self.resource_from_pk(fk_resource, value, **kwargs)
         else:
             raise ApiFieldError("The '%s' field has was given data that was not a URI, not a dictionary-alike and does not have a 'pk' attribute: %s." % (self.instance_name, value))
 
@@ -617,13 +911,18 @@ class ToOneField(RelatedField):
 
     def __init__(self, to, attribute, related_name=None, default=NOT_PROVIDED,
                  null=False, blank=False, readonly=False, full=False,
-                 unique=False, help_text=None):
+                 unique=False, help_text=None, prefetch_attribute=None):
+        """
+        For a ``ToOneField``, the ``prefetch_attribute`` should name the
+        attribute on the object holding the primary key of the related
+        object (i.e. ``author_id``).
+        """
         super(ToOneField, self).__init__(
             to, attribute, related_name=related_name, default=default,
             null=null, blank=blank, readonly=readonly, full=full,
-            unique=unique, help_text=help_text
+            unique=unique, help_text=help_text,
+            prefetch_attribute=prefetch_attribute
         )
-        self.fk_resource = None
 
     def dehydrate(self, bundle):
         try:
@@ -631,15 +930,52 @@ class ToOneField(RelatedField):
         except:
             foreign_obj = None
 
+        return self.dehydrate_foreign(bundle, foreign_obj, self.get_related_resource())
+
+    def dehydrate_foreign(self, bundle, foreign_obj, fk_resource):
+        """
+        Dehydrates the already-fetched ``foreign_obj`` for the ``bundle``.
+        """
         if not foreign_obj:
             if not self.null:
                 raise ApiFieldError("The model '%r' has an empty attribute '%s' and doesn't allow a null value." % (bundle.obj, self.attribute))
 
             return None
 
-        self.fk_resource = self.get_related_resource(foreign_obj)
         fk_bundle = Bundle(obj=foreign_obj, request=bundle.request)
-        return self.dehydrate_related(fk_bundle, self.fk_resource)
+        return self.dehydrate_related(fk_bundle, fk_resource)
+
+    def prefetch(self, bundles):
+        """
+        Fetches all the related objects via ``storage.list(pk__in=...)``,
+        returning them keyed by their primary key.
+        """
+        if self.prefetch_attribute is None:
+            return None
+
+        pks = set()
+
+        for bundle in bundles:
+            pk = getattr(bundle.obj, self.prefetch_attribute, None)
+
+            if pk is not None:
+                pks.add(pk)
+
+        if not pks:
+            return {}
+
+        related_objs = self.get_related_storage().list(pk__in=list(pks))
+        return dict((related_obj.pk, related_obj) for related_obj in related_objs)
+
+    def dehydrate_many(self, bundles):
+        prefetched = self.prefetch(bundles)
+
+        if prefetched is None:
+            return super(ToOneField, self).dehydrate_many(bundles)
+
+        fk_resource = self.get_related_resource()
+        prefetch_attribute = self.prefetch_attribute
+        return [self.dehydrate_foreign(bundle, prefetched.get(getattr(bundle.obj, prefetch_attribute, None)), fk_resource) for bundle in bundles]
 
     def hydrate(self, bundle):
         value = super(ToOneField, self).hydrate(bundle)
@@ -678,13 +1014,18 @@ class ToManyField(RelatedField):
 
     def __init__(self, to, attribute, related_name=None, default=NOT_PROVIDED,
                  null=False, blank=False, readonly=False, full=False,
-                 unique=False, help_text=None):
+                 unique=False, help_text=None, prefetch_attribute=None):
+        """
+        For a ``ToManyField``, the ``prefetch_attribute`` should name the
+        attribute on the *related* objects holding the primary key of the
+        object they belong to (i.e. ``note_id`` on a comment).
+        """
         super(ToManyField, self).__init__(
             to, attribute, related_name=related_name, default=default,
             null=null, blank=blank, readonly=readonly, full=full,
-            unique=unique, help_text=help_text
+            unique=unique, help_text=help_text,
+            prefetch_attribute=prefetch_attribute
         )
-        self.m2m_bundles = []
 
     def dehydrate(self, bundle):
         if not bundle.obj or not bundle.obj.pk:
@@ -706,19 +1047,70 @@ class ToManyField(RelatedField):
 
             return []
 
-        self.m2m_resources = []
-        m2m_dehydrated = []
-
         # TODO: Also model-specific and leaky. Relies on there being a
         #       ``Manager`` there.
-        for m2m in the_m2ms.all():
-            m2m_resource = self.get_related_resource(m2m)
+        return self.dehydrate_m2ms(bundle, the_m2ms.all(), self.get_related_resource())
+
+    def dehydrate_m2ms(self, bundle, m2ms, m2m_resource):
+        """
+        Dehydrates the already-fetched related objects for the ``bundle``.
+        """
+        m2m_dehydrated = []
+
+        for m2m in m2ms:
             m2m_bundle = Bundle(obj=m2m, request=bundle.request)
-            self.m2m_resources.append(m2m_resource)
             m2m_dehydrated.append(self.dehydrate_related(m2m_bundle, m2m_resource))
 
         return m2m_dehydrated
 
+    def prefetch(self, bundles):
+        """
+        Fetches all the related objects via
+        ``storage.list(<prefetch_attribute>__in=...)``, returning lists of
+        them keyed by the primary key of the object they belong to.
+        """
+        if self.prefetch_attribute is None:
+            return None
+
+        prefetched = {}
+
+        for bundle in bundles:
+            if bundle.obj and bundle.obj.pk:
+                prefetched[bundle.obj.pk] = []
+
+        if not prefetched:
+            return prefetched
+
+        lookup = {
+            '%s__in' % self.prefetch_attribute: list(prefetched.keys()),
+        }
+
+        for related_obj in self.get_related_storage().list(**lookup):
+            prefetched.setdefault(getattr(related_obj, self.prefetch_attribute), []).append(related_obj)
+
+        return prefetched
+
+    def dehydrate_many(self, bundles):
+        prefetched = self.prefetch(bundles)
+
+        if prefetched is None:
+            return super(ToManyField, self).dehydrate_many(bundles)
+
+        m2m_resource = self.get_related_resource()
+        dehydrated = []
+
+        for bundle in bundles:
+            if not bundle.obj or not bundle.obj.pk:
+                if not self.null:
+                    raise ApiFieldError("The model '%r' does not have a primary key and can not be used in a ToMany context." % bundle.obj)
+
+                dehydrated.append([])
+                continue
+
+            dehydrated.append(self.dehydrate_m2ms(bundle, prefetched.get(bundle.obj.pk, []), m2m_resource))
+
+        return dehydrated
+
     def hydrate(self, bundle):
         pass
 
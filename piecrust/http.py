@@ -48,6 +48,10 @@ class ResponseGenerator(object):
         """
         Given response data (a ``PiecrustResponse`` instance), return the
         correct response for your given framework.
+
+        If the response is ``streaming``, its ``content`` is an iterator of
+        string chunks, which should be passed through to the framework's
+        streaming/iterable body support as-is (not joined).
         """
         raise ImproperlyConfigured("You must subclass 'ResponseGenerator' & implement a 'generate_http_response' method.")
 
@@ -58,10 +62,28 @@ class PiecrustResponse(object):
     def __init__(self, content=None, status_code=None, **kwargs):
         self.content = content
         self.extra_data = kwargs
+        self.headers = {}
 
         if status_code is not None:
             self.status_code = status_code
 
+    def __getitem__(self, header):
+        return self.headers[header]
+
+    def __setitem__(self, header, value):
+        self.headers[header] = value
+
+    def has_header(self, header):
+        return header in self.headers
+
+    @property
+    def streaming(self):
+        """
+        Whether the ``content`` is an iterator of chunks (rather than a
+        string).
+        """
+        return self.content is not None and not isinstance(self.content, basestring)
+
 
 class HttpOK(PiecrustResponse):
     status_code = 200
@@ -1,16 +1,22 @@
+import hashlib
+import uuid
 from copy import deepcopy
+from itertools import islice
+from operator import itemgetter
+from StringIO import StringIO
 # from django.conf.urls.defaults import patterns, url
 # from django.core.urlresolvers import NoReverseMatch, reverse, resolve, Resolver404, get_script_prefix
 # from django.http import HttpResponse, HttpResponseNotFound
 from piecrust.authentication import Authentication
 from piecrust.authorization import ReadOnlyAuthorization
 from piecrust.bundle import Bundle
-from piecrust.cache import NoCache
+from piecrust.cache import NoCache, MAX_KEY_LENGTH, escape_cache_key_bit
+from piecrust.compression import NoCompression
 from piecrust.exceptions import NotFound, BadRequest, HydrationError, ImmediateHttpResponse, ObjectDoesNotExist, MultipleObjectsReturned, ValidationError
 from piecrust import fields
 from piecrust import http
 from piecrust.paginator import Paginator
-from piecrust.serializers import Serializer
+from piecrust.serializers import Serializer, PARSE_ERRORS, STREAMED_KEYS
 from piecrust.storage import BaseStorage
 from piecrust.throttle import BaseThrottle
 from piecrust.uris import UriHandler
@@ -32,6 +38,11 @@ except ImportError:
         pass
 
 
+# The ways a list response's objects may be laid out. See
+# ``Resource.determine_list_layout``.
+LIST_LAYOUTS = ('objects', 'columnar')
+
+
 class ResourceOptions(object):
     """
     A configuration class for ``Resource``.
@@ -44,6 +55,12 @@ class ResourceOptions(object):
     authentication = Authentication()
     authorization = ReadOnlyAuthorization()
     cache = NoCache()
+    cache_version = 1
+    obj_cache_timeout = 60
+    cache_write_through = False
+    compression = NoCompression()
+    cache_responses = False
+    response_cache_timeout = 60
     throttle = BaseThrottle()
     validation = Validation()
     paginator_class = Paginator
@@ -65,6 +82,11 @@ class ResourceOptions(object):
     include_resource_uri = True
     include_absolute_url = False
     always_return_data = False
+    streaming = False
+    streaming_chunk_size = 100
+    streaming_uploads = False
+    list_layout = 'objects'
+    list_layout_param = None
 
     def __new__(cls, meta=None):
         overrides = {}
@@ -87,6 +109,102 @@ class ResourceOptions(object):
         return object.__new__(type('ResourceOptions', (cls,), overrides))
 
 
+def get_many_hook_name(field_name, fields):
+    """
+    Returns the name of the batch dehydrate hook for ``field_name``, or
+    ``None`` if it'd clash with the per-object hook of another of the
+    ``fields`` (one named ``<field_name>_many``).
+    """
+    if "%s_many" % field_name in fields:
+        return None
+
+    return "dehydrate_%s_many" % field_name
+
+
+def iter_chunks(first, chunks):
+    """
+    Yields the items of the ``first`` (already produced) chunk, then those
+    of each of the remaining ``chunks``.
+
+    A generator (rather than an ``itertools.chain``), so the ``Serializer``
+    recognizes it as streamable.
+    """
+    for item in first:
+        yield item
+
+    for chunk in chunks:
+        for item in chunk:
+            yield item
+
+
+class DehydrationPlan(object):
+    """
+    A precompiled description of how a ``Resource`` class dehydrates objects.
+
+    Built once per ``Resource`` subclass by the metaclass, so that
+    ``full_dehydrate`` doesn't have to re-walk the fields, format hook names
+    or probe for ``dehydrate_<field_name>`` (or the batch
+    ``dehydrate_<field_name>_many``) methods on every object.
+
+    If there's also a field named ``<field_name>_many``, then
+    ``dehydrate_<field_name>_many`` is that field's per-object hook, so it's
+    never taken as ``<field_name>``'s batch hook.
+    """
+    def __init__(self, resource_class):
+        self.resource_class = resource_class
+        self.field_names = []
+        self.hook_names = {}
+        self.many_hook_names = {}
+
+        for field_name, field_object in resource_class.base_fields.items():
+            self.field_names.append(field_name)
+            hook_name = "dehydrate_%s" % field_name
+            many_hook_name = get_many_hook_name(field_name, resource_class.base_fields)
+
+            if callable(getattr(resource_class, hook_name, None)):
+                self.hook_names[field_name] = hook_name
+
+            if many_hook_name and callable(getattr(resource_class, many_hook_name, None)):
+                self.many_hook_names[field_name] = many_hook_name
+
+    def bind(self, resource):
+        """
+        Resolves the plan against a ``Resource`` instance.
+
+        Returns a list of ``(field_name, field_object, hook, many_hook)``
+        tuples, where ``hook`` is the bound ``dehydrate_<field_name>`` method
+        and ``many_hook`` the bound ``dehydrate_<field_name>_many`` method
+        (either may be ``None``).
+        """
+        steps = []
+
+        for field_name, field_object in resource.fields.items():
+            if field_name in self.field_names:
+                hook_name = self.hook_names.get(field_name)
+                many_hook_name = self.many_hook_names.get(field_name)
+            else:
+                # A field added to the instance after the class was built.
+                hook_name = "dehydrate_%s" % field_name
+                many_hook_name = get_many_hook_name(field_name, resource.fields)
+
+            if many_hook_name and "%s_many" % field_name in resource.fields:
+                # The instance gained a clashing field.
+                many_hook_name = None
+
+            hook = None
+            many_hook = None
+
+            if hook_name:
+                hook = getattr(resource, hook_name, None)
+
+            if many_hook_name:
+                many_hook = getattr(resource, many_hook_name, None)
+
+            steps.append((field_name, field_object, hook, many_hook))
+
+        return steps
+
+
 class DeclarativeMetaclass(type):
     def __new__(cls, name, bases, attrs):
         attrs['base_fields'] = {}
@@ -137,6 +255,7 @@ class DeclarativeMetaclass(type):
             if hasattr(field_object, 'contribute_to_class'):
                 field_object.contribute_to_class(new_class, field_name)
 
+        new_class._dehydration_plan = DehydrationPlan(new_class)
         return new_class
 
 
@@ -154,7 +273,15 @@ class Resource(object):
     __metaclass__ = DeclarativeMetaclass
 
     def __init__(self, api_name=None):
-        self.fields = deepcopy(self.base_fields)
+        # The field definitions are treated as read-only, so every instance
+        # of the class shares them rather than paying for a ``deepcopy``.
+        # Only the ``dict`` is copied, so adding/removing fields on an
+        # instance doesn't leak into the class.
+        self.fields = dict(self.base_fields)
+        self._dehydration_steps = None
+        # The cache tokens last seen, to guess keys with (see
+        # ``get_with_cache_tokens``).
+        self._cache_tokens = {}
 
         if not api_name is None:
             self._meta.api_name = api_name
@@ -278,15 +405,58 @@ class Resource(object):
         )
         return urlpatterns
 
-    def create_response(self, request, data, response_class=HttpResponse, **response_kwargs):
+    def create_response(self, request, data, response_class=HttpResponse, stream=False, **response_kwargs):
         """
         Extracts the common "which-format/serialize/return-response" cycle.
 
+        If ``stream`` is ``True``, the response's ``content`` is an iterator
+        of serialized chunks, rather than a string.
+
+        The response is then compressed, if the client accepts it (see
+        ``compress_response``).
+
         Mostly a useful shortcut/hook.
         """
         desired_format = self.determine_format(request)
-        serialized = self.serialize(request, data, desired_format)
-        return response_class(content=serialized, content_type=build_content_type(desired_format), **response_kwargs)
+        serialized = self.serialize(request, data, desired_format, stream=stream)
+        response = response_class(content=serialized, content_type=build_content_type(desired_format), **response_kwargs)
+        return self.compress_response(request, response)
+
+    def compress_response(self, request, response):
+        """
+        Compresses the ``response``'s content with whichever content-encoding
+        ``Meta.compression`` negotiates for the ``request``, setting the
+        ``Content-Encoding`` & ``Vary`` headers to match.
+
+        The compressed bytes aren't cached here. With
+        ``Meta.cache_responses = True``, the whole (compressed) response is
+        cached per content-encoding, so repeat responses aren't recompressed
+        (see ``cached_response``).
+        """
+        compression = self._meta.compression
+
+        if not compression.encodings or not response.content:
+            return response
+
+        if response.has_header('Vary'):
+            response['Vary'] = '%s, Accept-Encoding' % response['Vary']
+        else:
+            response['Vary'] = 'Accept-Encoding'
+
+        encoding = compression.negotiate(request)
+
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.content = compression.compress_iter(response.content, encoding)
+        elif compression.should_compress(response.content):
+            response.content = compression.compress(response.content, encoding)
+        else:
+            return response
+
+        response['Content-Encoding'] = encoding
+        return response
 
     def determine_format(self, request):
         """
@@ -297,11 +467,35 @@ class Resource(object):
         """
         return determine_format(request, self._meta.serializer, default_format=self._meta.default_format)
 
-    def serialize(self, request, data, format, options=None):
+    def determine_list_layout(self, request):
+        """
+        Used to determine how the objects of a list response are laid out.
+
+        Either ``objects`` (the default), a list of objects, or ``columnar``,
+        where the field names are given once (as ``fields``) & each object is
+        a list of values (in ``rows``), set by ``Meta.list_layout``.
+
+        If ``Meta.list_layout_param`` names a GET param (i.e. ``'layout'``),
+        requests may choose the layout with it. It's ``None`` by default, so
+        no param is taken away from the resource's filters.
+        """
+        layout = self._meta.list_layout
+
+        if self._meta.list_layout_param is not None:
+            layout = request.GET.get(self._meta.list_layout_param, layout)
+
+        if layout not in LIST_LAYOUTS:
+            raise BadRequest("Invalid list layout '%s'. Choose one of: %s." % (layout, ', '.join(LIST_LAYOUTS)))
+
+        return layout
+
+    def serialize(self, request, data, format, options=None, stream=False):
         """
         Given a request, data and a desired format, produces a serialized
         version suitable for transfer over the wire.
 
+        If ``stream`` is ``True``, returns an iterator of serialized chunks.
+
         Mostly a hook, this uses the ``Serializer`` from ``Resource._meta``.
         """
         options = options or {}
@@ -315,6 +509,9 @@ class Resource(object):
 
             options['callback'] = callback
 
+        if stream:
+            return self._meta.serializer.serialize_iter(data, format, options)
+
         return self._meta.serializer.serialize(data, format, options)
 
     def deserialize(self, request, data, format='application/json'):
@@ -329,6 +526,94 @@ class Resource(object):
         deserialized = self._meta.serializer.deserialize(data, format=request.META.get('CONTENT_TYPE', 'application/json'))
         return deserialized
 
+    def deserialize_list(self, request, format='application/json'):
+        """
+        Deserializes the body of a list write (i.e. ``PUT``/``PATCH`` to the
+        list endpoint).
+
+        If ``Meta.streaming_uploads = True`` (& the serializer supports it for
+        the format), the ``objects`` come back as an iterator, deserialized
+        one at a time as they're consumed, so that the write overlaps with
+        parsing. See ``Serializer.deserialize_stream``.
+
+        Bodies in the columnar list layout are accepted too & come back with
+        their ``objects`` rebuilt (see ``expand_rows``).
+
+        Malformed streamed bodies raise ``BadRequest``, including when the
+        error is only reached while iterating over the ``objects``.
+        """
+        if not self._meta.streaming_uploads:
+            deserialized = self.deserialize(request, request.raw_post_data, format=format)
+        else:
+            try:
+                deserialized = self._meta.serializer.deserialize_stream(self.get_body_stream(request), format=request.META.get('CONTENT_TYPE', 'application/json'))
+            except PARSE_ERRORS:
+                raise BadRequest("Invalid data sent.")
+
+            if isinstance(deserialized, dict):
+                for key in STREAMED_KEYS:
+                    if key in deserialized and not isinstance(deserialized[key], list):
+                        deserialized[key] = self.iter_uploaded_objects(deserialized[key])
+
+        return self.expand_rows(deserialized)
+
+    def iter_uploaded_objects(self, objects):
+        """
+        Passes through the streamed ``objects``, turning parse errors (from
+        a malformed or cut off body) into ``BadRequest``.
+        """
+        try:
+            for obj in objects:
+                yield obj
+        except PARSE_ERRORS:
+            raise BadRequest("Invalid data sent.")
+
+    def expand_rows(self, data):
+        """
+        Given deserialized list data in the columnar layout (a ``fields``
+        list & the ``rows``, rather than ``objects``), turns the rows back
+        into ``objects`` dicts.
+
+        Anything else is returned untouched. If the ``rows`` are streamed,
+        so are the resulting ``objects``, in which case the ``fields`` must
+        come before the ``rows`` in the body (as they do in the columnar
+        responses).
+        """
+        if not isinstance(data, dict) or 'objects' in data or 'fields' not in data or 'rows' not in data:
+            return data
+
+        fields = data.pop('fields')
+        rows = data.pop('rows')
+
+        if not isinstance(fields, list):
+            raise BadRequest("Invalid data sent.")
+
+        objects = self.iter_row_objects(fields, rows)
+
+        if isinstance(rows, list):
+            objects = list(objects)
+
+        data['objects'] = objects
+        return data
+
+    def iter_row_objects(self, fields, rows):
+        for row in rows:
+            if not isinstance(row, list) or len(row) != len(fields):
+                raise BadRequest("Invalid data sent.")
+
+            yield dict(zip(fields, row))
+
+    def get_body_stream(self, request):
+        """
+        Returns a file-like object for reading the request body, used when
+        streaming uploads.
+
+        By default, wraps ``request.raw_post_data``. Override this to hand
+        over your framework's unbuffered file-like object (i.e. Django's
+        ``request`` itself) to avoid holding the whole body in memory.
+        """
+        return StringIO(request.raw_post_data)
+
     def alter_list_data_to_serialize(self, request, data):
         """
         A hook to alter list data just before it gets serialized & sent to the user.
@@ -338,6 +623,17 @@ class Resource(object):
 
         Should accommodate for a list of objects, generally also including
         meta data.
+
+        In the columnar list layout (see ``determine_list_layout``), there's
+        no ``objects`` key. Instead, ``data['fields']`` lists the field names
+        & ``data['rows']`` the objects, each as a list of values in that
+        order.
+
+        With ``Meta.streaming = True``, ``data['objects']`` (or
+        ``data['rows']`` in the columnar layout) is a generator that gets
+        dehydrated as it's serialized, not a list. So it can't be indexed
+        or ``len()``-ed & can only be iterated over once. Wrap it in another
+        generator to alter the objects, or use ``data['meta']`` for counts.
         """
         return data
 
@@ -407,7 +703,18 @@ class Resource(object):
 
         # All clear. Process the request.
         request = self.convert_post_to_put(request)
-        response = method(request, **kwargs)
+
+        if not self._meta.cache_responses:
+            response = method(request, **kwargs)
+        elif request_method == 'get':
+            response = self.cached_response(request, request_type, method, **kwargs)
+        else:
+            try:
+                response = method(request, **kwargs)
+            finally:
+                # Even a failed write may have changed something (i.e.
+                # ``put_list`` deletes before it validates).
+                self.invalidate_cached_responses()
 
         # Add the throttled request.
         self.log_throttled_access(request)
@@ -622,29 +929,197 @@ class Resource(object):
 
     # Data preparation.
 
-    def full_dehydrate(self, bundle):
+    def get_dehydration_steps(self):
+        """
+        Returns the class' ``DehydrationPlan`` bound to this instance.
+
+        The bound steps are memoized. If you alter ``self.fields`` after
+        the first dehydration, reset ``_dehydration_steps`` to ``None``.
+        """
+        if self._dehydration_steps is None:
+            self._dehydration_steps = self._dehydration_plan.bind(self)
+
+        return self._dehydration_steps
+
+    def full_dehydrate(self, bundle, steps=None):
         """
         Given a bundle with an object instance, extract the information from it
         to populate the resource.
+
+        Optionally accepts ``steps`` (from ``get_dehydration_steps``), which
+        lets callers dehydrating many bundles resolve the plan only once.
         """
-        # Dehydrate each field.
-        for field_name, field_object in self.fields.items():
-            # A touch leaky but it makes URI resolution work.
-            if getattr(field_object, 'dehydrated_type', None) == 'related':
-                field_object.api_name = self._meta.api_name
-                field_object.resource_name = self._meta.resource_name
+        if steps is None:
+            steps = self.get_dehydration_steps()
 
-            bundle.data[field_name] = field_object.dehydrate(bundle)
+        data = bundle.data
 
-            # Check for an optional method to do further dehydration.
-            method = getattr(self, "dehydrate_%s" % field_name, None)
+        # Dehydrate each field.
+        for field_name, field_object, method, many_method in steps:
+            data[field_name] = field_object.dehydrate(bundle)
 
-            if method:
-                bundle.data[field_name] = method(bundle)
+            # Run the optional method to do further dehydration.
+            if method is not None:
+                data[field_name] = method(bundle)
 
         bundle = self.dehydrate(bundle)
         return bundle
 
+    def full_dehydrate_many(self, bundles, steps=None):
+        """
+        Given a list of bundles with object instances, populates them all at
+        once, returning the list of dehydrated bundles.
+
+        Works a field at a time across all the bundles (rather than an object
+        at a time), which lets the fields convert (or fetch related data for)
+        a whole column in one go.
+
+        Per-object ``dehydrate_<field_name>`` methods still run for each
+        bundle. If a ``dehydrate_<field_name>_many`` method is present, it is
+        used instead, called once with the list of bundles & expected to
+        return a list of values in the same order (unless there's a field
+        named ``<field_name>_many``, whose per-object hook that is).
+        """
+        if steps is None:
+            steps = self.get_dehydration_steps()
+
+        if not isinstance(bundles, list):
+            bundles = list(bundles)
+
+        datas = [bundle.data for bundle in bundles]
+
+        # Dehydrate each field, a column at a time.
+        for field_name, field_object, method, many_method in steps:
+            for data, value in zip(datas, field_object.dehydrate_many(bundles)):
+                data[field_name] = value
+
+            if many_method is not None:
+                for data, value in zip(datas, many_method(bundles)):
+                    data[field_name] = value
+            elif method is not None:
+                for bundle, data in zip(bundles, datas):
+                    data[field_name] = method(bundle)
+
+        return [self.dehydrate(bundle) for bundle in bundles]
+
+    def iter_full_dehydrate(self, request, objects):
+        """
+        Given an iterable of object instances, lazily builds & dehydrates
+        their bundles, returning a generator of them.
+
+        Works through ``Meta.streaming_chunk_size`` objects at a time (via
+        ``full_dehydrate_many``), so only that many are held in memory at
+        once.
+
+        The first chunk is dehydrated straight away, so errors in the fields
+        or ``dehydrate`` hooks still surface before the response is sent
+        (& get a proper error response). Errors further in can only cut the
+        stream short.
+        """
+        return self.iter_dehydrated_chunks(request, objects, self.full_dehydrate_many)
+
+    def iter_dehydrated_chunks(self, request, objects, dehydrate_many):
+        """
+        Builds bundles for the ``objects`` a chunk at a time & hands each
+        chunk to ``dehydrate_many`` (along with the dehydration steps),
+        returning a generator of the results, with the first chunk done
+        eagerly.
+        """
+        steps = self.get_dehydration_steps()
+        objects = iter(objects)
+
+        def chunks():
+            while True:
+                bundles = [self.build_bundle(obj=obj, request=request) for obj in islice(objects, self._meta.streaming_chunk_size)]
+
+                if not bundles:
+                    break
+
+                yield dehydrate_many(bundles, steps)
+
+        chunks = chunks()
+        return iter_chunks(next(chunks, []), chunks)
+
+    def get_columnar_fields(self, steps=None):
+        """
+        Returns the names of the fields, in the order their values appear in
+        the rows of the columnar list layout.
+        """
+        if steps is None:
+            steps = self.get_dehydration_steps()
+
+        return sorted(step[0] for step in steps)
+
+    def uses_bundle_data(self, steps):
+        """
+        Checks whether dehydrating with the given ``steps`` may need each
+        bundle's ``data`` filled in, which is the case if there are any
+        ``dehydrate_<field_name>`` (or ``dehydrate_<field_name>_many``)
+        methods or ``dehydrate`` is overridden.
+
+        The built-in ``dehydrate_resource_uri`` only needs the object, so it
+        doesn't count.
+        """
+        if type(self).dehydrate.im_func is not Resource.dehydrate.im_func:
+            return True
+
+        for field_name, field_object, method, many_method in steps:
+            if many_method is not None:
+                return True
+
+            if method is not None and getattr(method, 'im_func', None) is not Resource.dehydrate_resource_uri.im_func:
+                return True
+
+        return False
+
+    def full_dehydrate_rows(self, bundles, steps=None):
+        """
+        Given a list of bundles with object instances, dehydrates them into
+        rows for the columnar list layout, returning a list of lists of
+        values (in the order of ``get_columnar_fields``).
+
+        If nothing needs the bundles' ``data`` (see ``uses_bundle_data``),
+        the rows are built straight from each field's ``dehydrate_many``
+        column, skipping the per-object ``dict``s entirely. Otherwise, this
+        falls back to ``full_dehydrate_many`` & reads the rows back out.
+
+        Only the resource's fields are included. Any extra data added by an
+        overridden ``dehydrate`` is left out.
+        """
+        if steps is None:
+            steps = self.get_dehydration_steps()
+
+        if not isinstance(bundles, list):
+            bundles = list(bundles)
+
+        columnar_steps = sorted(steps, key=itemgetter(0))
+
+        if self.uses_bundle_data(steps):
+            field_names = [step[0] for step in columnar_steps]
+            return [[bundle.data.get(field_name) for field_name in field_names] for bundle in self.full_dehydrate_many(bundles, steps)]
+
+        if not columnar_steps:
+            return [[] for bundle in bundles]
+
+        columns = []
+
+        for field_name, field_object, method, many_method in columnar_steps:
+            if method is not None:
+                columns.append([method(bundle) for bundle in bundles])
+            else:
+                columns.append(field_object.dehydrate_many(bundles))
+
+        return [list(row) for row in zip(*columns)]
+
+    def iter_full_dehydrate_rows(self, request, objects):
+        """
+        Given an iterable of object instances, lazily dehydrates them into
+        rows for the columnar list layout, yielding them one at a time.
+
+        The columnar counterpart of ``iter_full_dehydrate``.
+        """
+        return self.iter_dehydrated_chunks(request, objects, self.full_dehydrate_rows)
+
     def dehydrate(self, bundle):
         """
         A hook to allow a final manipulation of data once all fields/methods
@@ -786,17 +1261,249 @@ class Resource(object):
 
     def generate_cache_key(self, *args, **kwargs):
         """
-        Creates a unique-enough cache key.
+        Creates a canonical cache key.
+
+        This is based off the current api_name/resource_name,
+        ``Meta.cache_version``, the resource's cache namespace (see
+        ``invalidate_cache``) & the args/kwargs. See ``build_cache_key``.
+        """
+        return self.build_cache_key(args, kwargs, namespace=self.get_cache_namespace())
+
+    def build_cache_key(self, args, kwargs, namespace=None):
+        """
+        Builds a cache key from a list of ``args`` & a ``dict`` of
+        ``kwargs``, within the given ``namespace`` (if any).
+
+        The kwargs are sorted, so equivalent lookups share a key, & every
+        bit is escaped, so they can't run into one another (or contain
+        characters memcached doesn't allow). Keys longer than
+        ``MAX_KEY_LENGTH`` have the end replaced with a hash of the whole
+        key.
+        """
+        bits = [self._meta.api_name, self._meta.resource_name, 'v%s' % self._meta.cache_version]
+
+        if namespace is not None:
+            bits.append(namespace)
+
+        bits.extend(args)
+        escaped = [escape_cache_key_bit(bit) for bit in bits]
+        escaped.extend('%s=%s' % (escape_cache_key_bit(name), escape_cache_key_bit(value)) for name, value in sorted(kwargs.items()))
+        key = ':'.join(escaped)
+
+        if len(key) > MAX_KEY_LENGTH:
+            key = '%s:%s' % (key[:MAX_KEY_LENGTH - 41], hashlib.sha1(key).hexdigest())
+
+        return key
+
+    def get_cache_token(self, name, timeout=None):
+        """
+        Returns the resource's current token for ``name`` (i.e. the cache
+        namespace), which is stored in the cache.
+        """
+        token = self._meta.cache.get(self.build_cache_key(('token', name), {}))
+
+        if token is None:
+            return self.bump_cache_token(name, timeout=timeout)
+
+        self._cache_tokens[name] = token
+        return token
+
+    def bump_cache_token(self, name, timeout=None):
+        """
+        Moves the resource on to a fresh, random token for ``name``, so
+        every key built with the old one is no longer looked up. Returns the
+        new token.
+
+        A random token (rather than a counter) means concurrent bumps can't
+        get lost. With a plain ``NoCache``, nothing is stored (so there's
+        nothing to invalidate) & the token is always ``'0'``.
+        """
+        if type(self._meta.cache) is NoCache:
+            return '0'
+
+        token = uuid.uuid4().hex[:16]
+        self._meta.cache.set(self.build_cache_key(('token', name), {}), token, timeout=timeout)
+        self._cache_tokens[name] = token
+        return token
+
+    def get_with_cache_tokens(self, timeouts, build_key):
+        """
+        Looks up the value under the key ``build_key`` makes from a ``dict``
+        of the resource's current tokens, for the names in ``timeouts`` (a
+        ``dict`` of ``name -> timeout``, used if a token needs creating).
+        Returns the key & the value (or ``None``).
+
+        The key is first guessed from the tokens this resource last saw, so
+        the tokens & the value come back in a single ``get_many``. Only if a
+        token has since moved on (i.e. another process invalidated the
+        cache) is the value looked up again.
+        """
+        token_keys = dict((name, self.build_cache_key(('token', name), {})) for name in timeouts)
+        keys = token_keys.values()
+        guessed = dict((name, self._cache_tokens.get(name)) for name in timeouts)
+        guessed_key = None
+
+        if None not in guessed.values():
+            guessed_key = build_key(guessed)
+            keys.append(guessed_key)
+
+        found = self._meta.cache.get_many(keys)
+        tokens = {}
+        created = False
+
+        for name, timeout in timeouts.items():
+            tokens[name] = found.get(token_keys[name])
+
+            if tokens[name] is None:
+                tokens[name] = self.bump_cache_token(name, timeout=timeout)
+                created = True
+            else:
+                self._cache_tokens[name] = tokens[name]
+
+        cache_key = build_key(tokens)
+
+        if cache_key == guessed_key:
+            return cache_key, found.get(cache_key)
+
+        if created:
+            # Nothing can be stored under a brand new token yet.
+            return cache_key, None
+
+        return cache_key, self._meta.cache.get(cache_key)
+
+    def cached_get_or_set(self, args, kwargs, default, timeout):
+        """
+        The cache's ``get_or_set`` for the key
+        ``generate_cache_key(*args, **kwargs)`` would build.
+
+        If the cache's ``get_or_set`` is the plain one (a ``get``, then a
+        ``set`` on a miss), the namespace & the value are fetched together
+        (see ``get_with_cache_tokens``). Otherwise (i.e. a ``TieredCache``,
+        which keeps concurrent misses from stampeding & serves most namespace
+        lookups from its local tier), its ``get_or_set`` is used as-is.
+        """
+        cache = self._meta.cache
+
+        if getattr(cache.get_or_set, 'im_func', None) is not NoCache.get_or_set.im_func:
+            return cache.get_or_set(self.generate_cache_key(*args, **kwargs), default, timeout=timeout)
+
+        cache_key, value = self.get_with_cache_tokens({'namespace': None}, lambda tokens: self.build_cache_key(args, kwargs, namespace=tokens['namespace']))
+
+        if value is None:
+            value = default()
+
+            if value is not None:
+                cache.set(cache_key, value, timeout=timeout)
+
+        return value
+
+    def get_cache_namespace(self):
+        """
+        Returns the resource's current cache namespace, which is part of
+        every key from ``generate_cache_key``.
+        """
+        return self.get_cache_token('namespace')
+
+    def invalidate_cache(self):
+        """
+        Invalidates everything the resource has cached at once, by moving
+        it on to a new cache namespace.
+
+        The old values aren't deleted, just no longer looked up, so they're
+        left to expire.
+        """
+        return self.bump_cache_token('namespace')
+
+    def get_response_generation(self):
+        """
+        Returns the resource's current response cache generation, which is
+        part of every cached response's key.
+        """
+        return self.get_cache_token('responses', timeout=self._meta.response_cache_timeout)
+
+    def invalidate_cached_responses(self):
+        """
+        Invalidates all of the resource's cached responses at once, by
+        moving it on to a new generation. Returns the new generation.
+
+        Called by ``dispatch`` after any write to the resource. Call it
+        yourself if the data changes some other way.
 
-        This is based off the current api_name/resource_name/args/kwargs.
+        The old responses aren't deleted, just no longer looked up, so
+        they're left to expire.
         """
-        smooshed = []
+        return self.bump_cache_token('responses', timeout=self._meta.response_cache_timeout)
 
-        for key, value in kwargs.items():
-            smooshed.append("%s=%s" % (key, value))
+    def get_response_cache_key(self, request, request_type, **kwargs):
+        """
+        Builds the key a response is cached under.
 
-        # Use a list plus a ``.join()`` because it's faster than concatenation.
-        return "%s:%s:%s:%s" % (self._meta.api_name, self._meta.resource_name, ':'.join(args), ':'.join(smooshed))
+        Covers everything the response may vary by: the resource (& its
+        generation), the URL kwargs, the query params (in sorted order), the
+        negotiated format & content-encoding and the requestor's identity
+        (per ``Meta.authentication.get_identifier``).
+        """
+        return self.build_response_cache_key(self.get_response_digest(request, request_type, **kwargs), {
+            'namespace': self.get_cache_namespace(),
+            'responses': self.get_response_generation(),
+        })
+
+    def get_response_digest(self, request, request_type, **kwargs):
+        """
+        Hashes the parts of the request a response may vary by, for
+        ``get_response_cache_key``.
+        """
+        if hasattr(request.GET, 'lists'):
+            query = [(key, value) for key, values in request.GET.lists() for value in values]
+        else:
+            query = request.GET.items()
+
+        bits = (
+            request_type,
+            sorted(self.remove_api_resource_names(kwargs).items()),
+            sorted(query),
+            self.determine_format(request),
+            self._meta.compression.negotiate(request),
+            self._meta.authentication.get_identifier(request),
+        )
+        return hashlib.md5(repr(bits)).hexdigest()
+
+    def build_response_cache_key(self, digest, tokens):
+        """
+        Builds the key a response with the given ``digest`` is cached under,
+        from a ``dict`` of the ``namespace`` & ``responses`` tokens.
+        """
+        return self.build_cache_key(('response', tokens['responses'], digest), {}, namespace=tokens['namespace'])
+
+    def cached_response(self, request, request_type, method, **kwargs):
+        """
+        A version of calling the view ``method`` that uses the cache to
+        skip straight to the final, serialized (& compressed) response for
+        commonly-requested data.
+
+        Only successful (200 OK), non-streaming responses are cached, for
+        ``Meta.response_cache_timeout`` seconds. The cached responses are
+        invalidated on any write (see ``invalidate_cached_responses``).
+        Writes to *other* resources aren't tracked, so be wary of caching
+        responses that include related resources' data.
+        """
+        digest = self.get_response_digest(request, request_type, **kwargs)
+        timeouts = {'namespace': None, 'responses': self._meta.response_cache_timeout}
+        cache_key, cached = self.get_with_cache_tokens(timeouts, lambda tokens: self.build_response_cache_key(digest, tokens))
+
+        if cached is not None:
+            status_code, content, headers, extra_data = cached
+            response = http.PiecrustResponse(content=content, status_code=status_code, **extra_data)
+            response.headers.update(headers)
+            return response
+
+        response = method(request, **kwargs)
+
+        if isinstance(response, http.PiecrustResponse) and response.status_code == 200 and response.content is not None and not response.streaming:
+            cached = (response.status_code, response.content, response.headers, response.extra_data)
+            self._meta.cache.set(cache_key, cached, timeout=self._meta.response_cache_timeout)
+
+        return response
 
     # Data access methods.
 
@@ -870,15 +1577,11 @@ class Resource(object):
         """
         A version of ``obj_get_list`` that uses the cache as a means to get
         commonly-accessed data faster.
-        """
-        cache_key = self.generate_cache_key('list', **kwargs)
-        obj_list = self._meta.cache.get(cache_key)
-
-        if obj_list is None:
-            obj_list = self.obj_get_list(request=request, **kwargs)
-            self._meta.cache.set(cache_key, obj_list)
 
-        return obj_list
+        Goes through ``cached_get_or_set``, so a ``TieredCache`` can keep
+        concurrent misses from stampeding ``obj_get_list``.
+        """
+        return self.cached_get_or_set(('list',), kwargs, lambda: self.obj_get_list(request=request, **kwargs), self._meta.obj_cache_timeout)
 
     def obj_get(self, request=None, **kwargs):
         """
@@ -892,19 +1595,115 @@ class Resource(object):
         """
         raise NotImplementedError()
 
+    def obj_get_many(self, request=None, pks=None):
+        """
+        Fetches the objects with the given primary keys (strings, as they
+        come from the URL), returning a ``dict`` of ``pk -> object``. Any
+        that don't exist are left out.
+
+        By default, makes a single ``Meta.storage.list(pk__in=...)`` call,
+        limited by ``apply_authorization_limits`` (as ``obj_get`` would be).
+        If the resource has its own ``obj_get`` (which may check or filter
+        each object further), or the storage isn't implemented, calls
+        ``obj_get`` for each instead, so ``get_multiple`` never returns
+        objects the detail endpoint wouldn't.
+        """
+        if type(self).obj_get.im_func is Resource.obj_get.im_func:
+            try:
+                objects = self._meta.storage.list(pk__in=list(pks))
+            except NotImplementedError:
+                pass
+            else:
+                objects = self.apply_authorization_limits(request, objects)
+                objects_by_pk = dict((unicode(obj.pk), obj) for obj in objects)
+                return dict((pk, objects_by_pk[unicode(pk)]) for pk in pks if unicode(pk) in objects_by_pk)
+
+        found = {}
+
+        for pk in pks:
+            try:
+                found[pk] = self.obj_get(request=request, pk=pk)
+            except (NotFound, ObjectDoesNotExist):
+                pass
+
+        return found
+
     def cached_obj_get(self, request=None, **kwargs):
         """
         A version of ``obj_get`` that uses the cache as a means to get
         commonly-accessed data faster.
+
+        Goes through ``cached_get_or_set``, so a ``TieredCache`` can keep
+        concurrent misses from stampeding ``obj_get``.
         """
-        cache_key = self.generate_cache_key('detail', **kwargs)
-        bundle = self._meta.cache.get(cache_key)
+        return self.cached_get_or_set(('detail',), kwargs, lambda: self.obj_get(request=request, **kwargs), self._meta.obj_cache_timeout)
 
-        if bundle is None:
-            bundle = self.obj_get(request=request, **kwargs)
-            self._meta.cache.set(cache_key, bundle)
+    def get_cache_lookup(self, bundle_or_obj):
+        """
+        Returns the kwargs ``cached_obj_get`` would look the given object up
+        by, so its entry can be kept up to date after writes.
 
-        return bundle
+        By default, this is ``{'pk': <the object's pk>}``, or ``None`` if
+        the object has no ``pk``. Override this if your detail URLs use
+        something else (i.e. a ``slug``).
+        """
+        if isinstance(bundle_or_obj, Bundle):
+            bundle_or_obj = bundle_or_obj.obj
+
+        pk = getattr(bundle_or_obj, 'pk', None)
+
+        if pk is None:
+            return None
+
+        return {'pk': pk}
+
+    def update_cached_objs(self, written=None, removed=None):
+        """
+        Brings the ``cached_obj_get`` entries up to date after a write.
+
+        ``written`` is a list of ``(lookup, obj)`` pairs for the objects
+        that were created/updated, where ``lookup`` is a ``dict`` of the
+        kwargs the object is looked up by. If
+        ``Meta.cache_write_through = True``, their entries are replaced with
+        the written objects, otherwise they're deleted. ``removed`` is a
+        list of lookups for objects that were deleted. ``None`` lookups are
+        skipped.
+
+        Takes at most one ``delete_many`` & one ``set_many``.
+        """
+        namespace = self.get_cache_namespace()
+        stale = set(self.build_cache_key(('detail',), lookup, namespace=namespace) for lookup in removed or [] if lookup is not None)
+        fresh = {}
+
+        for lookup, obj in written or []:
+            if lookup is None:
+                continue
+
+            cache_key = self.build_cache_key(('detail',), lookup, namespace=namespace)
+
+            if self._meta.cache_write_through and obj is not None:
+                fresh[cache_key] = obj
+            else:
+                stale.add(cache_key)
+
+        if stale:
+            self._meta.cache.delete_many(list(stale))
+
+        if fresh:
+            self._meta.cache.set_many(fresh, timeout=self._meta.obj_cache_timeout)
+
+    def get_written(self, bundle, **kwargs):
+        """
+        Returns the ``written`` pairs (see ``update_cached_objs``) for the
+        object in ``bundle``, under both its own lookup & the (URL) kwargs
+        it was written via, if any.
+        """
+        written = [(self.get_cache_lookup(bundle), bundle.obj)]
+
+        if kwargs:
+            written.append((kwargs, bundle.obj))
+
+        return written
 
     def obj_create(self, bundle, request=None, **kwargs):
         """
@@ -1025,10 +1824,11 @@ class Resource(object):
         Calls ``obj_get_list`` to provide the data, then handles that result
         set and serializes it.
 
+        If ``Meta.cache_responses = True``, ``dispatch`` caches the
+        serialized response (see ``cached_response``).
+
         Should return a HttpResponse (200 OK).
         """
-        # TODO: Uncached for now. Invalidation that works for everyone may be
-        #       impossible.
         objects = self.obj_get_list(request=request, **self.remove_api_resource_names(kwargs))
         sorted_objects = self.apply_sorting(objects, options=request.GET)
 
@@ -1036,10 +1836,24 @@ class Resource(object):
         to_be_serialized = paginator.page()
 
         # Dehydrate the bundles in preparation for serialization.
-        bundles = [self.build_bundle(obj=obj, request=request) for obj in to_be_serialized['objects']]
-        to_be_serialized['objects'] = [self.full_dehydrate(bundle) for bundle in bundles]
+        if self.determine_list_layout(request) == 'columnar':
+            objects = to_be_serialized.pop('objects')
+            to_be_serialized['fields'] = self.get_columnar_fields()
+
+            if self._meta.streaming:
+                to_be_serialized['rows'] = self.iter_full_dehydrate_rows(request, objects)
+            else:
+                bundles = [self.build_bundle(obj=obj, request=request) for obj in objects]
+                to_be_serialized['rows'] = self.full_dehydrate_rows(bundles)
+        elif self._meta.streaming:
+            # Dehydrated lazily, as the response gets serialized.
+            to_be_serialized['objects'] = self.iter_full_dehydrate(request, to_be_serialized['objects'])
+        else:
+            bundles = [self.build_bundle(obj=obj, request=request) for obj in to_be_serialized['objects']]
+            to_be_serialized['objects'] = self.full_dehydrate_many(bundles)
+
         to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
-        return self.create_response(request, to_be_serialized)
+        return self.create_response(request, to_be_serialized, stream=self._meta.streaming)
 
     def get_detail(self, request, **kwargs):
         """
@@ -1074,35 +1888,54 @@ class Resource(object):
 
         Return ``HttpAccepted`` (202 Accepted) if
         ``Meta.always_return_data = True``.
+
+        If an object fails validation (or, with ``Meta.streaming_uploads =
+        True``, the body turns out to be malformed part-way through), the
+        objects created so far are passed to ``rollback``. So the bundles of
+        the created objects are kept until the end, though only with their
+        ``data`` if ``Meta.always_return_data = True``.
         """
-        deserialized = self.deserialize(request, request.raw_post_data, format=request.META.get('CONTENT_TYPE', 'application/json'))
+        deserialized = self.deserialize_list(request, format=request.META.get('CONTENT_TYPE', 'application/json'))
         deserialized = self.alter_deserialized_list_data(request, deserialized)
 
         if not 'objects' in deserialized:
             raise BadRequest("Invalid data sent.")
 
         self.obj_delete_list(request=request, **self.remove_api_resource_names(kwargs))
+        # Which objects went isn't known, so everything cached goes.
+        self.invalidate_cache()
         bundles_seen = []
 
-        for object_data in deserialized['objects']:
-            bundle = self.build_bundle(data=dict_strip_unicode_keys(object_data), request=request)
-
-            # Attempt to be transactional, deleting any previously created
-            # objects if validation fails.
-            try:
+        # Attempt to be transactional, deleting any previously created
+        # objects if validation fails or the (streamed) body is malformed.
+        try:
+            for object_data in deserialized['objects']:
+                bundle = self.build_bundle(data=dict_strip_unicode_keys(object_data), request=request)
                 self.is_valid(bundle, request)
-            except ImmediateHttpResponse:
-                self.rollback(bundles_seen)
-                raise
+                self.obj_create(bundle, request=request, **self.remove_api_resource_names(kwargs))
 
-            self.obj_create(bundle, request=request, **self.remove_api_resource_names(kwargs))
-            bundles_seen.append(bundle)
+                if not self._meta.always_return_data:
+                    # Only the object is needed from here on.
+                    bundle = self.build_bundle(obj=bundle.obj, request=request)
+
+                bundles_seen.append(bundle)
+        except (BadRequest, ImmediateHttpResponse):
+            self.rollback(bundles_seen)
+            raise
+
+        if self._meta.cache_write_through:
+            written = []
+
+            for bundle in bundles_seen:
+                written.extend(self.get_written(bundle))
+
+            self.update_cached_objs(written=written)
 
         if not self._meta.always_return_data:
             return http.HttpNoContent()
         else:
             to_be_serialized = {}
-            to_be_serialized['objects'] = [self.full_dehydrate(bundle) for bundle in bundles_seen]
+            to_be_serialized['objects'] = self.full_dehydrate_many(bundles_seen)
             to_be_serialized = self.alter_list_data_to_serialize(request, to_be_serialized)
             return self.create_response(request, to_be_serialized, response_class=http.HttpAccepted)
 
@@ -1132,6 +1965,7 @@ class Resource(object):
 
         try:
             updated_bundle = self.obj_update(bundle, request=request, **self.remove_api_resource_names(kwargs))
+            self.update_cached_objs(written=self.get_written(updated_bundle, **self.remove_api_resource_names(kwargs)))
 
             if not self._meta.always_return_data:
                 return http.HttpNoContent()
@@ -1141,6 +1975,7 @@ class Resource(object):
                 return self.create_response(request, updated_bundle, response_class=http.HttpAccepted)
         except (NotFound, MultipleObjectsReturned):
             updated_bundle = self.obj_create(bundle, request=request, **self.remove_api_resource_names(kwargs))
+            self.update_cached_objs(written=self.get_written(updated_bundle, **self.remove_api_resource_names(kwargs)))
             location = self.get_resource_uri(updated_bundle)
 
             if not self._meta.always_return_data:
@@ -1166,6 +2001,10 @@ class Resource(object):
         bundle = self.build_bundle(data=dict_strip_unicode_keys(deserialized), request=request)
         self.is_valid(bundle, request)
         updated_bundle = self.obj_create(bundle, request=request, **self.remove_api_resource_names(kwargs))
+
+        if self._meta.cache_write_through:
+            self.update_cached_objs(written=self.get_written(updated_bundle))
+
         location = self.get_resource_uri(updated_bundle)
 
         if not self._meta.always_return_data:
@@ -1195,23 +2034,37 @@ class Resource(object):
         If the resources are deleted, return ``HttpNoContent`` (204 No Content).
         """
         self.obj_delete_list(request=request, **self.remove_api_resource_names(kwargs))
+        # Which objects went isn't known, so everything cached goes.
+        self.invalidate_cache()
         return http.HttpNoContent()
 
     def delete_detail(self, request, **kwargs):
         """
         Destroys a single resource/object.
 
-        Calls ``obj_delete``.
+        Calls ``obj_delete``, then removes the object's ``cached_obj_get``
+        entry. If it was looked up by anything but its ``pk``, its entries
+        can't all be found, so the whole cache is invalidated instead.
 
         If the resource is deleted, return ``HttpNoContent`` (204 No Content).
         If the resource did not exist, return ``Http404`` (404 Not Found).
         """
+        lookup = self.remove_api_resource_names(kwargs)
+
         try:
-            self.obj_delete(request=request, **self.remove_api_resource_names(kwargs))
-            return http.HttpNoContent()
+            self.obj_delete(request=request, **lookup)
         except NotFound:
             return http.HttpNotFound()
 
+        if lookup.keys() == ['pk'] and type(self).get_cache_lookup.im_func is Resource.get_cache_lookup.im_func:
+            self.update_cached_objs(removed=[lookup])
+        else:
+            # The object's other entries (i.e. the ``{'pk': ...}`` one
+            # ``get_multiple`` uses) can't be worked out from this lookup.
+            self.invalidate_cache()
+
+        return http.HttpNoContent()
+
     def patch_list(self, request, **kwargs):
         """
         Updates a collection in-place.
@@ -1255,50 +2108,69 @@ class Resource(object):
               entire request will fail and all resources will be rolled back.
         """
         request = self.convert_post_to_patch(request)
-        deserialized = self.deserialize(request, request.raw_post_data, format=request.META.get('CONTENT_TYPE', 'application/json'))
+        deserialized = self.deserialize_list(request, format=request.META.get('CONTENT_TYPE', 'application/json'))
 
         if "objects" not in deserialized:
             raise BadRequest("Invalid data sent.")
 
-        if len(deserialized["objects"]) and 'put' not in self._meta.detail_allowed_methods:
-            raise ImmediateHttpResponse(response=http.HttpMethodNotAllowed())
+        # The cached objects are brought up to date in one go at the end,
+        # including for whatever was written before a failure.
+        written = []
+        removed = []
 
-        for data in deserialized["objects"]:
-            # If there's a resource_uri then this is either an
-            # update-in-place or a create-via-PUT.
-            if "resource_uri" in data:
-                uri = data.pop('resource_uri')
-
-                try:
-                    obj = self.get_via_uri(uri, request=request)
-
-                    # The object does exist, so this is an update-in-place.
-                    bundle = self.build_bundle(obj=obj, request=request)
-                    bundle = self.full_dehydrate(bundle)
-                    bundle = self.alter_detail_data_to_serialize(request, bundle)
-                    self.update_in_place(request, bundle, data)
-                except (ObjectDoesNotExist, MultipleObjectsReturned):
-                    # The object referenced by resource_uri doesn't exist,
-                    # so this is a create-by-PUT equivalent.
+        try:
+            for i, data in enumerate(deserialized["objects"]):
+                # Checked on the first object, as the ``objects`` may be streamed.
+                if i == 0 and 'put' not in self._meta.detail_allowed_methods:
+                    raise ImmediateHttpResponse(response=http.HttpMethodNotAllowed())
+
+                # If there's a resource_uri then this is either an
+                # update-in-place or a create-via-PUT.
+                if "resource_uri" in data:
+                    uri = data.pop('resource_uri')
+
+                    try:
+                        obj = self.get_via_uri(uri, request=request)
+
+                        # The object does exist, so this is an update-in-place.
+                        bundle = self.build_bundle(obj=obj, request=request)
+                        bundle = self.full_dehydrate(bundle)
+                        bundle = self.alter_detail_data_to_serialize(request, bundle)
+                        updated_bundle = self.update_in_place(request, bundle, data)
+
+                        if isinstance(updated_bundle, Bundle):
+                            bundle = updated_bundle
+                    except (ObjectDoesNotExist, MultipleObjectsReturned):
+                        # The object referenced by resource_uri doesn't exist,
+                        # so this is a create-by-PUT equivalent.
+                        data = self.alter_deserialized_detail_data(request, data)
+                        bundle = self.build_bundle(data=dict_strip_unicode_keys(data))
+                        bundle.obj.pk = obj.pk
+                        self.is_valid(bundle, request)
+                        self.obj_create(bundle, request=request)
+
+                    written.extend(self.get_written(bundle))
+                else:
+                    # There's no resource URI, so this is a create call just
+                    # like a POST to the list resource.
                     data = self.alter_deserialized_detail_data(request, data)
                     bundle = self.build_bundle(data=dict_strip_unicode_keys(data))
-                    bundle.obj.pk = obj.pk
                     self.is_valid(bundle, request)
                     self.obj_create(bundle, request=request)
-            else:
-                # There's no resource URI, so this is a create call just
-                # like a POST to the list resource.
-                data = self.alter_deserialized_detail_data(request, data)
-                bundle = self.build_bundle(data=dict_strip_unicode_keys(data))
-                self.is_valid(bundle, request)
-                self.obj_create(bundle, request=request)
 
-        if len(deserialized.get('deleted_objects', [])) and 'delete' not in self._meta.detail_allowed_methods:
-            raise ImmediateHttpResponse(response=http.HttpMethodNotAllowed())
+                    if self._meta.cache_write_through:
+                        written.extend(self.get_written(bundle))
+
+            if len(deserialized.get('deleted_objects', [])) and 'delete' not in self._meta.detail_allowed_methods:
+                raise ImmediateHttpResponse(response=http.HttpMethodNotAllowed())
 
-        for uri in deserialized.get('deleted_objects', []):
-            obj = self.get_via_uri(uri, request=request)
-            self.obj_delete(request=request, _obj=obj)
+            for uri in deserialized.get('deleted_objects', []):
+                obj = self.get_via_uri(uri, request=request)
+                self.obj_delete(request=request, _obj=obj)
+                removed.append(self.get_cache_lookup(obj))
+        finally:
+            if written or removed:
+                self.update_cached_objs(written=written, removed=removed)
 
         return http.HttpAccepted()
 
@@ -1332,7 +2204,12 @@ class Resource(object):
 
         # Now update the bundle in-place.
         deserialized = self.deserialize(request, request.raw_post_data, format=request.META.get('CONTENT_TYPE', 'application/json'))
-        self.update_in_place(request, bundle, deserialized)
+        updated_bundle = self.update_in_place(request, bundle, deserialized)
+
+        if not isinstance(updated_bundle, Bundle):
+            updated_bundle = bundle
+
+        self.update_cached_objs(written=self.get_written(updated_bundle, **self.remove_api_resource_names(kwargs)))
         return http.HttpAccepted()
 
     def update_in_place(self, request, original_bundle, new_data):
@@ -1368,8 +2245,9 @@ class Resource(object):
         Returns a serialized list of resources based on the identifiers
         from the URL.
 
-        Calls ``obj_get`` to fetch only the objects requested. This method
-        only responds to HTTP GET.
+        Looks the objects up in the cache (with a single ``get_many``), then
+        calls ``obj_get_many`` to fetch only the ones that weren't cached.
+        This method only responds to HTTP GET.
 
         Should return a HttpResponse (200 OK).
         """
@@ -1377,22 +2255,36 @@ class Resource(object):
         self.is_authenticated(request)
         self.throttle_check(request)
 
-        # Rip apart the list then iterate.
+        # Rip apart the list, then look all the objects up in the cache at
+        # once, fetching any misses in one go.
         obj_pks = kwargs.get('pk_list', '').split(';')
-        objects = []
+        namespace = self.get_cache_namespace()
+        cache_keys = dict((pk, self.build_cache_key(('detail',), {'pk': pk}, namespace=namespace)) for pk in obj_pks)
+        cached = self._meta.cache.get_many(cache_keys.values())
+        objects = {}
+
+        for pk in obj_pks:
+            if cache_keys[pk] in cached:
+                objects[pk] = cached[cache_keys[pk]]
+
+        missing = [pk for pk in cache_keys if pk not in objects]
+
+        if missing:
+            fetched = self.obj_get_many(request=request, pks=missing)
+            objects.update(fetched)
+            self._meta.cache.set_many(dict((cache_keys[pk], obj) for pk, obj in fetched.iteritems()), timeout=self._meta.obj_cache_timeout)
+
+        bundles = []
         not_found = []
 
         for pk in obj_pks:
-            try:
-                obj = self.obj_get(request, pk=pk)
-                bundle = self.build_bundle(obj=obj, request=request)
-                bundle = self.full_dehydrate(bundle)
-                objects.append(bundle)
-            except ObjectDoesNotExist:
+            if pk in objects:
+                bundles.append(self.build_bundle(obj=objects[pk], request=request))
+            else:
                 not_found.append(pk)
 
         object_list = {
-            'objects': objects,
+            'objects': self.full_dehydrate_many(bundles),
         }
 
         if len(not_found):
@@ -1,19 +1,35 @@
 import datetime
 import decimal
+import itertools
+import re
+import types
 from StringIO import StringIO
 from piecrust.bundle import Bundle
 from piecrust.exceptions import ImproperlyConfigured, UnsupportedFormat
 from piecrust.utils import format_datetime, format_date, format_time
+from piecrust.utils.packing import Packer, Unpacker, decode_ext, encode_ext
+import json
 try:
     import simplejson
 except ImportError:
     import json as simplejson
+try:
+    import ujson
+except ImportError:
+    ujson = None
 try:
     import lxml
     from lxml.etree import parse as parse_xml
+    from lxml.etree import iterparse
     from lxml.etree import Element, tostring
+    from lxml.etree import XMLSyntaxError
 except ImportError:
     lxml = None
+try:
+    # Available as of lxml 3.1.
+    from lxml.etree import xmlfile
+except ImportError:
+    xmlfile = None
 try:
     import yaml
     from django.core.serializers import pyyaml
@@ -23,6 +39,26 @@ try:
     import biplist
 except ImportError:
     biplist = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Containers the ``iter_*`` methods output an item at a time.
+STREAMABLE_TYPES = (list, tuple, types.GeneratorType)
+
+# The errors deserializing malformed content raises.
+if lxml is None:
+    PARSE_ERRORS = (ValueError,)
+else:
+    PARSE_ERRORS = (ValueError, XMLSyntaxError)
+# Marks the start of the ``objects`` when deserializing a stream.
+STREAM_START = object()
+# The top-level lists that get streamed: the ``objects``, or the ``rows``
+# of the columnar list layout. Only the first one found is.
+STREAMED_KEYS = ('objects', 'rows')
+STDLIB_DECODER = json.JSONDecoder()
 
 
 class DateTimeJSONEncoder(simplejson.JSONEncoder):
@@ -48,6 +84,134 @@ class DateTimeJSONEncoder(simplejson.JSONEncoder):
             return super(DateTimeJSONEncoder, self).default(o)
 
 
+class JSONBackend(object):
+    """
+    A swappable class for encoding/decoding JSON, used by the ``Serializer``.
+
+    The data handed to ``dumps`` has normally already been simplified (via
+    ``Serializer.to_simple``) down to native types, so backends can use a
+    C-accelerated encoder without any per-object Python callbacks. Anything
+    else falls back to ``default``.
+    """
+    def __init__(self, sort_keys=True):
+        self.sort_keys = sort_keys
+
+    @classmethod
+    def is_available(cls):
+        """
+        Whether the library the backend needs is installed.
+        """
+        return True
+
+    def default(self, o):
+        """
+        Handles the types the encoder doesn't know about.
+        """
+        if isinstance(o, datetime.datetime):
+            return o.strftime("%s %s" % (DateTimeJSONEncoder.DATE_FORMAT, DateTimeJSONEncoder.TIME_FORMAT))
+        elif isinstance(o, datetime.date):
+            return o.strftime(DateTimeJSONEncoder.DATE_FORMAT)
+        elif isinstance(o, datetime.time):
+            return o.strftime(DateTimeJSONEncoder.TIME_FORMAT)
+        elif isinstance(o, decimal.Decimal):
+            return str(o)
+
+        raise TypeError("%r is not JSON serializable" % (o,))
+
+    def dumps(self, data):
+        raise NotImplementedError()
+
+    def loads(self, content):
+        raise NotImplementedError()
+
+    def raw_decode(self, content, idx=0):
+        """
+        Decodes a single JSON value from ``content``, starting at ``idx``.
+
+        Returns the value & the index just past it, raising ``ValueError``
+        if there isn't a complete value there. Used for streaming.
+        """
+        return STDLIB_DECODER.raw_decode(content, idx)
+
+
+class StdlibJSONBackend(JSONBackend):
+    """
+    Uses the standard library's ``json`` (& its C speedups, if compiled in).
+    """
+    def __init__(self, sort_keys=True):
+        super(StdlibJSONBackend, self).__init__(sort_keys=sort_keys)
+        self.encoder = json.JSONEncoder(sort_keys=sort_keys, default=self.default)
+        self.decoder = json.JSONDecoder()
+
+    def dumps(self, data):
+        return self.encoder.encode(data)
+
+    def loads(self, content):
+        return self.decoder.decode(content)
+
+    def raw_decode(self, content, idx=0):
+        return self.decoder.raw_decode(content, idx)
+
+
+class SimpleJSONBackend(JSONBackend):
+    """
+    Uses ``simplejson`` (& its C speedups, if compiled in). ``Decimal``
+    values are encoded natively, as numbers.
+    """
+    @classmethod
+    def is_available(cls):
+        return simplejson is not json
+
+    def __init__(self, sort_keys=True):
+        super(SimpleJSONBackend, self).__init__(sort_keys=sort_keys)
+        self.encoder = simplejson.JSONEncoder(sort_keys=sort_keys, use_decimal=True, default=self.default)
+        self.decoder = simplejson.JSONDecoder()
+
+    def dumps(self, data):
+        return self.encoder.encode(data)
+
+    def loads(self, content):
+        return self.decoder.decode(content)
+
+    def raw_decode(self, content, idx=0):
+        return self.decoder.raw_decode(content, idx)
+
+
+class UJSONBackend(JSONBackend):
+    """
+    Uses ``ujson``, the fastest of the backends.
+
+    Only opt into this one if its output suits you: it uses compact
+    separators, escapes forward slashes & can't encode anything outside of
+    the native types (so no ``default`` fallback).
+    """
+    @classmethod
+    def is_available(cls):
+        return ujson is not None
+
+    def dumps(self, data):
+        return ujson.dumps(data, sort_keys=self.sort_keys, ensure_ascii=True)
+
+    def loads(self, content):
+        return ujson.loads(content)
+
+
+# The backends the ``Serializer`` picks from by default, in order of
+# preference. ``UJSONBackend`` changes the output, so it has to be asked for.
+JSON_BACKENDS = (SimpleJSONBackend, StdlibJSONBackend)
+
+
+def get_json_backend_class(backends=JSON_BACKENDS):
+    """
+    Returns the first of the ``backends`` that is available.
+    """
+    for backend_class in backends:
+        if backend_class.is_available():
+            return backend_class
+
+    raise ImproperlyConfigured("None of the JSON backends %r are available." % (backends,))
+
+
 class Serializer(object):
     """
     A swappable class for serialization.
@@ -60,12 +224,14 @@ class Serializer(object):
         * yaml
         * html
         * plist (see http://explorapp.com/biplist/)
+        * msgpack (see http://msgpack.org/; falls back to a slower pure-Python
+          implementation if the ``msgpack`` package isn't installed)
 
     It was designed to make changing behavior easy, either by overridding the
     various format methods (i.e. ``to_json``), by changing the
     ``formats/content_types`` options or by altering the other hook methods.
     """
-    formats = ['json', 'jsonp', 'xml', 'yaml', 'html', 'plist']
+    formats = ['json', 'jsonp', 'xml', 'yaml', 'html', 'plist', 'msgpack']
     content_types = {
         'json': 'application/json',
         'jsonp': 'text/javascript',
@@ -73,12 +239,13 @@ class Serializer(object):
         'yaml': 'text/yaml',
         'html': 'text/html',
         'plist': 'application/x-plist',
+        'msgpack': 'application/x-msgpack',
     }
     datetime_formatting = 'iso-8601'
+    sort_keys = True
+    json_backend_class = None
 
-    def __init__(self, formats=None, content_types=None, datetime_formatting=None):
-        self.supported_formats = []
-
+    def __init__(self, formats=None, content_types=None, datetime_formatting=None, sort_keys=None, json_backend_class=None):
         if formats is not None:
             self.formats = formats
 
@@ -88,12 +255,92 @@ class Serializer(object):
         if datetime_formatting is not None:
             self.datetime_formatting = datetime_formatting
 
+        if sort_keys is not None:
+            self.sort_keys = sort_keys
+
+        if json_backend_class is not None:
+            self.json_backend_class = json_backend_class
+
+        if self.json_backend_class is None:
+            self.json_backend_class = get_json_backend_class()
+
+        self.build_format_index()
+        self._simple_registry = self.get_simple_converters()
+        self._simple_converters = dict(self._simple_registry)
+        # A subclass's own ``to_simple`` has to see the nested data too, so
+        # the containers only go straight to the converters without one.
+        self._simple_recurses = type(self).to_simple.im_func is not Serializer.to_simple.im_func
+        self.json_backend = self.json_backend_class(sort_keys=self.sort_keys)
+
+    def __setattr__(self, name, value):
+        super(Serializer, self).__setattr__(name, value)
+
+        # Keep the format lookups in sync (once they've been built).
+        if name in ('formats', 'content_types') and 'serializers_by_mime' in self.__dict__:
+            self.build_format_index()
+
+    def build_format_index(self):
+        """
+        Builds the lookups used to dispatch on a MIME type, so that it's a
+        single ``dict`` hit per request.
+
+        * ``supported_formats`` - The MIME types for ``formats``, in order.
+        * ``best_match_formats`` - The same, in the order ``mimeparse``
+          wants them (reversed).
+        * ``mimes_by_format`` - The MIME type for each of ``formats``.
+        * ``serializers_by_mime``/``deserializers_by_mime`` - The bound
+          ``to_<format>``/``from_<format>`` methods, for each MIME type in
+          ``content_types``.
+        * ``stream_serializers_by_mime`` - The bound ``iter_<format>``
+          methods (where present).
+        * ``stream_deserializers_by_mime`` - The bound
+          ``from_<format>_stream`` methods (where present).
+
+        Called automatically when ``formats`` or ``content_types`` are
+        assigned. If you modify either in place, call this again.
+
+        Each rebuild bumps ``format_index_version``, which invalidates the
+        results ``determine_format`` has cached for this serializer.
+        """
+        mimes_by_format = {}
+
         for format in self.formats:
             try:
-                self.supported_formats.append(self.content_types[format])
+                mimes_by_format[format] = self.content_types[format]
             except KeyError:
                 raise ImproperlyConfigured("Content type for specified type '%s' not found. Please provide it at either the class level or via the arguments." % format)
 
+        serializers_by_mime = {}
+        stream_serializers_by_mime = {}
+        deserializers_by_mime = {}
+        stream_deserializers_by_mime = {}
+
+        for short_format, long_format in self.content_types.items():
+            if long_format not in serializers_by_mime and hasattr(self, "to_%s" % short_format):
+                serializers_by_mime[long_format] = getattr(self, "to_%s" % short_format)
+
+                if hasattr(self, "iter_%s" % short_format):
+                    stream_serializers_by_mime[long_format] = getattr(self, "iter_%s" % short_format)
+
+            if long_format not in deserializers_by_mime and hasattr(self, "from_%s" % short_format):
+                deserializers_by_mime[long_format] = getattr(self, "from_%s" % short_format)
+
+                if hasattr(self, "from_%s_stream" % short_format):
+                    stream_deserializers_by_mime[long_format] = getattr(self, "from_%s_stream" % short_format)
+
+        self.supported_formats = [mimes_by_format[format] for format in self.formats]
+        # Reversed, because mimeparse is weird like that. See also
+        # https://github.com/toastdriven/django-tastypie/issues#issue/12 for
+        # more information.
+        self.best_match_formats = list(reversed(self.supported_formats))
+        self.mimes_by_format = mimes_by_format
+        self.stream_serializers_by_mime = stream_serializers_by_mime
+        self.deserializers_by_mime = deserializers_by_mime
+        self.stream_deserializers_by_mime = stream_deserializers_by_mime
+        self.format_index_version = self.__dict__.get('format_index_version', 0) + 1
+        # Set last, as it marks the index as built.
+        self.serializers_by_mime = serializers_by_mime
+
     def get_mime_for_format(self, format):
         """
         Given a format, attempts to determine the correct MIME type.
@@ -166,40 +413,134 @@ class Serializer(object):
         Given some data and a format, calls the correct method to serialize
         the data and returns the result.
         """
-        desired_format = None
+        try:
+            serialize = self.serializers_by_mime[format]
+        except KeyError:
+            raise UnsupportedFormat("The format indicated '%s' had no available serialization method. Please check your ``formats`` and ``content_types`` on your Serializer." % format)
 
-        for short_format, long_format in self.content_types.items():
-            if format == long_format:
-                if hasattr(self, "to_%s" % short_format):
-                    desired_format = short_format
-                    break
+        return serialize(bundle, options)
 
-        if desired_format is None:
-            raise UnsupportedFormat("The format indicated '%s' had no available serialization method. Please check your ``formats`` and ``content_types`` on your Serializer." % format)
+    def serialize_iter(self, bundle, format='application/json', options={}):
+        """
+        Like ``serialize``, but returns an iterator of chunks of serialized
+        data, suitable for streaming.
+
+        Uses the ``iter_<format>`` method if present. Formats without one
+        are serialized in one go & returned as a single chunk.
+        """
+        if format in self.stream_serializers_by_mime:
+            return self.stream_serializers_by_mime[format](bundle, options)
 
-        serialized = getattr(self, "to_%s" % desired_format)(bundle, options)
-        return serialized
+        return iter([self.serialize(bundle, format, options)])
 
     def deserialize(self, content, format='application/json'):
         """
         Given some data and a format, calls the correct method to deserialize
         the data and returns the result.
         """
-        desired_format = None
+        format = format.split(';')[0]
 
+        try:
+            deserialize = self.deserializers_by_mime[format]
+        except KeyError:
+            raise UnsupportedFormat("The format indicated '%s' had no available deserialization method. Please check your ``formats`` and ``content_types`` on your Serializer." % format)
+
+        return deserialize(content)
+
+    def deserialize_stream(self, content, format='application/json'):
+        """
+        Like ``deserialize``, but for large list bodies (``{"objects": [...],
+        ...}``). Accepts either a string or a file-like object.
+
+        Uses the ``from_<format>_stream`` method if present, in which case
+        the ``objects`` (or the ``rows``, for the columnar list layout, see
+        ``STREAMED_KEYS``) are deserialized lazily, one at a time, as they
+        are iterated over. Any other top-level keys are available once
+        they've been parsed (for keys after the streamed list, once it's
+        been consumed).
+
+        Formats without one are deserialized in one go.
+        """
         format = format.split(';')[0]
 
-        for short_format, long_format in self.content_types.items():
-            if format == long_format:
-                if hasattr(self, "from_%s" % short_format):
-                    desired_format = short_format
-                    break
+        if format in self.stream_deserializers_by_mime:
+            return self.stream_deserializers_by_mime[format](content)
 
-        if desired_format is None:
-            raise UnsupportedFormat("The format indicated '%s' had no available deserialization method. Please check your ``formats`` and ``content_types`` on your Serializer." % format)
+        if hasattr(content, 'read'):
+            content = content.read()
+
+        return self.deserialize(content, format)
+
+    def build_stream(self, data, events):
+        """
+        Given the (partially filled) top-level ``data`` & the generator
+        parsing the rest of it, runs the parser up to the start of the
+        streamed list, then hooks up the remainder as ``data[<key>]``.
+
+        The generator should yield ``STREAM_START`` followed by the key when
+        it reaches the list (one of ``STREAMED_KEYS``), then each item. If it
+        never does, there's no such key.
+        """
+        for event in events:
+            if event is STREAM_START:
+                data[events.next()] = events
+                break
+
+        return data
+
+    def get_simple_converters(self):
+        """
+        Returns the default ``to_simple`` converters, a ``dict`` of
+        ``type -> converter``.
+
+        Each converter takes ``(data, options)`` & returns the simplified
+        form of ``data``. A converter of ``None`` means the data is already
+        simple & is passed through untouched.
+        """
+        return {
+            list: self.simple_list,
+            tuple: self.simple_list,
+            types.GeneratorType: self.simple_list,
+            dict: self.simple_dict,
+            Bundle: self.simple_bundle,
+            datetime.datetime: self.simple_datetime,
+            datetime.date: self.simple_date,
+            datetime.time: self.simple_time,
+            decimal.Decimal: self.simple_decimal,
+            bool: None,
+            int: None,
+            long: None,
+            float: None,
+            unicode: None,
+            type(None): None,
+        }
+
+    def register(self, data_type, converter):
+        """
+        Registers a ``converter`` for ``data_type`` (& its subclasses) with
+        ``to_simple``, replacing any existing one.
 
-        deserialized = getattr(self, "from_%s" % desired_format)(content)
-        return deserialized
+        The ``converter`` gets called with ``(data, options)`` & should
+        return native types (or ``None`` to pass the data through as-is).
+        Lets apps plug in their own types without subclassing.
+        """
+        self._simple_registry[data_type] = converter
+        self._simple_converters = dict(self._simple_registry)
+
+    def get_simple_converter(self, data_type):
+        """
+        Finds the converter for a type not directly registered, by walking
+        its MRO. The result is cached for the type.
+        """
+        converter = self.simple_default
+
+        for klass in getattr(data_type, '__mro__', ()):
+            if klass in self._simple_registry:
+                converter = self._simple_registry[klass]
+                break
+
+        self._simple_converters[data_type] = converter
+        return converter
 
     def to_simple(self, data, options):
         """
@@ -209,46 +550,93 @@ class Serializer(object):
         This brings complex Python data structures down to native types of the
         serialization format(s).
         """
-        if isinstance(data, (list, tuple)):
-            return [self.to_simple(item, options) for item in data]
-        if isinstance(data, dict):
-            return dict((key, self.to_simple(val, options)) for (key, val) in data.iteritems())
-        elif isinstance(data, Bundle):
-            return dict((key, self.to_simple(val, options)) for (key, val) in data.data.iteritems())
-        elif hasattr(data, 'dehydrated_type'):
-            if getattr(data, 'dehydrated_type', None) == 'related' and data.is_m2m == False:
-                if data.full:
-                    return self.to_simple(data.fk_resource, options)
-                else:
-                    return self.to_simple(data.value, options)
-            elif getattr(data, 'dehydrated_type', None) == 'related' and data.is_m2m == True:
-                if data.full:
-                    return [self.to_simple(bundle, options) for bundle in data.m2m_bundles]
-                else:
-                    return [self.to_simple(val, options) for val in data.value]
-            else:
-                return self.to_simple(data.value, options)
-        elif isinstance(data, datetime.datetime):
-            return self.format_datetime(data)
-        elif isinstance(data, datetime.date):
-            return self.format_date(data)
-        elif isinstance(data, datetime.time):
-            return self.format_time(data)
-        elif isinstance(data, bool):
-            return data
-        elif type(data) in (long, int, float):
+        try:
+            converter = self._simple_converters[type(data)]
+        except KeyError:
+            converter = self.get_simple_converter(type(data))
+
+        if converter is None:
             return data
-        elif data is None:
-            return None
+
+        return converter(data, options)
+
+    def simple_list(self, data, options):
+        if self._simple_recurses:
+            return [self.to_simple(item, options) for item in data]
+
+        converters = self._simple_converters
+        simple = []
+
+        for item in data:
+            try:
+                converter = converters[type(item)]
+            except KeyError:
+                converter = self.get_simple_converter(type(item))
+
+            simple.append(item if converter is None else converter(item, options))
+
+        return simple
+
+    def simple_dict(self, data, options):
+        if self._simple_recurses:
+            return dict((key, self.to_simple(value, options)) for key, value in data.iteritems())
+
+        converters = self._simple_converters
+        simple = {}
+
+        for key, value in data.iteritems():
+            try:
+                converter = converters[type(value)]
+            except KeyError:
+                converter = self.get_simple_converter(type(value))
+
+            simple[key] = value if converter is None else converter(value, options)
+
+        return simple
+
+    def simple_bundle(self, data, options):
+        return self.simple_dict(data.data, options)
+
+    def simple_datetime(self, data, options):
+        return self.format_datetime(data)
+
+    def simple_date(self, data, options):
+        return self.format_date(data)
+
+    def simple_time(self, data, options):
+        return self.format_time(data)
+
+    def simple_decimal(self, data, options):
+        return unicode(data)
+
+    def simple_default(self, data, options):
+        """
+        Handles anything without a registered converter.
+        """
+        if hasattr(data, 'dehydrated_type'):
+            return self.simple_dehydrated(data, options)
+
+        return self.force_unicode(data)
+
+    def simple_dehydrated(self, data, options):
+        """
+        Handles a field object, by its ``value``.
+
+        Related fields don't keep the related resources/bundles they
+        dehydrate (as they're shared between objects & threads), so full
+        related data only comes through the dehydrated bundles.
+        """
+        if data.dehydrated_type == 'related' and data.is_m2m == True:
+            return [self.to_simple(val, options) for val in data.value]
         else:
-            return force_unicode(data)
+            return self.to_simple(data.value, options)
 
     def to_etree(self, data, options=None, name=None, depth=0):
         """
         Given some data, converts that data to an ``etree.Element`` suitable
         for use in the XML output.
         """
-        if isinstance(data, (list, tuple)):
+        if isinstance(data, STREAMABLE_TYPES):
             element = Element(name or 'objects')
             if name:
                 element = Element(name)
@@ -270,20 +658,13 @@ class Serializer(object):
             for field_name, field_object in data.data.items():
                 element.append(self.to_etree(field_object, options, name=field_name, depth=depth+1))
         elif hasattr(data, 'dehydrated_type'):
+            # See ``simple_dehydrated``.
             if getattr(data, 'dehydrated_type', None) == 'related' and data.is_m2m == False:
-                if data.full:
-                    return self.to_etree(data.fk_resource, options, name, depth+1)
-                else:
-                    return self.to_etree(data.value, options, name, depth+1)
+                return self.to_etree(data.value, options, name, depth+1)
             elif getattr(data, 'dehydrated_type', None) == 'related' and data.is_m2m == True:
-                if data.full:
-                    element = Element(name or 'objects')
-                    for bundle in data.m2m_bundles:
-                        element.append(self.to_etree(bundle, options, bundle.resource_name, depth+1))
-                else:
-                    element = Element(name or 'objects')
-                    for value in data.value:
-                        element.append(self.to_etree(value, options, name, depth=depth+1))
+                element = Element(name or 'objects')
+                for value in data.value:
+                    element.append(self.to_etree(value, options, name, depth=depth+1))
             else:
                 return self.to_etree(data.value, options, name)
         else:
@@ -293,7 +674,7 @@ class Serializer(object):
             if data_type != 'string':
                 element.set('type', get_type_string(simple_data))
             if data_type != 'null':
-                element.text = force_unicode(simple_data)
+                element.text = unicode(simple_data)
         return element
 
     def from_etree(self, data):
@@ -330,19 +711,143 @@ class Serializer(object):
             else:
                 return None
 
+    def json_items(self, data):
+        """
+        Returns the items of a ``dict`` in the order they should be output,
+        which is by key if ``sort_keys`` is enabled.
+        """
+        if self.sort_keys:
+            return sorted(data.iteritems())
+
+        return data.iteritems()
+
+    def json_key(self, key):
+        """
+        Encodes a ``dict`` key, coercing non-string keys the same way the
+        ``json`` module does.
+        """
+        if isinstance(key, basestring):
+            return self.json_backend.dumps(key)
+
+        if key is None or isinstance(key, (bool, int, long, float)):
+            return '"%s"' % self.json_backend.dumps(key)
+
+        raise TypeError("key %r is not a string" % (key,))
+
+    def encode_json(self, data, options):
+        """
+        Encodes a single piece of data (i.e. one object of a list) into a
+        JSON string.
+        """
+        return self.json_backend.dumps(self.to_simple(data, options))
+
+    def iter_json(self, data, options=None):
+        """
+        Given some Python data, yields the JSON output in chunks.
+
+        Rather than simplifying the whole response via ``to_simple`` up
+        front, lists (or generators) found at the top level (or directly
+        under it, like the ``objects`` of a list response) get simplified &
+        encoded a single item per chunk. Only one object's simplified form is
+        ever held in memory at a time.
+
+        Dictionary keys are sorted, unless ``sort_keys`` is disabled.
+        """
+        options = options or {}
+
+        if isinstance(data, Bundle):
+            data = data.data
+
+        if type(data) is dict:
+            yield '{'
+
+            for i, (key, value) in enumerate(self.json_items(data)):
+                yield '%s%s: ' % (i and ', ' or '', self.json_key(key))
+
+                if type(value) in STREAMABLE_TYPES:
+                    for chunk in self.iter_json_list(value, options):
+                        yield chunk
+                else:
+                    yield self.encode_json(value, options)
+
+            yield '}'
+        elif type(data) in STREAMABLE_TYPES:
+            for chunk in self.iter_json_list(data, options):
+                yield chunk
+        else:
+            yield self.encode_json(data, options)
+
+    def iter_json_list(self, data, options):
+        yield '['
+
+        for i, item in enumerate(data):
+            if i:
+                yield ', ' + self.encode_json(item, options)
+            else:
+                yield self.encode_json(item, options)
+
+        yield ']'
+
     def to_json(self, data, options=None):
         """
         Given some Python data, produces JSON output.
         """
-        options = options or {}
-        data = self.to_simple(data, options)
-        return simplejson.dumps(data, cls=DateTimeJSONEncoder, sort_keys=True)
+        return ''.join(self.iter_json(data, options))
 
     def from_json(self, content):
         """
         Given some JSON data, returns a Python dictionary of the decoded data.
         """
-        return simplejson.loads(content)
+        return self.json_backend.loads(content)
+
+    def from_json_stream(self, content):
+        """
+        Given some JSON data (a string or a file-like object), incrementally
+        deserializes it, a value at a time. See ``deserialize_stream``.
+
+        Only the ``objects`` (or ``rows``) array gets streamed. Every other
+        top-level value is decoded whole.
+        """
+        if isinstance(content, basestring):
+            content = StringIO(content)
+
+        data = {}
+        return self.build_stream(data, self.iter_json_stream(JSONStreamReader(content, self.json_backend), data))
+
+    def iter_json_stream(self, reader, data):
+        if reader.peek() == '[':
+            # A bare list of objects.
+            yield STREAM_START
+            yield 'objects'
+
+            for item in reader.iter_array():
+                yield item
+        else:
+            reader.expect('{')
+            streamed = False
+
+            if reader.peek() == '}':
+                reader.expect('}')
+            else:
+                while True:
+                    key = reader.decode()
+                    reader.expect(':')
+
+                    if key in STREAMED_KEYS and not streamed and reader.peek() == '[':
+                        streamed = True
+                        yield STREAM_START
+                        yield key
+
+                        for item in reader.iter_array():
+                            yield item
+                    else:
+                        data[key] = reader.decode()
+
+                    if reader.expect(',', '}') == '}':
+                        break
+
+        # As with ``json.loads``, nothing may follow the value.
+        reader.expect_end()
 
     def to_jsonp(self, data, options=None):
         """
@@ -352,6 +857,19 @@ class Serializer(object):
         options = options or {}
         return '%s(%s)' % (options['callback'], self.to_json(data, options))
 
+    def iter_jsonp(self, data, options=None):
+        """
+        Given some Python data, yields the JSON output wrapped in the provided
+        callback in chunks.
+        """
+        options = options or {}
+        yield '%s(' % options['callback']
+
+        for chunk in self.iter_json(data, options):
+            yield chunk
+
+        yield ')'
+
     def to_xml(self, data, options=None):
         """
         Given some Python data, produces XML output.
@@ -361,7 +879,128 @@ class Serializer(object):
         if lxml is None:
             raise ImproperlyConfigured("Usage of the XML aspects requires lxml.")
 
-        return tostring(self.to_etree(data, options), xml_declaration=True, encoding='utf-8')
+        if xmlfile is None:
+            return tostring(self.to_etree(data, options), xml_declaration=True, encoding='utf-8')
+
+        return ''.join(self.iter_xml(data, options))
+
+    def iter_xml(self, data, options=None):
+        """
+        Given some Python data, yields the XML output in chunks.
+
+        Writes the elements out incrementally (via lxml's ``xmlfile``),
+        straight from the data, rather than building up an element tree
+        first. Lists (or generators) at the top level or directly under it,
+        like the ``objects`` of a list response, get output a single item per
+        chunk.
+
+        The output matches that of ``to_etree`` (serialized), down to
+        empty elements being self-closed.
+        """
+        options = options or {}
+
+        if lxml is None:
+            raise ImproperlyConfigured("Usage of the XML aspects requires lxml.")
+
+        if xmlfile is None:
+            yield self.to_xml(data, options)
+            return
+
+        buffer = ChunkBuffer()
+
+        with xmlfile(buffer, encoding='utf-8') as xf:
+            xf.write_declaration()
+
+            if type(data) is dict and not data:
+                xf.write(Element('response'))
+            elif type(data) is dict:
+                with xf.element('response'):
+                    for key, value in data.iteritems():
+                        if type(value) in STREAMABLE_TYPES:
+                            items, empty = peek(value)
+
+                            if empty:
+                                xf.write(Element(key, {'type': 'list'}))
+                                continue
+
+                            with xf.element(key, {'type': 'list'}):
+                                for item in items:
+                                    self.write_xml(xf, item, options, depth=2)
+                                    xf.flush()
+                                    yield buffer.drain()
+                        else:
+                            self.write_xml(xf, value, options, name=key, depth=1)
+            elif type(data) in STREAMABLE_TYPES:
+                items, empty = peek(data)
+
+                if empty:
+                    xf.write(Element('objects'))
+                else:
+                    with xf.element('objects'):
+                        for item in items:
+                            self.write_xml(xf, item, options, depth=1)
+                            xf.flush()
+                            yield buffer.drain()
+            else:
+                self.write_xml(xf, data, options)
+
+        yield buffer.drain()
+
+    def write_xml(self, xf, data, options, name=None, depth=0):
+        """
+        Given some data, writes it out to an lxml ``xmlfile`` (``xf``) as XML
+        elements. The incremental equivalent of ``to_etree``.
+        """
+        if isinstance(data, STREAMABLE_TYPES):
+            if name:
+                attrib = {'type': 'list'}
+            else:
+                attrib = {}
+
+            items, empty = peek(data)
+
+            if empty:
+                xf.write(Element(name or 'objects', attrib))
+            else:
+                with xf.element(name or 'objects', attrib):
+                    for item in items:
+                        self.write_xml(xf, item, options, depth=depth+1)
+        elif isinstance(data, dict):
+            if depth == 0:
+                tag, attrib = name or 'response', {}
+            else:
+                tag, attrib = name or 'object', {'type': 'hash'}
+
+            if not data:
+                xf.write(Element(tag, attrib))
+            else:
+                with xf.element(tag, attrib):
+                    for (key, value) in data.iteritems():
+                        self.write_xml(xf, value, options, name=key, depth=depth+1)
+        elif isinstance(data, Bundle):
+            if not data.data:
+                xf.write(Element(name or 'object'))
+            else:
+                with xf.element(name or 'object'):
+                    for field_name, field_object in data.data.iteritems():
+                        self.write_xml(xf, field_object, options, name=field_name, depth=depth+1)
+        elif hasattr(data, 'dehydrated_type'):
+            xf.write(self.to_etree(data, options, name, depth))
+        else:
+            simple_data = self.to_simple(data, options)
+            data_type = get_type_string(simple_data)
+
+            if data_type == 'string':
+                attrib = {}
+            else:
+                attrib = {'type': data_type}
+
+            if data_type == 'null':
+                # Self-closed, as ``to_etree``'s would be.
+                xf.write(Element(name or 'value', attrib))
+            else:
+                with xf.element(name or 'value', attrib):
+                    xf.write(unicode(simple_data))
 
     def from_xml(self, content):
         """
@@ -372,6 +1011,57 @@ class Serializer(object):
 
         return self.from_etree(parse_xml(StringIO(content)).getroot())
 
+    def from_xml_stream(self, content):
+        """
+        Given some XML data (a string or a file-like object), incrementally
+        deserializes it via ``iterparse``. See ``deserialize_stream``.
+
+        Each element under the ``objects`` (or ``rows``) is discarded once
+        deserialized, so the full tree is never held in memory.
+        """
+        if lxml is None:
+            raise ImproperlyConfigured("Usage of the XML aspects requires lxml.")
+
+        if isinstance(content, basestring):
+            content = StringIO(content)
+
+        data = {}
+        return self.build_stream(data, self.iter_xml_stream(content, data))
+
+    def iter_xml_stream(self, source, data):
+        depth = 0
+        # The depth of the ``objects`` element, while inside it.
+        list_depth = None
+        seen_list = False
+
+        for event, element in iterparse(source, events=('start', 'end')):
+            if event == 'start':
+                depth += 1
+
+                if not seen_list:
+                    if (depth == 2 and element.tag in STREAMED_KEYS) or (depth == 1 and (element.tag == 'objects' or element.get('type') == 'list')):
+                        list_depth = depth
+                        seen_list = True
+                        yield STREAM_START
+                        yield depth == 2 and element.tag or 'objects'
+
+                continue
+
+            if list_depth is not None and depth == list_depth + 1:
+                yield self.from_etree(element)
+                element.clear()
+
+                # Drop the already-processed siblings too.
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+            elif depth == list_depth:
+                list_depth = None
+            elif depth == 2:
+                data[element.tag] = self.from_etree(element)
+                element.clear()
+
+            depth -= 1
+
     def to_yaml(self, data, options=None):
         """
         Given some Python data, produces YAML output.
@@ -412,6 +1102,51 @@ class Serializer(object):
 
         return biplist.readPlistFromString(content)
 
+    def to_msgpack(self, data, options=None):
+        """
+        Given some Python data, produces MessagePack output.
+
+        Dates, times, datetimes & decimals are encoded natively, as extension
+        types (see ``piecrust.utils.packing``), rather than as strings.
+        """
+        options = options or {}
+        default = lambda obj: self.simple_msgpack(obj, options)
+
+        if msgpack is None:
+            return Packer(default=default).packb(data)
+
+        return msgpack.packb(data, default=default, use_bin_type=False)
+
+    def simple_msgpack(self, obj, options):
+        """
+        Converts what MessagePack can't handle itself.
+
+        Types with a native encoding become extension types. Anything else
+        goes through ``to_simple``.
+        """
+        if isinstance(obj, Bundle):
+            return obj.data
+
+        if isinstance(obj, types.GeneratorType):
+            return list(obj)
+
+        ext = encode_ext(obj)
+
+        if ext is not None:
+            return msgpack.ExtType(*ext)
+
+        return self.to_simple(obj, options)
+
+    def from_msgpack(self, content):
+        """
+        Given some MessagePack data, returns a Python dictionary of the
+        decoded data.
+        """
+        if msgpack is None:
+            return Unpacker().unpackb(content)
+
+        return msgpack.unpackb(content, ext_hook=decode_ext, raw=False)
+
     def to_html(self, data, options=None):
         """
         Reserved for future usage.
@@ -433,6 +1168,207 @@ class Serializer(object):
         """
         pass
 
+
+class JSONStreamReader(object):
+    """
+    Reads JSON incrementally from a file-like object, in ``chunk_size``
+    pieces, decoding a value at a time (via the backend's ``raw_decode``).
+
+    Only the unconsumed part of the input is held onto. Before decoding an
+    object/array/string, it's scanned (incrementally, as chunks come in)
+    for where it ends, so it's decoded exactly once & malformed input is
+    reported as soon as it's been read, rather than after buffering the
+    rest of the stream.
+    """
+    whitespace = re.compile(r'[ \t\n\r]*')
+    # The characters that matter when scanning for the end of a value.
+    structural = re.compile(r'["\[\]{}]')
+    string_special = re.compile(r'["\\]')
+    scalar = re.compile(r'[^ \t\n\r,\]}]*')
+    closing = {']': '[', '}': '{'}
+
+    def __init__(self, source, backend, chunk_size=64 * 1024):
+        self.source = source
+        self.backend = backend
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def read_more(self):
+        """
+        Appends the next chunk of input to the buffer, dropping what's been
+        consumed. Returns ``False`` if there's no more input.
+        """
+        if self.eof:
+            return False
+
+        chunk = self.source.read(self.chunk_size)
+
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skips any whitespace & returns the next character (or ``''`` at the
+        end of the input), without consuming it.
+        """
+        while True:
+            if self.pos < len(self.buffer) and self.buffer[self.pos] not in ' \t\n\r':
+                return self.buffer[self.pos]
+
+            self.pos = self.whitespace.match(self.buffer, self.pos).end()
+
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+
+            if not self.read_more():
+                return ''
+
+    def expect(self, *chars):
+        """
+        Consumes the next character, which must be one of ``chars``.
+        """
+        char = self.peek()
+
+        if not char or char not in chars:
+            raise ValueError("Expected one of %s at position %d of the JSON stream." % (', '.join(repr(c) for c in chars), self.pos))
+
+        self.pos += 1
+        return char
+
+    def expect_end(self):
+        """
+        Checks there's nothing but whitespace left of the input.
+        """
+        if self.peek():
+            raise ValueError("Extra data at position %d of the JSON stream." % self.pos)
+
+    def decode(self):
+        """
+        Decodes & consumes the next value.
+        """
+        if self.peek() in ('{', '[', '"'):
+            self.scan()
+        else:
+            # A scalar (i.e. a number) running to the end of the buffer may
+            # continue in the next chunk.
+            while self.scalar.match(self.buffer, self.pos).end() == len(self.buffer) and self.read_more():
+                pass
+
+        value, self.pos = self.backend.raw_decode(self.buffer, self.pos)
+        return value
+
+    def scan(self):
+        """
+        Reads until the buffer holds the whole object/array/string starting
+        at the current position, tracking strings & nesting.
+
+        Raises ``ValueError`` on mismatched brackets, or if the input ends
+        first.
+        """
+        # Kept relative to ``pos``, as ``read_more`` moves the buffer.
+        offset = 1
+        stack = []
+        in_string = self.buffer[self.pos] == '"'
+
+        if not in_string:
+            stack.append(self.buffer[self.pos])
+
+        while True:
+            pattern = in_string and self.string_special or self.structural
+            match = pattern.search(self.buffer, self.pos + offset)
+
+            # An escape at the very end needs the next character too.
+            if match is None or (match.group() == '\\' and match.end() == len(self.buffer)):
+                if match is None:
+                    offset = len(self.buffer) - self.pos
+                else:
+                    offset = match.start() - self.pos
+
+                if not self.read_more():
+                    raise ValueError("Unexpected end of the JSON stream.")
+
+                continue
+
+            char = match.group()
+            offset = match.end() - self.pos
+
+            if in_string:
+                if char == '\\':
+                    # Skip the escaped character.
+                    offset += 1
+                    continue
+
+                in_string = False
+            elif char == '"':
+                in_string = True
+                continue
+            elif char in self.closing:
+                if not stack or stack.pop() != self.closing[char]:
+                    raise ValueError("Unexpected %r at position %d of the JSON stream." % (char, match.start()))
+            else:
+                stack.append(char)
+                continue
+
+            if not stack:
+                return
+
+    def iter_array(self):
+        """
+        Consumes an array, yielding the values in it one at a time.
+        """
+        self.expect('[')
+
+        if self.peek() == ']':
+            self.pos += 1
+            return
+
+        while True:
+            yield self.decode()
+
+            if self.expect(',', ']') == ']':
+                return
+
+
+class ChunkBuffer(object):
+    """
+    A file-like object collecting the chunks written to it, until they're
+    ``drain``-ed.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def drain(self):
+        """
+        Returns (& forgets) everything written since the last ``drain``.
+        """
+        data = ''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def peek(items):
+    """
+    Returns an iterator over ``items`` (which may be a generator) & whether
+    it's empty, consuming no more than the first item to find out.
+    """
+    items = iter(items)
+
+    for first in items:
+        return itertools.chain([first], items), False
+
+    return items, True
+
+
 def get_type_string(data):
     """
     Translates a Python data type into a string format.
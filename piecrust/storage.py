@@ -24,3 +24,61 @@ class BaseStorage(object):
 
     def rollback(self, bundles):
         raise NotImplementedError()
+
+
+class CountingStorage(BaseStorage):
+    """
+    Wraps another storage, counting the calls made through it.
+
+    Useful for keeping an eye on (or asserting in tests) how many round
+    trips to the data store a request takes. Call ``reset`` at the start of
+    each request.
+    """
+    def __init__(self, storage):
+        self.storage = storage
+        self.calls = {}
+
+    @property
+    def total(self):
+        """
+        The total number of calls made since the last ``reset``.
+        """
+        return sum(self.calls.values())
+
+    def reset(self):
+        self.calls = {}
+
+    def count(self, method_name):
+        self.calls[method_name] = self.calls.get(method_name, 0) + 1
+
+    def all_objects(self, request):
+        self.count('all_objects')
+        return self.storage.all_objects(request)
+
+    def list(self, **kwargs):
+        self.count('list')
+        return self.storage.list(**kwargs)
+
+    def single(self, **kwargs):
+        self.count('single')
+        return self.storage.single(**kwargs)
+
+    def create(self, **kwargs):
+        self.count('create')
+        return self.storage.create(**kwargs)
+
+    def update(self, **kwargs):
+        self.count('update')
+        return self.storage.update(**kwargs)
+
+    def delete_list(self, **kwargs):
+        self.count('delete_list')
+        return self.storage.delete_list(**kwargs)
+
+    def delete_single(self, **kwargs):
+        self.count('delete_single')
+        return self.storage.delete_single(**kwargs)
+
+    def rollback(self, bundles):
+        self.count('rollback')
+        return self.storage.rollback(bundles)
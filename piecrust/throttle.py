@@ -1,3 +1,8 @@
+import math
+import time
+from piecrust.cache import LocalCache
+
+
 class BaseThrottle(object):
     """
     A simplified, swappable base class for throttling.
@@ -56,3 +61,138 @@ class BaseThrottle(object):
         Does nothing in this implementation.
         """
         pass
+
+
+class CacheThrottle(BaseThrottle):
+    """
+    A base class for throttles that keep their state in a (piecrust) cache,
+    holding a fixed amount of it per identifier, rather than a list of
+    access times.
+
+    On top of the ``BaseThrottle`` kwargs, accepts an optional ``cache``.
+    Default is an unbounded ``LocalCache``, as evicting an identifier's
+    state would let it off its throttle. That only throttles within the
+    process & holds state for every identifier seen (until it expires), so
+    to throttle across processes, pass a shared cache (i.e. a
+    ``MemcacheCache``), ideally one that increments atomically. Any cache
+    with a size limit should have room for all the active identifiers.
+
+    Cached state is only kept for as long as it's needed, capped at the
+    ``expiration``.
+    """
+    def __init__(self, throttle_at=150, timeframe=3600, expiration=None, cache=None):
+        super(CacheThrottle, self).__init__(throttle_at=throttle_at, timeframe=timeframe, expiration=expiration)
+
+        if cache is None:
+            cache = LocalCache(max_entries=None)
+
+        self.cache = cache
+
+    def get_time(self):
+        """
+        Returns the current time (in seconds). A hook for testing.
+        """
+        return time.time()
+
+    def get_timeout(self, timeout):
+        """
+        Caps a ``timeout`` (in seconds) at the ``expiration``.
+        """
+        return max(min(int(math.ceil(timeout)), self.expiration), 1)
+
+    def get_window(self, now):
+        """
+        Returns the number of the ``timeframe``-long window ``now`` falls in.
+        """
+        return int(now // self.timeframe)
+
+    def get_window_key(self, identifier, window):
+        return "%s:%d" % (self.convert_identifier_to_key(identifier), window)
+
+
+class FixedWindowThrottle(CacheThrottle):
+    """
+    Allows up to ``throttle_at`` requests per ``timeframe``, counted in
+    fixed windows (i.e. on the hour, for the default hour ``timeframe``).
+
+    Needs a single counter per identifier, but allows bursts of up to twice
+    ``throttle_at`` around the edge of a window.
+    """
+    def should_be_throttled(self, identifier, **kwargs):
+        window = self.get_window(self.get_time())
+        accesses = self.cache.get(self.get_window_key(identifier, window)) or 0
+        return accesses >= self.throttle_at
+
+    def accessed(self, identifier, **kwargs):
+        window = self.get_window(self.get_time())
+        self.cache.incr(self.get_window_key(identifier, window), timeout=self.get_timeout(self.timeframe))
+
+
+class SlidingWindowThrottle(CacheThrottle):
+    """
+    Allows up to ``throttle_at`` requests in any ``timeframe``, give or
+    take.
+
+    Counts requests in fixed windows, like the ``FixedWindowThrottle``, but
+    estimates the count over the last ``timeframe`` seconds as the current
+    window's count plus the share of the previous window's count that's
+    still in range (assuming its requests were evenly spread). Needs two
+    counters per identifier & smooths out the bursts around window edges.
+    """
+    def get_accesses(self, identifier, now):
+        """
+        Returns the estimated number of accesses in the ``timeframe`` up to
+        ``now``.
+        """
+        window = self.get_window(now)
+        current_key = self.get_window_key(identifier, window)
+        previous_key = self.get_window_key(identifier, window - 1)
+        counts = self.cache.get_many([current_key, previous_key])
+        elapsed = (now - window * self.timeframe) / float(self.timeframe)
+        return counts.get(current_key, 0) + counts.get(previous_key, 0) * (1.0 - elapsed)
+
+    def should_be_throttled(self, identifier, **kwargs):
+        return self.get_accesses(identifier, self.get_time()) >= self.throttle_at
+
+    def accessed(self, identifier, **kwargs):
+        window = self.get_window(self.get_time())
+        # Counts are still needed throughout the following window.
+        self.cache.incr(self.get_window_key(identifier, window), timeout=self.get_timeout(2 * self.timeframe))
+
+
+class TokenBucketThrottle(CacheThrottle):
+    """
+    Gives each identifier a bucket of ``throttle_at`` tokens, which refills
+    at a steady ``throttle_at`` tokens per ``timeframe``. Each request takes
+    a token & the user is throttled while the bucket is empty.
+
+    So up to ``throttle_at`` requests can be made in a burst, after which
+    they're limited to the refill rate. Stores the token count & the time it
+    was taken at per identifier.
+
+    As the cache API has no compare-and-set, concurrent requests from the
+    same identifier may occasionally both take the same token.
+    """
+    def get_tokens(self, identifier, now):
+        """
+        Returns the number of tokens in the identifier's bucket at ``now``.
+        """
+        state = self.cache.get(self.convert_identifier_to_key(identifier))
+
+        if state is None:
+            return float(self.throttle_at)
+
+        tokens, updated = state
+        refilled = (now - updated) * self.throttle_at / float(self.timeframe)
+        return min(float(self.throttle_at), tokens + max(refilled, 0.0))
+
+    def should_be_throttled(self, identifier, **kwargs):
+        return self.get_tokens(identifier, self.get_time()) < 1.0
+
+    def accessed(self, identifier, **kwargs):
+        now = self.get_time()
+        tokens = max(self.get_tokens(identifier, now) - 1.0, 0.0)
+        # Once it's had time to refill, a missing bucket is the same as a
+        # full one.
+        refill_time = (self.throttle_at - tokens) * self.timeframe / float(self.throttle_at)
+        self.cache.set(self.convert_identifier_to_key(identifier), (tokens, now), timeout=self.get_timeout(refill_time))
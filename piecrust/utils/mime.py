@@ -1,9 +1,48 @@
 import mimeparse
+from piecrust.utils.lru import LRUCache
+
+
+# The results of ``determine_format``. Clients tend to send the same few
+# ``Accept`` headers over & over, so this spares most requests the
+# negotiation.
+format_cache = LRUCache(max_size=256)
 
 
 def determine_format(request, serializer, default_format='application/json'):
     """
     Tries to "smartly" determine which output format is desired.
+
+    The result is cached (in ``format_cache``) by serializer, ``format`` &
+    ``callback`` parameters and ``Accept`` header. See
+    ``negotiate_format`` for how it's worked out. Serializers without a
+    ``format_index_version`` (i.e. ones that don't subclass ``Serializer``)
+    can't say when their formats change, so aren't cached.
+    """
+    format_index_version = getattr(serializer, 'format_index_version', None)
+
+    if format_index_version is None:
+        return negotiate_format(request, serializer, default_format=default_format)
+
+    cache_key = (
+        serializer,
+        format_index_version,
+        request.GET.get('format'),
+        'callback' in request.GET,
+        request.META.get('HTTP_ACCEPT', '*/*'),
+        default_format,
+    )
+    desired_format = format_cache.get(cache_key)
+
+    if desired_format is None:
+        desired_format = negotiate_format(request, serializer, default_format=default_format)
+        format_cache.set(cache_key, desired_format)
+
+    return desired_format
+
+
+def negotiate_format(request, serializer, default_format='application/json'):
+    """
+    Works out which output format is desired (uncached).
     
     First attempts to find a ``format`` override from the request and supplies
     that if found.
@@ -25,11 +64,13 @@ def determine_format(request, serializer, default_format='application/json'):
     
     # Try to fallback on the Accepts header.
     if request.META.get('HTTP_ACCEPT', '*/*') != '*/*':
-        formats = list(serializer.supported_formats) or []
-        # Reverse the list, because mimeparse is weird like that. See also
-        # https://github.com/toastdriven/django-tastypie/issues#issue/12 for
-        # more information.
-        formats.reverse()
+        # Already reversed (on a ``Serializer``), because mimeparse is weird
+        # like that.
+        formats = getattr(serializer, 'best_match_formats', None)
+
+        if formats is None:
+            formats = list(reversed(serializer.supported_formats))
+
         best_format = mimeparse.best_match(formats, request.META['HTTP_ACCEPT'])
         
         if best_format:
@@ -0,0 +1,401 @@
+"""
+A pure-Python implementation of (the parts of) MessagePack the ``Serializer``
+needs, used when the ``msgpack`` package isn't installed.
+
+Also defines the extension types used to encode dates/times & decimals
+natively, which are shared with the ``msgpack``-backed path.
+"""
+import datetime
+import decimal
+import struct
+
+
+# Extension type codes.
+EXT_DATETIME = 1
+EXT_DATE = 2
+EXT_TIME = 3
+EXT_DECIMAL = 4
+
+
+class FixedOffset(datetime.tzinfo):
+    """
+    A fixed offset (in minutes) from UTC, for decoding timezone-aware
+    datetimes/times.
+    """
+    def __init__(self, minutes):
+        self.minutes = minutes
+        self.offset = datetime.timedelta(minutes=minutes)
+
+    def __repr__(self):
+        return '<FixedOffset %+d>' % self.minutes
+
+    def utcoffset(self, dt):
+        return self.offset
+
+    def dst(self, dt):
+        return datetime.timedelta(0)
+
+    def tzname(self, dt):
+        return None
+
+
+def get_offset(value):
+    """
+    Returns the UTC offset of a datetime/time in minutes, or ``None`` if it's
+    naive.
+    """
+    offset = value.utcoffset()
+
+    if offset is None:
+        return None
+
+    return offset.days * 1440 + offset.seconds // 60
+
+
+def encode_ext(obj):
+    """
+    Encodes a date/time/decimal value as an ``(ext_code, payload)`` tuple.
+
+    Returns ``None`` for anything else.
+    """
+    if isinstance(obj, datetime.datetime):
+        payload = struct.pack('>HBBBBBI', obj.year, obj.month, obj.day, obj.hour, obj.minute, obj.second, obj.microsecond)
+        offset = get_offset(obj)
+
+        if offset is not None:
+            payload += struct.pack('>h', offset)
+
+        return EXT_DATETIME, payload
+
+    if isinstance(obj, datetime.date):
+        return EXT_DATE, struct.pack('>HBB', obj.year, obj.month, obj.day)
+
+    if isinstance(obj, datetime.time):
+        payload = struct.pack('>BBBI', obj.hour, obj.minute, obj.second, obj.microsecond)
+        offset = get_offset(obj)
+
+        if offset is not None:
+            payload += struct.pack('>h', offset)
+
+        return EXT_TIME, payload
+
+    if isinstance(obj, decimal.Decimal):
+        return EXT_DECIMAL, str(obj)
+
+    return None
+
+
+def decode_ext(code, payload):
+    """
+    The reverse of ``encode_ext``.
+
+    Unknown extension types are returned as an ``(ext_code, payload)`` tuple.
+    """
+    if code == EXT_DATETIME:
+        tzinfo = None
+
+        if len(payload) > 11:
+            tzinfo = FixedOffset(struct.unpack('>h', payload[11:13])[0])
+
+        return datetime.datetime(*struct.unpack('>HBBBBBI', payload[:11]), tzinfo=tzinfo)
+
+    if code == EXT_DATE:
+        return datetime.date(*struct.unpack('>HBB', payload))
+
+    if code == EXT_TIME:
+        tzinfo = None
+
+        if len(payload) > 7:
+            tzinfo = FixedOffset(struct.unpack('>h', payload[7:9])[0])
+
+        return datetime.time(*struct.unpack('>BBBI', payload[:7]), tzinfo=tzinfo)
+
+    if code == EXT_DECIMAL:
+        return decimal.Decimal(payload)
+
+    return code, payload
+
+
+class Packer(object):
+    """
+    Encodes data as MessagePack.
+
+    Handles ``None``, booleans, integers, floats, strings, lists/tuples,
+    dicts & the ``encode_ext`` types. Anything else is handed to
+    ``default``, which should return something that can be packed.
+    """
+    def __init__(self, default=None):
+        self.default = default
+        self.dispatch = {
+            type(None): self.pack_nil,
+            bool: self.pack_bool,
+            int: self.pack_int,
+            long: self.pack_int,
+            float: self.pack_float,
+            unicode: self.pack_unicode,
+            str: self.pack_str,
+            list: self.pack_array,
+            tuple: self.pack_array,
+            dict: self.pack_map,
+        }
+
+    def packb(self, data):
+        parts = []
+        self.pack(data, parts)
+        return ''.join(parts)
+
+    def pack(self, data, parts):
+        try:
+            packer = self.dispatch[type(data)]
+        except KeyError:
+            packer = self.find_packer(type(data))
+
+            if packer is None:
+                ext = encode_ext(data)
+
+                if ext is not None:
+                    return self.pack_ext(ext[0], ext[1], parts)
+
+                if self.default is None:
+                    raise TypeError("%r is not MessagePack serializable" % (data,))
+
+                simple = self.default(data)
+
+                if type(simple) is type(data):
+                    raise TypeError("%r is not MessagePack serializable" % (data,))
+
+                return self.pack(simple, parts)
+
+        packer(data, parts)
+
+    def find_packer(self, data_type):
+        """
+        Looks up the packer for a subclass of one of the packable types
+        (i.e. a ``unicode`` subclass like Django's ``SafeText``), by walking
+        its MRO. Found packers are remembered.
+
+        Returns ``None`` if there isn't one.
+        """
+        for base in data_type.__mro__[1:]:
+            packer = self.dispatch.get(base)
+
+            if packer is not None:
+                self.dispatch[data_type] = packer
+                return packer
+
+        return None
+
+    def pack_nil(self, data, parts):
+        parts.append('\xc0')
+
+    def pack_bool(self, data, parts):
+        parts.append(data and '\xc3' or '\xc2')
+
+    def pack_int(self, data, parts):
+        if 0 <= data < 0x80:
+            parts.append(chr(data))
+        elif -0x20 <= data < 0:
+            parts.append(struct.pack('>b', data))
+        elif 0 <= data <= 0xff:
+            parts.append(struct.pack('>BB', 0xcc, data))
+        elif 0 <= data <= 0xffff:
+            parts.append(struct.pack('>BH', 0xcd, data))
+        elif 0 <= data <= 0xffffffff:
+            parts.append(struct.pack('>BI', 0xce, data))
+        elif 0 <= data <= 0xffffffffffffffff:
+            parts.append(struct.pack('>BQ', 0xcf, data))
+        elif -0x80 <= data < 0:
+            parts.append(struct.pack('>Bb', 0xd0, data))
+        elif -0x8000 <= data < 0:
+            parts.append(struct.pack('>Bh', 0xd1, data))
+        elif -0x80000000 <= data < 0:
+            parts.append(struct.pack('>Bi', 0xd2, data))
+        elif -0x8000000000000000 <= data < 0:
+            parts.append(struct.pack('>Bq', 0xd3, data))
+        else:
+            raise OverflowError("%d is too large to be packed as MessagePack." % data)
+
+    def pack_float(self, data, parts):
+        parts.append(struct.pack('>Bd', 0xcb, data))
+
+    def pack_unicode(self, data, parts):
+        self.pack_str(data.encode('utf-8'), parts)
+
+    def pack_str(self, data, parts):
+        length = len(data)
+
+        if length < 32:
+            parts.append(chr(0xa0 | length))
+        elif length <= 0xff:
+            parts.append(struct.pack('>BB', 0xd9, length))
+        elif length <= 0xffff:
+            parts.append(struct.pack('>BH', 0xda, length))
+        else:
+            parts.append(struct.pack('>BI', 0xdb, length))
+
+        parts.append(data)
+
+    def pack_array(self, data, parts):
+        length = len(data)
+
+        if length < 16:
+            parts.append(chr(0x90 | length))
+        elif length <= 0xffff:
+            parts.append(struct.pack('>BH', 0xdc, length))
+        else:
+            parts.append(struct.pack('>BI', 0xdd, length))
+
+        for item in data:
+            self.pack(item, parts)
+
+    def pack_map(self, data, parts):
+        length = len(data)
+
+        if length < 16:
+            parts.append(chr(0x80 | length))
+        elif length <= 0xffff:
+            parts.append(struct.pack('>BH', 0xde, length))
+        else:
+            parts.append(struct.pack('>BI', 0xdf, length))
+
+        for key, value in data.iteritems():
+            self.pack(key, parts)
+            self.pack(value, parts)
+
+    def pack_ext(self, code, payload, parts):
+        length = len(payload)
+
+        if length in (1, 2, 4, 8, 16):
+            parts.append(struct.pack('>Bb', {1: 0xd4, 2: 0xd5, 4: 0xd6, 8: 0xd7, 16: 0xd8}[length], code))
+        elif length <= 0xff:
+            parts.append(struct.pack('>BBb', 0xc7, length, code))
+        elif length <= 0xffff:
+            parts.append(struct.pack('>BHb', 0xc8, length, code))
+        else:
+            parts.append(struct.pack('>BIb', 0xc9, length, code))
+
+        parts.append(payload)
+
+
+# The fixed-size formats, as ``first byte -> (struct format, size)``.
+FIXED_FORMATS = {
+    0xca: ('>f', 4),
+    0xcb: ('>d', 8),
+    0xcc: ('>B', 1),
+    0xcd: ('>H', 2),
+    0xce: ('>I', 4),
+    0xcf: ('>Q', 8),
+    0xd0: ('>b', 1),
+    0xd1: ('>h', 2),
+    0xd2: ('>i', 4),
+    0xd3: ('>q', 8),
+}
+
+
+class Unpacker(object):
+    """
+    Decodes MessagePack, the reverse of the ``Packer``.
+
+    Strings are decoded to ``unicode``, binary data is left as ``str`` &
+    extension types are handed to ``ext_hook`` (``decode_ext`` by default).
+    """
+    def __init__(self, ext_hook=decode_ext):
+        self.ext_hook = ext_hook
+
+    def unpackb(self, content):
+        value, pos = self.unpack(content, 0)
+
+        if pos != len(content):
+            raise ValueError("Extra data after the MessagePack value.")
+
+        return value
+
+    def unpack(self, content, pos):
+        """
+        Decodes the value starting at ``pos``, returning it & the position
+        just past it.
+        """
+        try:
+            byte = ord(content[pos])
+        except IndexError:
+            raise ValueError("Unexpected end of MessagePack data.")
+
+        pos += 1
+
+        if byte < 0x80:
+            return byte, pos
+        if byte >= 0xe0:
+            return byte - 0x100, pos
+        if byte < 0x90:
+            return self.unpack_map(content, pos, byte & 0x0f)
+        if byte < 0xa0:
+            return self.unpack_array(content, pos, byte & 0x0f)
+        if byte < 0xc0:
+            return self.unpack_str(content, pos, byte & 0x1f)
+        if byte == 0xc0:
+            return None, pos
+        if byte == 0xc2:
+            return False, pos
+        if byte == 0xc3:
+            return True, pos
+        if byte in FIXED_FORMATS:
+            format, size = FIXED_FORMATS[byte]
+            return struct.unpack_from(format, content, pos)[0], pos + size
+        if byte in (0xd9, 0xda, 0xdb):
+            length, pos = self.unpack_length(content, pos, byte - 0xd9)
+            return self.unpack_str(content, pos, length)
+        if byte in (0xc4, 0xc5, 0xc6):
+            length, pos = self.unpack_length(content, pos, byte - 0xc4)
+            return self.unpack_bytes(content, pos, length)
+        if byte in (0xdc, 0xdd):
+            length, pos = self.unpack_length(content, pos, byte - 0xdb)
+            return self.unpack_array(content, pos, length)
+        if byte in (0xde, 0xdf):
+            length, pos = self.unpack_length(content, pos, byte - 0xdd)
+            return self.unpack_map(content, pos, length)
+        if 0xd4 <= byte <= 0xd8:
+            return self.unpack_ext(content, pos, 1 << (byte - 0xd4))
+        if byte in (0xc7, 0xc8, 0xc9):
+            length, pos = self.unpack_length(content, pos, byte - 0xc7)
+            return self.unpack_ext(content, pos, length)
+
+        raise ValueError("Unknown MessagePack type 0x%02x." % byte)
+
+    def unpack_length(self, content, pos, size_index):
+        format, size = (('>B', 1), ('>H', 2), ('>I', 4))[size_index]
+        return struct.unpack_from(format, content, pos)[0], pos + size
+
+    def unpack_bytes(self, content, pos, length):
+        end = pos + length
+
+        if end > len(content):
+            raise ValueError("Unexpected end of MessagePack data.")
+
+        return content[pos:end], end
+
+    def unpack_str(self, content, pos, length):
+        data, pos = self.unpack_bytes(content, pos, length)
+        return data.decode('utf-8'), pos
+
+    def unpack_array(self, content, pos, length):
+        items = []
+
+        for i in xrange(length):
+            item, pos = self.unpack(content, pos)
+            items.append(item)
+
+        return items, pos
+
+    def unpack_map(self, content, pos, length):
+        data = {}
+
+        for i in xrange(length):
+            key, pos = self.unpack(content, pos)
+            data[key], pos = self.unpack(content, pos)
+
+        return data, pos
+
+    def unpack_ext(self, content, pos, length):
+        code = struct.unpack_from('>b', content, pos)[0]
+        payload, pos = self.unpack_bytes(content, pos + 1, length)
+        return self.ext_hook(code, payload), pos
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+"""
+Compares the MessagePack format against JSON on a list response of
+dehydrated bundles: output size, encode (``to_*``) & decode (``from_*``)
+time.
+
+MessagePack is measured both with the ``msgpack`` package (if installed) &
+with the pure-Python fallback.
+
+Run directly (``python tests/benchmarks/binary.py``) with ``piecrust``
+importable.
+"""
+import datetime
+import decimal
+import timeit
+from piecrust import serializers
+from piecrust.bundle import Bundle
+from piecrust.http import RequestWrapper
+from piecrust.serializers import Serializer
+
+
+OBJECT_COUNT = 2000
+REPEAT = 5
+NUMBER = 5
+
+
+def build_fixture(request):
+    bundles = []
+
+    for pk in range(OBJECT_COUNT):
+        bundles.append(Bundle(data={
+            'id': pk,
+            'resource_uri': '/api/v1/entries/%s/' % pk,
+            'title': u'Entry #%s' % pk,
+            'body': u'Lorem ipsum dolor sit amet. ' * 4,
+            'rating': pk / 7.0,
+            'price': decimal.Decimal('%s.50' % pk),
+            'is_active': bool(pk % 2),
+            'created': datetime.datetime(2012, 1, 1, 12, 30),
+            'published': datetime.date(2012, 1, 2),
+            'excerpt': None,
+            'tags': [u'tag-%s' % (pk % 5), u'tag-%s' % (pk % 7)],
+            'author': {'name': u'Author %s' % (pk % 10), 'resource_uri': '/api/v1/authors/%s/' % (pk % 10)},
+        }, request=request))
+
+    return {
+        'meta': {'limit': OBJECT_COUNT, 'offset': 0, 'total_count': OBJECT_COUNT},
+        'objects': bundles,
+    }
+
+
+def measure(name, serializer, format, data):
+    encode = getattr(serializer, 'to_%s' % format)
+    decode = getattr(serializer, 'from_%s' % format)
+    content = encode(data)
+    encode_time = min(timeit.Timer(lambda: encode(data)).repeat(repeat=REPEAT, number=NUMBER))
+    decode_time = min(timeit.Timer(lambda: decode(content)).repeat(repeat=REPEAT, number=NUMBER))
+    print "%s: %d bytes, encode %.2f usec/object, decode %.2f usec/object (%d objects)" % (
+        name,
+        len(content),
+        encode_time / (NUMBER * OBJECT_COUNT) * 1e6,
+        decode_time / (NUMBER * OBJECT_COUNT) * 1e6,
+        OBJECT_COUNT
+    )
+
+
+def main():
+    serializer = Serializer()
+    data = build_fixture(RequestWrapper(None))
+    measure('json', serializer, 'json', data)
+
+    if serializers.msgpack is not None:
+        measure('msgpack', serializer, 'msgpack', data)
+
+    # Force the pure-Python fallback.
+    msgpack, serializers.msgpack = serializers.msgpack, None
+
+    try:
+        measure('msgpack (pure-Python)', serializer, 'msgpack', data)
+    finally:
+        serializers.msgpack = msgpack
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Measures the per-object cost of ``Resource.full_dehydrate`` (one object at a
+time) & ``Resource.full_dehydrate_many`` (a whole page, column-wise), as well
+as the cost of instantiating the ``Resource``.
+
+Run directly (``python tests/benchmarks/dehydration.py``) with ``piecrust``
+importable. Prints the average time spent dehydrating a single object from a
+500-object page.
+"""
+import datetime
+import timeit
+from piecrust import fields
+from piecrust.http import RequestWrapper
+from piecrust.resources import Resource
+
+
+PAGE_SIZE = 500
+REPEAT = 5
+NUMBER = 20
+
+
+class Author(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class Entry(object):
+    def __init__(self, pk):
+        self.pk = pk
+        self.title = u'Entry #%s' % pk
+        self.slug = 'entry-%s' % pk
+        self.body = u'Lorem ipsum dolor sit amet. ' * 4
+        self.view_count = pk * 3
+        self.rating = pk / 7.0
+        self.is_active = bool(pk % 2)
+        self.created = datetime.datetime(2012, 1, 1, 12, 30)
+        self.author = Author(u'Author %s' % (pk % 10))
+
+
+class EntryResource(Resource):
+    id = fields.IntegerField(attribute='pk')
+    title = fields.CharField(attribute='title')
+    slug = fields.CharField(attribute='slug')
+    body = fields.CharField(attribute='body')
+    view_count = fields.IntegerField(attribute='view_count', default=0)
+    rating = fields.FloatField(attribute='rating')
+    is_active = fields.BooleanField(attribute='is_active')
+    created = fields.DateTimeField(attribute='created')
+    author_name = fields.CharField(attribute='author__name')
+    excerpt = fields.CharField(null=True)
+
+    class Meta:
+        resource_name = 'entries'
+        object_class = Entry
+        include_resource_uri = False
+
+    def dehydrate_excerpt(self, bundle):
+        return bundle.data['body'][:20]
+
+
+def dehydrate_page(resource, objects, request):
+    bundles = [resource.build_bundle(obj=obj, request=request) for obj in objects]
+    return [resource.full_dehydrate(bundle) for bundle in bundles]
+
+
+def dehydrate_page_many(resource, objects, request):
+    bundles = [resource.build_bundle(obj=obj, request=request) for obj in objects]
+    return resource.full_dehydrate_many(bundles)
+
+
+def main():
+    best = min(timeit.Timer(EntryResource).repeat(repeat=REPEAT, number=NUMBER * 100))
+    print "Resource(): %.2f usec" % (best / (NUMBER * 100) * 1e6)
+
+    resource = EntryResource()
+    objects = [Entry(pk) for pk in range(PAGE_SIZE)]
+    request = RequestWrapper(None)
+
+    for name, func in (('full_dehydrate', dehydrate_page), ('full_dehydrate_many', dehydrate_page_many)):
+        timer = timeit.Timer(lambda: func(resource, objects, request))
+        best = min(timer.repeat(repeat=REPEAT, number=NUMBER))
+        per_object = best / (NUMBER * PAGE_SIZE)
+        print "%s: %.2f usec/object (%d fields, %d objects/page)" % (name, per_object * 1e6, len(resource.fields), PAGE_SIZE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+Compares the available JSON backends, encoding (``Serializer.to_json``) &
+decoding (``Serializer.from_json``) a list response of dehydrated bundles.
+
+Run directly (``python tests/benchmarks/json_backends.py``) with ``piecrust``
+importable. Backends whose library isn't installed are skipped.
+"""
+import datetime
+import decimal
+import timeit
+from piecrust.bundle import Bundle
+from piecrust.http import RequestWrapper
+from piecrust.serializers import Serializer, SimpleJSONBackend, StdlibJSONBackend, UJSONBackend
+
+
+OBJECT_COUNT = 2000
+REPEAT = 5
+NUMBER = 5
+
+
+def build_fixture(request):
+    bundles = []
+
+    for pk in range(OBJECT_COUNT):
+        bundles.append(Bundle(data={
+            'id': pk,
+            'resource_uri': '/api/v1/entries/%s/' % pk,
+            'title': u'Entry #%s \u2603' % pk,
+            'body': u'Lorem ipsum dolor sit amet. ' * 4,
+            'rating': pk / 7.0,
+            'price': decimal.Decimal('%s.50' % pk),
+            'is_active': bool(pk % 2),
+            'created': datetime.datetime(2012, 1, 1, 12, 30),
+            'excerpt': None,
+            'tags': [u'tag-%s' % (pk % 5), u'tag-%s' % (pk % 7)],
+            'author': {'name': u'Author %s' % (pk % 10), 'resource_uri': '/api/v1/authors/%s/' % (pk % 10)},
+        }, request=request))
+
+    return {
+        'meta': {'limit': OBJECT_COUNT, 'offset': 0, 'total_count': OBJECT_COUNT},
+        'objects': bundles,
+    }
+
+
+def main():
+    data = build_fixture(RequestWrapper(None))
+
+    for backend_class in (StdlibJSONBackend, SimpleJSONBackend, UJSONBackend):
+        if not backend_class.is_available():
+            print "%s: not available" % backend_class.__name__
+            continue
+
+        serializer = Serializer(json_backend_class=backend_class)
+        content = serializer.to_json(data)
+        encode = min(timeit.Timer(lambda: serializer.to_json(data)).repeat(repeat=REPEAT, number=NUMBER))
+        decode = min(timeit.Timer(lambda: serializer.from_json(content)).repeat(repeat=REPEAT, number=NUMBER))
+        print "%s: to_json %.2f usec/object, from_json %.2f usec/object (%d objects)" % (
+            backend_class.__name__,
+            encode / (NUMBER * OBJECT_COUNT) * 1e6,
+            decode / (NUMBER * OBJECT_COUNT) * 1e6,
+            OBJECT_COUNT
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+"""
+Measures the cost of ``Serializer.to_simple`` & ``Serializer.to_json`` over a
+page of dehydrated bundles, each holding a mix of nested dicts, lists &
+date/time values. ``to_json`` is compared against simplifying the whole page
+first & dumping that (the two-pass approach).
+
+Run directly (``python tests/benchmarks/serialization.py``) with ``piecrust``
+importable. Prints the average time spent simplifying a single object from a
+10,000-object fixture.
+"""
+import datetime
+import decimal
+import timeit
+from piecrust.bundle import Bundle
+from piecrust.http import RequestWrapper
+from piecrust.serializers import DateTimeJSONEncoder, Serializer, simplejson
+
+
+OBJECT_COUNT = 10000
+REPEAT = 5
+NUMBER = 3
+
+
+def build_fixture(request):
+    bundles = []
+
+    for pk in range(OBJECT_COUNT):
+        bundles.append(Bundle(data={
+            'id': pk,
+            'title': u'Entry #%s' % pk,
+            'slug': 'entry-%s' % pk,
+            'rating': pk / 7.0,
+            'price': decimal.Decimal('%s.50' % pk),
+            'is_active': bool(pk % 2),
+            'created': datetime.datetime(2012, 1, 1, 12, 30),
+            'published': datetime.date(2012, 1, 2),
+            'excerpt': None,
+            'tags': [u'tag-%s' % (pk % 5), u'tag-%s' % (pk % 7)],
+            'author': {'name': u'Author %s' % (pk % 10), 'resource_uri': '/api/v1/authors/%s/' % (pk % 10)},
+        }, request=request))
+
+    return {
+        'meta': {'limit': OBJECT_COUNT, 'offset': 0, 'total_count': OBJECT_COUNT},
+        'objects': bundles,
+    }
+
+
+def main():
+    serializer = Serializer()
+    data = build_fixture(RequestWrapper(None))
+    unsorted_serializer = Serializer(sort_keys=False)
+    candidates = (
+        ('to_simple', lambda: serializer.to_simple(data, {})),
+        ('to_json', lambda: serializer.to_json(data)),
+        ('to_json (sort_keys=False)', lambda: unsorted_serializer.to_json(data)),
+        ('to_simple + dumps', lambda: simplejson.dumps(serializer.to_simple(data, {}), cls=DateTimeJSONEncoder, sort_keys=True)),
+    )
+
+    for name, func in candidates:
+        best = min(timeit.Timer(func).repeat(repeat=REPEAT, number=NUMBER))
+        print "%s: %.2f usec/object (%d objects)" % (name, best / (NUMBER * OBJECT_COUNT) * 1e6, OBJECT_COUNT)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,6 +6,7 @@ from core.tests.authentication import *
 from core.tests.authorization import *
 from core.tests.cache import *
 from core.tests.commands import *
+from core.tests.compression import *
 from core.tests.fields import *
 from core.tests.http import *
 from core.tests.paginator import *
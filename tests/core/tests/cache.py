@@ -1,7 +1,9 @@
+import threading
 import time
 from django.core.cache import cache
 from django.test import TestCase
 from tastypie.cache import NoCache, SimpleCache
+from piecrust.cache import NoCache as PiecrustNoCache, MemcacheCache as PiecrustMemcacheCache, LocalCache as PiecrustLocalCache, TieredCache as PiecrustTieredCache, CachedValue as PiecrustCachedValue, Flight as PiecrustFlight
 
 
 class NoCacheTestCase(TestCase):
@@ -56,3 +58,322 @@ class SimpleCacheTestCase(TestCase):
         # Check expiration.
         time.sleep(2)
         self.assertEqual(cache.get('moof'), None)
+
+
+class LocalCacheTestCase(TestCase):
+    def test_get_set(self):
+        local_cache = PiecrustLocalCache()
+        self.assertEqual(local_cache.get('foo'), None)
+        local_cache.set('foo', 'bar')
+        local_cache.set('moof', {'baz': [1, 2]}, timeout=None)
+        self.assertEqual(local_cache.get('foo'), 'bar')
+        self.assertEqual(local_cache.get('moof'), {'baz': [1, 2]})
+
+        # Changes to fetched values don't leak back in.
+        local_cache.get('moof')['baz'].append(3)
+        self.assertEqual(local_cache.get('moof'), {'baz': [1, 2]})
+
+        local_cache.set('foo', 'baz')
+        self.assertEqual(local_cache.get('foo'), 'baz')
+        self.assertEqual(len(local_cache), 2)
+
+    def test_expiry(self):
+        local_cache = PiecrustLocalCache()
+        local_cache.set('foo', 'bar', timeout=0.05)
+        local_cache.set('moof', 'baz', timeout=0)
+        self.assertEqual(local_cache.get('foo'), 'bar')
+        time.sleep(0.1)
+        self.assertEqual(local_cache.get('foo'), None)
+        self.assertEqual(local_cache.get('moof'), 'baz')
+        self.assertEqual(local_cache.bytes, 3)
+
+    def test_eviction(self):
+        local_cache = PiecrustLocalCache(max_entries=2)
+        local_cache.set('a', '1')
+        local_cache.set('b', '2')
+        local_cache.get('a')
+        local_cache.set('c', '3')
+        self.assertEqual(local_cache.get('b'), None)
+        self.assertEqual(local_cache.get('a'), '1')
+        self.assertEqual(local_cache.get('c'), '3')
+
+        local_cache = PiecrustLocalCache(max_bytes=10)
+        local_cache.set('a', 'x' * 4)
+        local_cache.set('b', 'x' * 4)
+        local_cache.set('c', 'x' * 4)
+        self.assertEqual(local_cache.get('a'), None)
+        self.assertEqual(local_cache.bytes, 8)
+
+        # Too big to ever fit.
+        local_cache.set('b', 'x' * 11)
+        self.assertEqual(local_cache.get('b'), None)
+        self.assertEqual(local_cache.get('c'), 'xxxx')
+        self.assertEqual(local_cache.bytes, 4)
+
+    def test_unbounded(self):
+        local_cache = PiecrustLocalCache(max_entries=None)
+
+        for i in range(1500):
+            local_cache.set('key-%s' % i, 'x')
+
+        self.assertEqual(len(local_cache), 1500)
+        self.assertEqual(local_cache.get('key-0'), 'x')
+
+        # Expired values are still dropped as new ones come in.
+        local_cache = PiecrustLocalCache(max_entries=None)
+        local_cache.set('a', '1', timeout=0.05)
+        local_cache.set('b', '2', timeout=0.05)
+        time.sleep(0.1)
+        local_cache.set('c', '3')
+        self.assertEqual(len(local_cache), 1)
+        self.assertEqual(local_cache.bytes, 1)
+        self.assertEqual(local_cache.stats()['evictions'], 0)
+
+    def test_stats(self):
+        local_cache = PiecrustLocalCache(max_entries=1)
+        local_cache.set('a', '12')
+        local_cache.set('b', '345')
+        local_cache.get('a')
+        local_cache.get('b')
+        self.assertEqual(local_cache.stats(), {'entries': 1, 'bytes': 3, 'hits': 1, 'misses': 1, 'evictions': 1})
+
+        local_cache.clear()
+        self.assertEqual(local_cache.stats(), {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0})
+
+
+class TieredCacheTestCase(TestCase):
+    def test_get_or_set(self):
+        calls = []
+
+        def produce():
+            calls.append(1)
+            return 'bar'
+
+        no_cache = PiecrustNoCache()
+        self.assertEqual(no_cache.get_or_set('foo', produce), 'bar')
+        self.assertEqual(no_cache.get_or_set('foo', produce), 'bar')
+        self.assertEqual(len(calls), 2)
+
+        local_cache = PiecrustLocalCache()
+        self.assertEqual(local_cache.get_or_set('foo', produce), 'bar')
+        self.assertEqual(local_cache.get_or_set('foo', produce), 'bar')
+        self.assertEqual(len(calls), 3)
+
+        # ``None`` isn't cached.
+        self.assertEqual(local_cache.get_or_set('moof', lambda: None), None)
+        self.assertEqual(len(local_cache), 1)
+
+    def test_tiers(self):
+        backend = PiecrustLocalCache()
+        tiered_cache = PiecrustTieredCache(backend, local_timeout=0.05)
+        tiered_cache.set('foo', 'bar')
+        self.assertEqual(backend.get('foo'), 'bar')
+        self.assertEqual(tiered_cache.local.get('foo'), 'bar')
+
+        # Local copies only last for the ``local_timeout``.
+        backend.set('foo', 'baz')
+        self.assertEqual(tiered_cache.get('foo'), 'bar')
+        time.sleep(0.1)
+        self.assertEqual(tiered_cache.get('foo'), 'baz')
+
+        # Misses locally get filled in from the backend.
+        backend.set('moof', 'quux')
+        self.assertEqual(tiered_cache.get('moof'), 'quux')
+        self.assertEqual(tiered_cache.local.get('moof'), 'quux')
+        self.assertEqual(tiered_cache.get('nope'), None)
+
+        self.assertEqual(tiered_cache.get_or_set('new', lambda: [1, 2]), [1, 2])
+        self.assertEqual(tiered_cache.get('new'), [1, 2])
+        self.assertEqual(backend.get('new').value, [1, 2])
+
+    def test_coalescing(self):
+        tiered_cache = PiecrustTieredCache(PiecrustLocalCache())
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def produce():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'bar'
+
+        def fetch():
+            results.append(tiered_cache.get_or_set('foo', produce))
+
+        threads = [threading.Thread(target=fetch) for i in range(5)]
+        threads[0].start()
+        started.wait()
+
+        for thread in threads[1:]:
+            thread.start()
+
+        release.set()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['bar'] * 5)
+
+    def test_errors(self):
+        tiered_cache = PiecrustTieredCache(PiecrustLocalCache())
+
+        def fail():
+            raise KeyError('foo')
+
+        self.assertRaises(KeyError, tiered_cache.get_or_set, 'foo', fail)
+        self.assertEqual(tiered_cache._flights, {})
+        self.assertEqual(tiered_cache.get_or_set('foo', lambda: 'bar'), 'bar')
+
+    def test_early_refresh(self):
+        calls = []
+
+        def produce():
+            calls.append(1)
+            return len(calls)
+
+        tiered_cache = PiecrustTieredCache(PiecrustLocalCache(), beta=0)
+        self.assertEqual(tiered_cache.get_or_set('foo', produce), 1)
+        tiered_cache.set('foo', PiecrustCachedValue(1, time.time() + 60, 1e9))
+        self.assertEqual(tiered_cache.get_or_set('foo', produce), 1)
+
+        # A value that's slow to produce (compared to its time left) gets
+        # refreshed ahead of its expiry.
+        tiered_cache.beta = 1.0
+        self.assertEqual(tiered_cache.get_or_set('foo', produce), 2)
+        self.assertEqual(tiered_cache.get_or_set('foo', produce), 2)
+
+        # Unless another thread is on it, in which case it's served as-is.
+        tiered_cache.set('foo', PiecrustCachedValue(2, time.time() + 60, 1e9))
+        tiered_cache._flights['foo'] = PiecrustFlight()
+        self.assertEqual(tiered_cache.get_or_set('foo', produce), 2)
+        self.assertEqual(len(calls), 2)
+
+        # Values that never expire are never refreshed early.
+        self.assertFalse(tiered_cache.should_refresh(PiecrustCachedValue(1, None, 1e9)))
+
+
+class FakeMemcacheClient(object):
+    def __init__(self):
+        self.data = {}
+        self.times = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, time=0):
+        self.data[key] = value
+        self.times[key] = time
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def get_multi(self, keys):
+        return dict((key, self.data[key]) for key in keys if key in self.data)
+
+    def set_multi(self, mapping, time=0):
+        for key, value in mapping.items():
+            self.set(key, value, time=time)
+
+        return []
+
+    def delete_multi(self, keys):
+        for key in keys:
+            self.delete(key)
+
+
+class BulkCacheTestCase(TestCase):
+    def assertBulk(self, bulk_cache):
+        self.assertEqual(bulk_cache.get_many(['a', 'b']), {})
+        bulk_cache.set_many({'a': '1', 'b': [2]}, timeout=30)
+        bulk_cache.set('c', '3')
+        self.assertEqual(bulk_cache.get_many(['a', 'b', 'c', 'd']), {'a': '1', 'b': [2], 'c': '3'})
+
+        bulk_cache.delete('a')
+        self.assertEqual(bulk_cache.get('a'), None)
+        bulk_cache.delete_many(['b', 'c', 'd'])
+        self.assertEqual(bulk_cache.get_many(['a', 'b', 'c']), {})
+
+    def test_no_cache(self):
+        no_cache = PiecrustNoCache()
+        no_cache.set_many({'a': '1'})
+        self.assertEqual(no_cache.get_many(['a']), {})
+        no_cache.delete('a')
+        no_cache.delete_many(['a'])
+
+    def test_local_cache(self):
+        local_cache = PiecrustLocalCache()
+        self.assertBulk(local_cache)
+        self.assertEqual(local_cache.bytes, 0)
+
+    def test_tiered_cache(self):
+        backend = PiecrustLocalCache()
+        self.assertBulk(PiecrustTieredCache(backend))
+
+        # Local misses are filled in from the backend.
+        tiered_cache = PiecrustTieredCache(backend)
+        backend.set('a', '1')
+        tiered_cache.get_or_set('b', lambda: '2')
+        self.assertEqual(tiered_cache.get_many(['a', 'b']), {'a': '1', 'b': '2'})
+        self.assertEqual(tiered_cache.local.get('a'), '1')
+
+    def test_memcache_cache(self):
+        memcache_cache = PiecrustMemcacheCache.__new__(PiecrustMemcacheCache)
+        memcache_cache.conn = FakeMemcacheClient()
+        self.assertBulk(memcache_cache)
+
+        # Timeouts are passed along.
+        memcache_cache.set('a', '1', timeout=30)
+        memcache_cache.set_many({'b': '2'}, timeout=45)
+        memcache_cache.set('c', '3', timeout=None)
+        self.assertEqual(memcache_cache.conn.times, {'a': 30, 'b': 45, 'c': 0})
+
+
+class IncrTestCase(TestCase):
+    def test_no_cache(self):
+        no_cache = PiecrustNoCache()
+        self.assertEqual(no_cache.incr('a'), 1)
+        self.assertEqual(no_cache.incr('a'), 1)
+
+    def test_local_cache(self):
+        local_cache = PiecrustLocalCache()
+        self.assertEqual(local_cache.incr('a'), 1)
+        self.assertEqual(local_cache.incr('a', delta=2), 3)
+        self.assertEqual(local_cache.get('a'), 3)
+        local_cache.set('b', '5')
+        self.assertEqual(local_cache.incr('b'), 6)
+
+        # The first increment's timeout sticks.
+        local_cache.incr('c', timeout=0.2)
+        time.sleep(0.15)
+        local_cache.incr('c', timeout=60)
+        time.sleep(0.1)
+        self.assertEqual(local_cache.get('c'), None)
+        self.assertEqual(local_cache.incr('c'), 1)
+
+    def test_local_cache_threads(self):
+        local_cache = PiecrustLocalCache()
+
+        def incr():
+            for i in range(500):
+                local_cache.incr('a')
+
+        threads = [threading.Thread(target=incr) for i in range(4)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(local_cache.get('a'), 2000)
+
+    def test_tiered_cache(self):
+        tiered_cache = PiecrustTieredCache(PiecrustLocalCache())
+        tiered_cache.set('a', 1)
+        self.assertEqual(tiered_cache.incr('a'), 2)
+        self.assertEqual(tiered_cache.get('a'), 2)
+        self.assertEqual(tiered_cache.backend.get('a'), 2)
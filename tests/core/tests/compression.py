@@ -0,0 +1,145 @@
+import zlib
+from django.test import TestCase
+from piecrust import fields
+from piecrust.cache import NoCache
+from piecrust.compression import NoCompression, Compression, parse_accept_encoding
+from piecrust.exceptions import ImproperlyConfigured
+from piecrust.resources import Resource
+from core.tests.mocks import MockRequest
+
+
+class DictCache(NoCache):
+    def __init__(self):
+        self.data = {}
+        self.sets = []
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, timeout=60):
+        self.sets.append(key)
+        self.data[key] = value
+
+    def count_sets(self, name):
+        return len([key for key in self.sets if ':%s:' % name in key])
+
+
+class NoteObject(object):
+    def __init__(self, pk, body):
+        self.pk = pk
+        self.body = body
+
+
+class NoteResource(Resource):
+    body = fields.CharField(attribute='body')
+
+    class Meta:
+        resource_name = 'notes'
+        object_class = NoteObject
+        include_resource_uri = False
+        compression = Compression(min_length=200)
+        cache = DictCache()
+        limit = 0
+
+    def obj_get_list(self, request=None, **kwargs):
+        return [NoteObject(i, u'Note #%s ' % i * 10) for i in range(self.count)]
+
+    def get_resource_list_uri(self):
+        return '/api/v1/notes/'
+
+
+class CompressionTestCase(TestCase):
+    def test_parse_accept_encoding(self):
+        self.assertEqual(parse_accept_encoding(''), {})
+        self.assertEqual(parse_accept_encoding('gzip, deflate'), {'gzip': 1.0, 'deflate': 1.0})
+        self.assertEqual(parse_accept_encoding('GZIP;q=0.5, deflate; q=0.8, *;q=0, br;q=oops'), {'gzip': 0.5, 'deflate': 0.8, '*': 0.0, 'br': 0.0})
+
+    def test_init(self):
+        self.assertRaises(ImproperlyConfigured, Compression, encodings=('gzip', 'br'))
+
+    def test_negotiate(self):
+        request = MockRequest()
+        self.assertEqual(NoCompression().negotiate(request), None)
+
+        compression = Compression()
+        self.assertEqual(compression.negotiate(request), None)
+
+        for header, expected in (
+            ('gzip, deflate', 'gzip'),
+            ('deflate', 'deflate'),
+            ('gzip;q=0.5, deflate', 'deflate'),
+            ('gzip;q=0, *', 'deflate'),
+            ('*', 'gzip'),
+            ('identity', None),
+            ('br', None),
+        ):
+            request.META['HTTP_ACCEPT_ENCODING'] = header
+            self.assertEqual(compression.negotiate(request), expected)
+            # Again, from the cache.
+            self.assertEqual(compression.negotiate(request), expected)
+
+        self.assertEqual(Compression(encodings=('deflate', 'gzip')).negotiate(request), None)
+        request.META['HTTP_ACCEPT_ENCODING'] = 'gzip, deflate'
+        self.assertEqual(Compression(encodings=('deflate', 'gzip')).negotiate(request), 'deflate')
+
+    def test_compress(self):
+        compression = Compression(min_length=10)
+        self.assertFalse(compression.should_compress('short'))
+        self.assertTrue(compression.should_compress('long enough'))
+
+        content = '{"objects": [%s]}' % ', '.join(['{"name": "foo"}'] * 100)
+        gzipped = compression.compress(content, 'gzip')
+        self.assertTrue(gzipped.startswith('\x1f\x8b'))
+        self.assertTrue(len(gzipped) < len(content))
+        self.assertEqual(zlib.decompress(gzipped, 16 + zlib.MAX_WBITS), content)
+        self.assertEqual(zlib.decompress(compression.compress(content, 'deflate')), content)
+        self.assertEqual(zlib.decompress(compression.compress(u'caf\xe9', 'deflate')), 'caf\xc3\xa9')
+
+        chunks = compression.compress_iter(iter([content[:50], content[50:]]), 'gzip')
+        self.assertEqual(zlib.decompress(''.join(chunks), 16 + zlib.MAX_WBITS), content)
+
+    def test_create_response(self):
+        resource = NoteResource()
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+
+        # Not accepted.
+        resource.count = 10
+        response = resource.get_list(request)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        uncompressed = response.content
+
+        request.META['HTTP_ACCEPT_ENCODING'] = 'gzip'
+        response = resource.get_list(request)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(zlib.decompress(response.content, 16 + zlib.MAX_WBITS), uncompressed)
+        # One-off bodies don't get cached.
+        self.assertEqual(resource._meta.cache.sets, [])
+
+        # Cached responses are cached compressed.
+        resource._meta.cache_responses = True
+        try:
+            self.assertEqual(resource.dispatch('list', request).content, response.content)
+            self.assertEqual(resource.dispatch('list', request).content, response.content)
+        finally:
+            resource._meta.cache_responses = False
+
+        self.assertEqual(resource._meta.cache.count_sets('response'), 1)
+
+        # Too small to bother.
+        resource.count = 1
+        response = resource.get_list(request)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertTrue(response.content.startswith('{'))
+
+        # Streams are compressed as they go.
+        resource._meta.streaming = True
+        try:
+            response = resource.get_list(request)
+        finally:
+            resource._meta.streaming = False
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertTrue(response.streaming)
+        self.assertTrue(zlib.decompress(''.join(response.content), 16 + zlib.MAX_WBITS).startswith('{'))
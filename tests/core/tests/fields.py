@@ -7,6 +7,9 @@ from tastypie.bundle import Bundle
 from tastypie.exceptions import ApiFieldError, NotFound
 from tastypie.fields import *
 from tastypie.resources import ModelResource
+from piecrust.bundle import Bundle as PiecrustBundle
+from piecrust import fields as piecrust_fields
+from piecrust.http import RequestWrapper
 from core.models import Note, Subject, MediaBit
 
 
@@ -1082,3 +1085,232 @@ class ToManyFieldTestCase(TestCase):
         media_bundle_list = field_10.hydrate_m2m(bundle_10)
         self.assertEqual(len(media_bundle_list), 1)
         self.assertEqual(media_bundle_list[0].obj.title, u'Foo!')
+
+
+class AccessorObject(object):
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class AccessorTestCase(TestCase):
+    def setUp(self):
+        self.obj = AccessorObject(name='Daniel', empty=None, author=AccessorObject(name='Cody', pet=None))
+        self.bundle = PiecrustBundle(obj=self.obj, request=RequestWrapper(None))
+
+    def test_build_accessor(self):
+        self.assertTrue(isinstance(piecrust_fields.build_accessor('name'), piecrust_fields.AttributeAccessor))
+        self.assertTrue(isinstance(piecrust_fields.build_accessor('author__name'), piecrust_fields.AttributeAccessor))
+        self.assertTrue(isinstance(piecrust_fields.build_accessor(lambda bundle: 1), piecrust_fields.CallableAccessor))
+
+    def test_attribute_accessor(self):
+        accessor = piecrust_fields.AttributeAccessor('name')
+        self.assertEqual(accessor.path, ('name',))
+        self.assertEqual(accessor.get(self.bundle), 'Daniel')
+        self.assertRaises(AttributeError, piecrust_fields.AttributeAccessor('nope').get, self.bundle)
+        self.assertEqual(piecrust_fields.AttributeAccessor('nope').find_empty(self.bundle), (self.obj, 'nope'))
+
+    def test_path_accessor(self):
+        accessor = piecrust_fields.AttributeAccessor('author__name')
+        self.assertEqual(accessor.path, ('author', 'name'))
+        self.assertEqual(accessor.get(self.bundle), 'Cody')
+
+        broken = piecrust_fields.AttributeAccessor('author__pet__name')
+        self.assertRaises(AttributeError, broken.get, self.bundle)
+        self.assertEqual(broken.find_empty(self.bundle), (self.obj.author, 'pet'))
+
+    def test_callable_accessor(self):
+        accessor = piecrust_fields.CallableAccessor(lambda bundle: bundle.obj.name.upper())
+        self.assertEqual(accessor.get(self.bundle), 'DANIEL')
+
+    def test_dehydrate(self):
+        field = piecrust_fields.CharField(attribute='author__name')
+        field.contribute_to_class(AccessorObject, 'author_name')
+        accessor = field.get_accessor()
+        self.assertEqual(field.dehydrate(self.bundle), u'Cody')
+        # Compiled once & reused.
+        self.assertTrue(field.get_accessor() is accessor)
+
+        # Changing the ``attribute`` recompiles.
+        field.attribute = 'name'
+        self.assertEqual(field.dehydrate(self.bundle), u'Daniel')
+        self.assertEqual(field.get_accessor().path, ('name',))
+
+        self.assertEqual(piecrust_fields.CharField(attribute='author__pet__name', null=True).dehydrate(self.bundle), None)
+        self.assertEqual(piecrust_fields.CharField(attribute='empty', default='abc').dehydrate(self.bundle), u'abc')
+        self.assertEqual(piecrust_fields.CharField(attribute=lambda bundle: 'called').dehydrate(self.bundle), u'called')
+        self.assertRaises(piecrust_fields.ApiFieldError, piecrust_fields.CharField(attribute='author__pet__name').dehydrate, self.bundle)
+
+    def test_dehydrate_many(self):
+        bundles = [
+            self.bundle,
+            PiecrustBundle(obj=AccessorObject(name='Cody', count='5', author=None), request=RequestWrapper(None)),
+        ]
+        self.assertEqual(piecrust_fields.CharField(attribute='name').dehydrate_many(bundles), [u'Daniel', u'Cody'])
+        self.assertEqual(piecrust_fields.IntegerField(attribute='count', default=0).dehydrate_many(bundles), [0, 5])
+        self.assertEqual(piecrust_fields.CharField(attribute='author__name', null=True).dehydrate_many(bundles), [u'Cody', None])
+        self.assertRaises(piecrust_fields.ApiFieldError, piecrust_fields.CharField(attribute='author__name').dehydrate_many, bundles)
+
+        # Subclasses customizing ``convert`` still get it called.
+        class ShoutyCharField(piecrust_fields.CharField):
+            def convert(self, value):
+                return value.upper()
+
+        self.assertEqual(ShoutyCharField(attribute='name').dehydrate_many(bundles), ['DANIEL', 'CODY'])
+
+
+class RelatedFieldNamesTestCase(TestCase):
+    def test_read_through(self):
+        from piecrust.resources import Resource as PiecrustResource
+
+        class NamedResource(PiecrustResource):
+            parent = piecrust_fields.ToOneField('self', 'parent', null=True)
+
+            class Meta:
+                resource_name = 'named'
+
+        field = NamedResource.base_fields['parent']
+        self.assertEqual(field.resource_name, 'named')
+        self.assertEqual(field.api_name, None)
+
+        NamedResource(api_name='v2')
+        self.assertEqual(field.api_name, 'v2')
+
+        # Explicit assignment still wins.
+        field.api_name = 'v3'
+        self.assertEqual(field.api_name, 'v3')
+
+        self.assertEqual(piecrust_fields.ToOneField('self', 'parent').api_name, None)
+
+
+class RelatedResourcePoolTestCase(TestCase):
+    def setUp(self):
+        from piecrust.resources import Resource as PiecrustResource
+
+        class PooledAuthorResource(PiecrustResource):
+            name = piecrust_fields.CharField(attribute='name')
+
+            class Meta:
+                resource_name = 'authors'
+                include_resource_uri = False
+
+            def get_resource_uri(self, bundle):
+                return '/authors/%s/' % bundle.obj.name
+
+        class PooledEntryResource(PiecrustResource):
+            author = piecrust_fields.ToOneField(PooledAuthorResource, 'author')
+            full_author = piecrust_fields.ToOneField(PooledAuthorResource, 'author', full=True)
+
+            class Meta:
+                resource_name = 'entries'
+
+        self.author_resource_class = PooledAuthorResource
+        self.entry_resource_class = PooledEntryResource
+
+    def test_pool(self):
+        pool = piecrust_fields.RelatedResourcePool()
+        resource = pool.get(self.author_resource_class)
+        self.assertTrue(isinstance(resource, self.author_resource_class))
+        self.assertTrue(pool.get(self.author_resource_class) is resource)
+        self.assertFalse(pool.get(self.author_resource_class, 'v1') is resource)
+
+        pool.clear()
+        self.assertFalse(pool.get(self.author_resource_class) is resource)
+
+    def test_get_related_resource(self):
+        field = self.entry_resource_class.base_fields['author']
+        self.assertTrue(field.get_related_resource() is field.get_related_resource())
+
+    def test_dehydrate(self):
+        field = self.entry_resource_class.base_fields['author']
+        full_field = self.entry_resource_class.base_fields['full_author']
+        request = RequestWrapper(None)
+        bundle_1 = PiecrustBundle(obj=AccessorObject(author=AccessorObject(name='daniel')), request=request)
+        bundle_2 = PiecrustBundle(obj=AccessorObject(author=AccessorObject(name='cody')), request=request)
+
+        self.assertEqual(field.dehydrate(bundle_1), '/authors/daniel/')
+        self.assertEqual(field.dehydrate(bundle_2), '/authors/cody/')
+        self.assertEqual(full_field.dehydrate(bundle_1).data, {'name': u'daniel'})
+        self.assertEqual(full_field.dehydrate(bundle_2).data, {'name': u'cody'})
+        # Nothing per-object gets left on the shared field.
+        self.assertFalse(hasattr(field, 'fk_resource'))
+
+
+class PrefetchStorage(object):
+    """
+    A minimal in-memory storage, supporting ``list`` by ``<attr>__in``.
+    """
+    def __init__(self, objects):
+        self.objects = objects
+
+    def list(self, **kwargs):
+        attr, values = kwargs.items()[0]
+        attr = attr[:-len('__in')]
+        return [obj for obj in self.objects if getattr(obj, attr) in values]
+
+
+class PrefetchTestCase(TestCase):
+    def setUp(self):
+        from piecrust.resources import Resource as PiecrustResource
+        from piecrust.storage import CountingStorage
+
+        self.authors = [AccessorObject(pk=pk, name='author-%s' % pk) for pk in range(10)]
+        self.entries = [AccessorObject(pk=pk, author=self.authors[pk % 10], author_id=pk % 10) for pk in range(1, 101)]
+        self.comments = [AccessorObject(pk=pk, entry_id=(pk % 50) + 1, body='comment-%s' % pk) for pk in range(150)]
+        self.author_storage = CountingStorage(PrefetchStorage(self.authors))
+        self.comment_storage = CountingStorage(PrefetchStorage(self.comments))
+
+        class PrefetchAuthorResource(PiecrustResource):
+            name = piecrust_fields.CharField(attribute='name')
+
+            class Meta:
+                resource_name = 'authors'
+                include_resource_uri = False
+                storage = self.author_storage
+
+        class PrefetchCommentResource(PiecrustResource):
+            body = piecrust_fields.CharField(attribute='body')
+
+            class Meta:
+                resource_name = 'comments'
+                include_resource_uri = False
+                storage = self.comment_storage
+
+        class PrefetchEntryResource(PiecrustResource):
+            id = piecrust_fields.IntegerField(attribute='pk')
+            author = piecrust_fields.ToOneField(PrefetchAuthorResource, 'author', full=True, prefetch_attribute='author_id')
+            comments = piecrust_fields.ToManyField(PrefetchCommentResource, 'comments', full=True, null=True, prefetch_attribute='entry_id')
+
+            class Meta:
+                resource_name = 'entries'
+                include_resource_uri = False
+
+        piecrust_fields.related_resources.clear()
+        self.resource = PrefetchEntryResource()
+
+    def test_prefetch(self):
+        field = self.resource.fields['author']
+        request = RequestWrapper(None)
+        bundles = [PiecrustBundle(obj=entry, request=request) for entry in self.entries[:3]]
+        prefetched = field.prefetch(bundles)
+        self.assertEqual(sorted(prefetched.keys()), [1, 2, 3])
+        self.assertTrue(prefetched[2] is self.authors[2])
+
+        # Without a ``prefetch_attribute``, nothing is prefetched.
+        self.assertEqual(piecrust_fields.ToOneField('self', 'parent').prefetch(bundles), None)
+
+    def test_full_dehydrate_many(self):
+        request = RequestWrapper(None)
+        bundles = [PiecrustBundle(obj=entry, request=request) for entry in self.entries]
+        dehydrated = self.resource.full_dehydrate_many(bundles)
+
+        self.assertEqual(len(dehydrated), 100)
+        self.assertEqual(self.author_storage.calls, {'list': 1})
+        self.assertEqual(self.comment_storage.calls, {'list': 1})
+        self.assertEqual(dehydrated[0].data['author'].data, {'name': u'author-1'})
+        self.assertEqual([comment.data['body'] for comment in dehydrated[0].data['comments']], [u'comment-0', u'comment-50', u'comment-100'])
+        # Entries past 50 have no comments.
+        self.assertEqual(dehydrated[99].data['comments'], [])
+
+        self.author_storage.reset()
+        self.assertEqual(self.author_storage.total, 0)
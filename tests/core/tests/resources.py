@@ -23,6 +23,13 @@ from tastypie.resources import Resource, ModelResource, ALL, ALL_WITH_RELATIONS,
 from tastypie.serializers import Serializer
 from tastypie.throttle import CacheThrottle
 from tastypie.validation import Validation, FormValidation
+from piecrust.authorization import Authorization as PiecrustAuthorization
+from piecrust.cache import LocalCache as PiecrustLocalCache
+from piecrust.exceptions import BadRequest as PiecrustBadRequest, NotFound as PiecrustNotFound
+from piecrust import fields as piecrust_fields
+from piecrust.http import RequestWrapper
+from piecrust.resources import Resource as PiecrustResource
+from piecrust.storage import CountingStorage as PiecrustCountingStorage
 from core.models import Note, Subject, MediaBit
 from core.tests.mocks import MockRequest
 from core.utils import SimpleHandler
@@ -2702,3 +2709,761 @@ class BustedResourceTestCase(TestCase):
             self.assertEqual(resp.content, '{"error_message": "Oops, you bwoke it."}')
             self.assertEqual(len(mail.outbox), 3)
             mail.outbox = []
+
+
+class PlanObject(object):
+    def __init__(self, name=None, view_count=None):
+        self.name = name
+        self.view_count = view_count
+
+
+class PlanResource(PiecrustResource):
+    name = piecrust_fields.CharField(attribute='name')
+    view_count = piecrust_fields.IntegerField(attribute='view_count', default=0)
+    shouting = piecrust_fields.CharField(null=True)
+
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'plan'
+        include_resource_uri = False
+
+    def dehydrate_shouting(self, bundle):
+        return bundle.data['name'].upper()
+
+
+class BatchPlanResource(PlanResource):
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'batchplan'
+        include_resource_uri = False
+
+    def dehydrate_view_count_many(self, bundles):
+        return [bundle.data['view_count'] * 10 for bundle in bundles]
+
+
+class ClashingPlanResource(PlanResource):
+    view_count_many = piecrust_fields.IntegerField(null=True)
+
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'clashingplan'
+        include_resource_uri = False
+
+    def dehydrate_view_count_many(self, bundle):
+        return bundle.obj.view_count + 1
+
+
+class DehydrationPlanTestCase(TestCase):
+    def test_plan(self):
+        plan = PlanResource._dehydration_plan
+        self.assertEqual(sorted(plan.field_names), ['name', 'shouting', 'view_count'])
+        self.assertEqual(plan.hook_names, {'shouting': 'dehydrate_shouting'})
+
+    def test_get_dehydration_steps(self):
+        resource = PlanResource()
+        steps = resource.get_dehydration_steps()
+        self.assertEqual(sorted(step[0] for step in steps), ['name', 'shouting', 'view_count'])
+        self.assertTrue(resource.get_dehydration_steps() is steps)
+
+        hooks = dict((field_name, hook) for field_name, field_object, hook, many_hook in steps)
+        self.assertEqual(hooks['name'], None)
+        self.assertEqual(hooks['shouting'], resource.dehydrate_shouting)
+
+    def test_full_dehydrate(self):
+        resource = PlanResource()
+        request = RequestWrapper(MockRequest())
+        bundles = [resource.build_bundle(obj=PlanObject(name, view_count), request=request) for name, view_count in [('foo', 1), ('bar', None)]]
+        steps = resource.get_dehydration_steps()
+        dehydrated = [resource.full_dehydrate(bundle, steps=steps) for bundle in bundles]
+        self.assertEqual(dehydrated[0].data, {'name': u'foo', 'view_count': 1, 'shouting': u'FOO'})
+        self.assertEqual(dehydrated[1].data, {'name': u'bar', 'view_count': 0, 'shouting': u'BAR'})
+
+    def test_full_dehydrate_many(self):
+        request = RequestWrapper(MockRequest())
+        objects = [PlanObject('foo', 1), PlanObject('bar', None), PlanObject('baz', '3')]
+
+        resource = PlanResource()
+        dehydrated = resource.full_dehydrate_many([resource.build_bundle(obj=obj, request=request) for obj in objects])
+        self.assertEqual([bundle.data for bundle in dehydrated], [
+            {'name': u'foo', 'view_count': 1, 'shouting': u'FOO'},
+            {'name': u'bar', 'view_count': 0, 'shouting': u'BAR'},
+            {'name': u'baz', 'view_count': 3, 'shouting': u'BAZ'},
+        ])
+
+        # The batch hook runs once for the whole list.
+        resource = BatchPlanResource()
+        self.assertEqual(BatchPlanResource._dehydration_plan.many_hook_names, {'view_count': 'dehydrate_view_count_many'})
+        dehydrated = resource.full_dehydrate_many([resource.build_bundle(obj=obj, request=request) for obj in objects])
+        self.assertEqual([bundle.data['view_count'] for bundle in dehydrated], [10, 0, 30])
+        self.assertEqual([bundle.data['shouting'] for bundle in dehydrated], [u'FOO', u'BAR', u'BAZ'])
+
+    def test_many_hook_clash(self):
+        # ``dehydrate_view_count_many`` belongs to the ``view_count_many`` field.
+        self.assertEqual(ClashingPlanResource._dehydration_plan.many_hook_names, {})
+        resource = ClashingPlanResource()
+        request = RequestWrapper(MockRequest())
+        bundles = [resource.build_bundle(obj=PlanObject('foo', 1), request=request)]
+        self.assertEqual(resource.full_dehydrate_many(bundles)[0].data['view_count_many'], 2)
+        self.assertEqual(resource.full_dehydrate(bundles[0]).data['view_count'], 1)
+
+    def test_fields_are_shared(self):
+        resource_1 = PlanResource()
+        resource_2 = PlanResource()
+        self.assertTrue(resource_1.fields['name'] is PlanResource.base_fields['name'])
+        self.assertTrue(resource_1.fields['name'] is resource_2.fields['name'])
+
+        # But the ``dict`` isn't.
+        resource_1.fields['extra'] = piecrust_fields.CharField(attribute='name')
+        self.assertFalse('extra' in resource_2.fields)
+        self.assertFalse('extra' in PlanResource.base_fields)
+
+
+class StreamingPlanResource(PlanResource):
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'streamingplan'
+        include_resource_uri = False
+        streaming = True
+        streaming_chunk_size = 2
+        limit = 0
+
+    def obj_get_list(self, request=None, **kwargs):
+        return [PlanObject('item-%s' % i, i) for i in range(5)]
+
+    def get_resource_list_uri(self):
+        return '/api/v1/streamingplan/'
+
+
+class BrokenStreamingPlanResource(StreamingPlanResource):
+    def dehydrate_shouting(self, bundle):
+        raise ValueError("Broken hook.")
+
+
+class StreamingTestCase(TestCase):
+    def test_iter_full_dehydrate(self):
+        resource = StreamingPlanResource()
+        request = RequestWrapper(MockRequest())
+        dehydrated = resource.iter_full_dehydrate(request, (PlanObject('item-%s' % i, i) for i in range(5)))
+        self.assertFalse(isinstance(dehydrated, list))
+        self.assertEqual([bundle.data['shouting'] for bundle in dehydrated], [u'ITEM-0', u'ITEM-1', u'ITEM-2', u'ITEM-3', u'ITEM-4'])
+
+    def test_errors_before_response(self):
+        # The first chunk is dehydrated before the response is returned.
+        resource = BrokenStreamingPlanResource()
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+        self.assertRaises(ValueError, resource.get_list, request)
+        self.assertRaises(ValueError, resource.iter_full_dehydrate, RequestWrapper(MockRequest()), [PlanObject('foo', 1)])
+
+    def test_get_list(self):
+        import json
+        resource = StreamingPlanResource()
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+        response = resource.get_list(request)
+        self.assertTrue(response.streaming)
+        chunks = list(response.content)
+        self.assertTrue(len(chunks) > 5)
+
+        data = json.loads(''.join(chunks))
+        self.assertEqual(data['meta']['total_count'], 5)
+        self.assertEqual([obj['name'] for obj in data['objects']], [u'item-0', u'item-1', u'item-2', u'item-3', u'item-4'])
+
+        # Same output as without streaming.
+        resource._meta.streaming = False
+        try:
+            response = resource.get_list(request)
+        finally:
+            resource._meta.streaming = True
+
+        self.assertFalse(response.streaming)
+        self.assertEqual(json.loads(response.content), data)
+
+
+class UploadPlanResource(PlanResource):
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'uploadplan'
+        include_resource_uri = False
+        streaming_uploads = True
+
+    def __init__(self, *args, **kwargs):
+        super(UploadPlanResource, self).__init__(*args, **kwargs)
+        self.created = []
+
+    def obj_delete_list(self, request=None, **kwargs):
+        self.created = []
+
+    def obj_create(self, bundle, request=None, **kwargs):
+        bundle.obj = PlanObject(bundle.data['name'], bundle.data.get('view_count'))
+        self.created.append(bundle.obj.name)
+        return bundle
+
+    def rollback(self, bundles):
+        for bundle in bundles:
+            self.created.remove(bundle.obj.name)
+
+
+class StreamingUploadTestCase(TestCase):
+    def test_put_list(self):
+        resource = UploadPlanResource()
+        request = MockRequest()
+        request.method = 'PUT'
+        request.META = {'CONTENT_TYPE': 'application/xml'}
+        request.raw_post_data = '<request><objects type="list"><object><name>foo</name></object><object><name>bar</name></object></objects></request>'
+        response = resource.put_list(request)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(resource.created, ['foo', 'bar'])
+
+        request.raw_post_data = '<request><meta type="hash"></meta></request>'
+        self.assertRaises(PiecrustBadRequest, resource.put_list, request)
+
+        request.META = {'CONTENT_TYPE': 'application/json'}
+        request.raw_post_data = '{"objects": [{"name": "baz"}, {"name": "qux", "view_count": 2}]}'
+        response = resource.put_list(request)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(resource.created, ['baz', 'qux'])
+
+    def test_put_list_malformed(self):
+        resource = UploadPlanResource()
+        request = MockRequest()
+        request.method = 'PUT'
+
+        for content_type, body in (('application/json', '{"objects": [{"name": "foo"}, {"name": "bar"}, {"na'), ('application/json', '{"objects": [{"name": "foo"}]} garbage'), ('application/xml', '<request><objects type="list"><object><name>foo</name></object><object><name>bar</name></object><obj')):
+            resource.created = ['old']
+            request.META = {'CONTENT_TYPE': content_type}
+            request.raw_post_data = body
+            self.assertRaises(PiecrustBadRequest, resource.put_list, request)
+            # What was created got rolled back.
+            self.assertEqual(resource.created, [])
+
+        request.raw_post_data = '<request'
+        self.assertRaises(PiecrustBadRequest, resource.put_list, request)
+
+
+class ColumnarPlanObject(PlanObject):
+    def __init__(self, name=None, view_count=None):
+        super(ColumnarPlanObject, self).__init__(name, view_count)
+        self.pk = name
+
+
+class ColumnarPlanResource(PiecrustResource):
+    name = piecrust_fields.CharField(attribute='name')
+    view_count = piecrust_fields.IntegerField(attribute='view_count', default=0)
+
+    class Meta:
+        object_class = ColumnarPlanObject
+        resource_name = 'columnarplan'
+        limit = 0
+        list_layout_param = 'layout'
+
+    def obj_get_list(self, request=None, **kwargs):
+        return [ColumnarPlanObject('item-%s' % i, i) for i in range(5)]
+
+    def get_resource_uri(self, bundle_or_obj):
+        return '/api/v1/columnarplan/%s/' % bundle_or_obj.obj.pk
+
+    def get_resource_list_uri(self):
+        return '/api/v1/columnarplan/'
+
+
+class ColumnarTestCase(TestCase):
+    def test_full_dehydrate_rows(self):
+        request = RequestWrapper(MockRequest())
+        objects = [ColumnarPlanObject('foo', 1), ColumnarPlanObject('bar', None)]
+
+        # No hooks (beyond ``resource_uri``), so the bundles' data is skipped.
+        resource = ColumnarPlanResource()
+        self.assertFalse(resource.uses_bundle_data(resource.get_dehydration_steps()))
+        self.assertEqual(resource.get_columnar_fields(), ['name', 'resource_uri', 'view_count'])
+        bundles = [resource.build_bundle(obj=obj, request=request) for obj in objects]
+        self.assertEqual(resource.full_dehydrate_rows(bundles), [
+            [u'foo', '/api/v1/columnarplan/foo/', 1],
+            [u'bar', '/api/v1/columnarplan/bar/', 0],
+        ])
+        self.assertEqual([bundle.data for bundle in bundles], [{}, {}])
+
+        # With hooks, it matches ``full_dehydrate_many``.
+        resource = PlanResource()
+        self.assertTrue(resource.uses_bundle_data(resource.get_dehydration_steps()))
+        self.assertEqual(resource.get_columnar_fields(), ['name', 'shouting', 'view_count'])
+        bundles = [resource.build_bundle(obj=obj, request=request) for obj in objects]
+        self.assertEqual(resource.full_dehydrate_rows(bundles), [[u'foo', u'FOO', 1], [u'bar', u'BAR', 0]])
+
+        rows = resource.iter_full_dehydrate_rows(request, iter(objects))
+        self.assertFalse(isinstance(rows, list))
+        self.assertEqual(list(rows), [[u'foo', u'FOO', 1], [u'bar', u'BAR', 0]])
+
+    def test_get_list(self):
+        import json
+        resource = ColumnarPlanResource()
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+        objects = json.loads(resource.get_list(request).content)
+
+        request.GET = {'format': 'json', 'layout': 'columnar'}
+        columnar = json.loads(resource.get_list(request).content)
+        self.assertFalse('objects' in columnar)
+        self.assertEqual(columnar['meta'], objects['meta'])
+        self.assertEqual(columnar['fields'], [u'name', u'resource_uri', u'view_count'])
+        self.assertEqual([dict(zip(columnar['fields'], row)) for row in columnar['rows']], objects['objects'])
+
+        # Streamed, the rows are the same.
+        resource._meta.streaming = True
+        try:
+            response = resource.get_list(request)
+        finally:
+            resource._meta.streaming = False
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(json.loads(''.join(response.content)), columnar)
+
+        request.GET = {'format': 'json', 'layout': 'sideways'}
+        self.assertRaises(PiecrustBadRequest, resource.get_list, request)
+
+        # Without ``list_layout_param``, ``layout`` is left alone.
+        resource = PlanResource()
+        self.assertEqual(resource.determine_list_layout(request), 'objects')
+
+    def test_put_list(self):
+        resource = UploadPlanResource()
+        request = MockRequest()
+        request.method = 'PUT'
+        request.META = {'CONTENT_TYPE': 'application/json'}
+        request.raw_post_data = '{"fields": ["name", "view_count"], "rows": [["foo", 1], ["bar", null]]}'
+        response = resource.put_list(request)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(resource.created, ['foo', 'bar'])
+
+        request.META = {'CONTENT_TYPE': 'application/xml'}
+        request.raw_post_data = '<request><fields type="list"><value>name</value></fields><rows type="list"><objects><value>baz</value></objects></rows></request>'
+        response = resource.put_list(request)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(resource.created, ['baz'])
+
+        # The rows are streamed.
+        for content_type, body in (('application/json', '{"fields": ["name"], "rows": [["foo"], ["bar"]]}'), ('application/xml', '<request><fields type="list"><value>name</value></fields><rows type="list"><objects><value>foo</value></objects><objects><value>bar</value></objects></rows></request>')):
+            request.META = {'CONTENT_TYPE': content_type}
+            request.raw_post_data = body
+            deserialized = resource.deserialize_list(request, format=content_type)
+            self.assertFalse(isinstance(deserialized['objects'], list))
+            self.assertEqual(list(deserialized['objects']), [{'name': 'foo'}, {'name': 'bar'}])
+
+        # Unbuffered too.
+        resource._meta.streaming_uploads = False
+        try:
+            request.META = {'CONTENT_TYPE': 'application/json'}
+            request.raw_post_data = '{"fields": ["name"], "rows": [["qux"]]}'
+            resource.put_list(request)
+            self.assertEqual(resource.created, ['qux'])
+
+            request.raw_post_data = '{"fields": ["name"], "rows": [["qux", 1]]}'
+            self.assertRaises(PiecrustBadRequest, resource.put_list, request)
+        finally:
+            resource._meta.streaming_uploads = True
+
+
+class CountingLocalCache(PiecrustLocalCache):
+    def __init__(self, *args, **kwargs):
+        super(CountingLocalCache, self).__init__(*args, **kwargs)
+        self.lookups = 0
+
+    def get(self, key):
+        self.lookups += 1
+        return super(CountingLocalCache, self).get(key)
+
+    def get_many(self, keys):
+        self.lookups += 1
+        found = [(key, super(CountingLocalCache, self).get(key)) for key in keys]
+        return dict((key, value) for key, value in found if value is not None)
+
+
+class CachedPlanResource(PlanResource):
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'cachedplan'
+        include_resource_uri = False
+        authorization = PiecrustAuthorization()
+        cache = PiecrustLocalCache()
+        cache_responses = True
+        limit = 0
+        list_layout_param = 'layout'
+
+    def __init__(self, *args, **kwargs):
+        super(CachedPlanResource, self).__init__(*args, **kwargs)
+        self.names = ['foo', 'bar']
+        self.fetches = 0
+
+    def obj_get_list(self, request=None, **kwargs):
+        self.fetches += 1
+        return [PlanObject(name, i) for i, name in enumerate(self.names)]
+
+    def obj_delete_list(self, request=None, **kwargs):
+        self.names = []
+
+    def get_resource_list_uri(self):
+        return '/api/v1/cachedplan/'
+
+
+class ResponseCacheTestCase(TestCase):
+    def test_get_list(self):
+        import json
+        resource = CachedPlanResource()
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+        response = resource.dispatch('list', request)
+        self.assertEqual([obj['name'] for obj in json.loads(response.content)['objects']], [u'foo', u'bar'])
+        self.assertEqual(resource.fetches, 1)
+
+        cached = resource.dispatch('list', request)
+        self.assertEqual(resource.fetches, 1)
+        self.assertEqual(cached.status_code, 200)
+        self.assertEqual(cached.content, response.content)
+
+        # Anything the response varies by is a different entry.
+        request.GET = {'format': 'json', 'layout': 'columnar'}
+        self.assertTrue('rows' in json.loads(resource.dispatch('list', request).content))
+        request.GET = {'format': 'xml'}
+        self.assertTrue(resource.dispatch('list', request).content.startswith('<?xml'))
+        request.GET = {'format': 'json'}
+        request.META['REMOTE_ADDR'] = '10.0.0.1'
+        resource.dispatch('list', request)
+        self.assertEqual(resource.fetches, 4)
+
+        # A write moves on to a new generation.
+        generation = resource.get_response_generation()
+        request.method = 'DELETE'
+        self.assertEqual(resource.dispatch('list', request).status_code, 204)
+        self.assertNotEqual(resource.get_response_generation(), generation)
+
+        request.method = 'GET'
+        response = resource.dispatch('list', request)
+        self.assertEqual(json.loads(response.content)['objects'], [])
+        self.assertEqual(resource.fetches, 5)
+
+    def test_uncached(self):
+        resource = CachedPlanResource()
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+        resource._meta.cache_responses = False
+
+        try:
+            resource.dispatch('list', request)
+            resource.dispatch('list', request)
+        finally:
+            resource._meta.cache_responses = True
+
+        self.assertEqual(resource.fetches, 2)
+
+    def test_lookups(self):
+        resource = CachedPlanResource()
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+        original = resource._meta.cache
+        resource._meta.cache = CountingLocalCache()
+
+        try:
+            resource.dispatch('list', request)
+            resource.dispatch('list', request)
+            self.assertEqual(resource.fetches, 1)
+
+            # The tokens & the response come back in one lookup.
+            resource._meta.cache.lookups = 0
+            resource.dispatch('list', request)
+            self.assertEqual(resource._meta.cache.lookups, 1)
+
+            # As do the namespace & the objects.
+            resource.cached_obj_get_list()
+            resource._meta.cache.lookups = 0
+            resource.cached_obj_get_list()
+            self.assertEqual(resource._meta.cache.lookups, 1)
+            self.assertEqual(resource.fetches, 2)
+
+            # Invalidation by another instance (i.e. process) is still seen.
+            CachedPlanResource().invalidate_cached_responses()
+            resource.dispatch('list', request)
+            self.assertEqual(resource.fetches, 3)
+            CachedPlanResource().invalidate_cache()
+            resource.cached_obj_get_list()
+            self.assertEqual(resource.fetches, 4)
+        finally:
+            resource._meta.cache = original
+
+
+class PlanStorage(object):
+    def __init__(self, objects):
+        self.objects = objects
+
+    def list(self, pk__in):
+        return [obj for obj in self.objects if unicode(obj.pk) in pk__in]
+
+
+class MultiplePlanResource(PlanResource):
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'multipleplan'
+        include_resource_uri = False
+        cache = PiecrustLocalCache()
+
+
+class EvenAuthorization(PiecrustAuthorization):
+    def apply_limits(self, request, object_list):
+        return [obj for obj in object_list if obj.pk % 2 == 0]
+
+
+class LimitedPlanResource(MultiplePlanResource):
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'limitedplan'
+        include_resource_uri = False
+        cache = PiecrustLocalCache()
+        authorization = EvenAuthorization()
+
+
+class SoftDeletePlanResource(MultiplePlanResource):
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'softdeleteplan'
+        include_resource_uri = False
+        cache = PiecrustLocalCache()
+
+    def obj_get(self, request=None, **kwargs):
+        for obj in self._meta.storage.list(pk__in=[unicode(kwargs['pk'])]):
+            if not obj.name.startswith('deleted'):
+                return obj
+
+        raise PiecrustNotFound()
+
+
+class GetMultipleTestCase(TestCase):
+    def test_get_multiple(self):
+        import json
+        objects = []
+
+        for pk in range(5):
+            obj = PlanObject('item-%s' % pk, pk)
+            obj.pk = pk
+            objects.append(obj)
+
+        resource = MultiplePlanResource()
+        storage = PiecrustCountingStorage(PlanStorage(objects))
+        resource._meta.storage = storage
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+
+        try:
+            data = json.loads(resource.get_multiple(request, pk_list='1;3;9').content)
+            self.assertEqual([obj['name'] for obj in data['objects']], [u'item-1', u'item-3'])
+            self.assertEqual(data['not_found'], [u'9'])
+            self.assertEqual(storage.calls['list'], 1)
+
+            # The cached ones aren't fetched again.
+            data = json.loads(resource.get_multiple(request, pk_list='3;2;1').content)
+            self.assertEqual([obj['name'] for obj in data['objects']], [u'item-3', u'item-2', u'item-1'])
+            self.assertEqual(storage.calls['list'], 2)
+
+            data = json.loads(resource.get_multiple(request, pk_list='2;3').content)
+            self.assertEqual(len(data['objects']), 2)
+            self.assertEqual(storage.calls['list'], 2)
+        finally:
+            del resource._meta.storage
+
+    def test_authorization_limits(self):
+        import json
+        objects = []
+
+        for pk in range(4):
+            obj = PlanObject('item-%s' % pk, pk)
+            obj.pk = pk
+            objects.append(obj)
+
+        resource = LimitedPlanResource()
+        resource._meta.storage = PlanStorage(objects)
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+
+        try:
+            data = json.loads(resource.get_multiple(request, pk_list='1;2;3').content)
+        finally:
+            del resource._meta.storage
+
+        self.assertEqual([obj['name'] for obj in data['objects']], [u'item-2'])
+        self.assertEqual(sorted(data['not_found']), [u'1', u'3'])
+
+    def test_overridden_obj_get(self):
+        import json
+        objects = []
+
+        for pk, name in enumerate(['item-0', 'deleted-1', 'item-2']):
+            obj = PlanObject(name, pk)
+            obj.pk = pk
+            objects.append(obj)
+
+        resource = SoftDeletePlanResource()
+        storage = PiecrustCountingStorage(PlanStorage(objects))
+        resource._meta.storage = storage
+        request = MockRequest()
+        request.GET = {'format': 'json'}
+
+        try:
+            data = json.loads(resource.get_multiple(request, pk_list='0;1;2').content)
+        finally:
+            del resource._meta.storage
+
+        # Each goes through ``obj_get``.
+        self.assertEqual([obj['name'] for obj in data['objects']], [u'item-0', u'item-2'])
+        self.assertEqual(data['not_found'], [u'1'])
+        self.assertEqual(storage.calls['list'], 3)
+
+
+class CacheKeyTestCase(TestCase):
+    def test_generate_cache_key(self):
+        resource = MultiplePlanResource()
+        namespace = resource.get_cache_namespace()
+        self.assertEqual(resource.generate_cache_key('detail', pk=1, slug='foo'), 'None:multipleplan:v1:%s:detail:pk=1:slug=foo' % namespace)
+        self.assertEqual(resource.generate_cache_key('detail', slug='foo', pk=1), resource.generate_cache_key('detail', pk=1, slug='foo'))
+
+        # Separators & spaces are escaped.
+        self.assertEqual(resource.generate_cache_key('a:b', q=u'x=y z\xe9'), 'None:multipleplan:v1:%s:a%%3Ab:q=x%%3Dy%%20z%%C3%%A9' % namespace)
+        self.assertNotEqual(resource.generate_cache_key('a', b='c'), resource.generate_cache_key('a:b=c'))
+
+        # Long keys are hashed.
+        long_key = resource.generate_cache_key('list', q='x' * 500)
+        self.assertEqual(len(long_key), 250)
+        self.assertTrue(long_key.startswith('None:multipleplan:v1:'))
+        self.assertNotEqual(long_key, resource.generate_cache_key('list', q='x' * 501))
+
+    def test_invalidate_cache(self):
+        resource = MultiplePlanResource()
+        key = resource.generate_cache_key('detail', pk=1)
+        self.assertEqual(resource.generate_cache_key('detail', pk=1), key)
+
+        resource.invalidate_cache()
+        self.assertNotEqual(resource.generate_cache_key('detail', pk=1), key)
+
+        # Cached objects are no longer found.
+        resource._meta.cache.set(resource.generate_cache_key('detail', pk=1), 'cached')
+        self.assertEqual(resource.cached_obj_get(pk=1), 'cached')
+        resource.invalidate_cache()
+        self.assertRaises(NotImplementedError, resource.cached_obj_get, pk=1)
+
+    def test_no_cache(self):
+        # Without a cache, there's no token to store.
+        resource = PlanResource()
+        self.assertEqual(resource.get_cache_namespace(), '0')
+        self.assertEqual(resource.invalidate_cache(), '0')
+        self.assertEqual(resource.generate_cache_key('detail', pk=1), 'None:plan:v1:0:detail:pk=1')
+
+
+class WritePlanResource(PlanResource):
+    class Meta:
+        object_class = PlanObject
+        resource_name = 'writeplan'
+        include_resource_uri = False
+        authorization = PiecrustAuthorization()
+        cache = PiecrustLocalCache()
+
+    def __init__(self, *args, **kwargs):
+        super(WritePlanResource, self).__init__(*args, **kwargs)
+        self.store = {}
+        self.fetches = 0
+
+    def obj_get(self, request=None, **kwargs):
+        self.fetches += 1
+
+        try:
+            return self.store[int(kwargs['pk'])]
+        except KeyError:
+            raise PiecrustNotFound()
+
+    def obj_update(self, bundle, request=None, **kwargs):
+        bundle = self.full_hydrate(bundle)
+        bundle.obj.pk = int(kwargs['pk'])
+        self.store[bundle.obj.pk] = bundle.obj
+        return bundle
+
+    def obj_delete(self, request=None, **kwargs):
+        del self.store[int(kwargs['pk'])]
+
+    def obj_delete_list(self, request=None, **kwargs):
+        self.store.clear()
+
+
+class WriteInvalidationTestCase(TestCase):
+    def setUp(self):
+        super(WriteInvalidationTestCase, self).setUp()
+        self.resource = WritePlanResource()
+        self.resource._meta.cache.clear()
+        obj = PlanObject('foo', 1)
+        obj.pk = 1
+        self.resource.store[1] = obj
+
+    def put(self, pk, data):
+        request = MockRequest()
+        request.method = 'PUT'
+        request.raw_post_data = data
+        return self.resource.put_detail(request, pk=pk)
+
+    def test_put_detail(self):
+        self.assertEqual(self.resource.cached_obj_get(pk=1).name, 'foo')
+        self.assertEqual(self.resource.fetches, 1)
+
+        self.put('1', '{"name": "bar"}')
+        self.assertEqual(self.resource.cached_obj_get(pk=1).name, 'bar')
+        self.assertEqual(self.resource.fetches, 2)
+
+    def test_put_detail_write_through(self):
+        self.resource._meta.cache_write_through = True
+
+        try:
+            self.assertEqual(self.resource.cached_obj_get(pk=1).name, 'foo')
+            self.put('1', '{"name": "bar"}')
+            self.assertEqual(self.resource.cached_obj_get(pk=1).name, 'bar')
+            self.assertEqual(self.resource.cached_obj_get(pk='1').name, 'bar')
+            self.assertEqual(self.resource.fetches, 1)
+        finally:
+            self.resource._meta.cache_write_through = False
+
+    def test_delete_detail(self):
+        self.resource.cached_obj_get(pk=1)
+        request = MockRequest()
+        request.method = 'DELETE'
+        self.assertEqual(self.resource.delete_detail(request, pk='1').status_code, 204)
+        self.assertRaises(PiecrustNotFound, self.resource.cached_obj_get, pk=1)
+
+        # Deleting by anything else drops the ``pk`` entries too.
+        self.resource.store[2] = PlanObject('bar', 2)
+        self.resource.cached_obj_get(pk=2)
+        self.resource.obj_delete = lambda request=None, **kwargs: self.resource.store.clear()
+        self.assertEqual(self.resource.delete_detail(request, slug='bar').status_code, 204)
+        self.assertRaises(PiecrustNotFound, self.resource.cached_obj_get, pk=2)
+
+    def test_delete_list(self):
+        self.resource.cached_obj_get(pk=1)
+        namespace = self.resource.get_cache_namespace()
+        request = MockRequest()
+        request.method = 'DELETE'
+        self.assertEqual(self.resource.delete_list(request).status_code, 204)
+        self.assertNotEqual(self.resource.get_cache_namespace(), namespace)
+        self.assertRaises(PiecrustNotFound, self.resource.cached_obj_get, pk=1)
+
+    def test_update_cached_objs(self):
+        resource = self.resource
+        resource._meta.cache.set_many({
+            resource.generate_cache_key('detail', pk=1): 'one',
+            resource.generate_cache_key('detail', pk=2): 'two',
+        })
+        resource.update_cached_objs(written=[({'pk': 1}, 'new'), (None, 'skipped')], removed=[{'pk': 2}])
+        self.assertEqual(resource._meta.cache.get(resource.generate_cache_key('detail', pk=1)), None)
+        self.assertEqual(resource._meta.cache.get(resource.generate_cache_key('detail', pk=2)), None)
+
+        resource._meta.cache_write_through = True
+
+        try:
+            resource.update_cached_objs(written=[({'pk': 1}, 'new')])
+            self.assertEqual(resource._meta.cache.get(resource.generate_cache_key('detail', pk=1)), 'new')
+        finally:
+            resource._meta.cache_write_through = False
+
+        self.assertEqual(resource.get_cache_lookup(PlanObject('foo')), None)
+        self.assertEqual(resource.get_cache_lookup(resource.build_bundle(obj=resource.store[1], request=RequestWrapper(MockRequest()))), {'pk': 1})
@@ -6,6 +6,12 @@ from django.test import TestCase
 from tastypie import fields
 from tastypie.serializers import Serializer
 from tastypie.resources import ModelResource
+from piecrust.bundle import Bundle as PiecrustBundle
+from piecrust.exceptions import ImproperlyConfigured as PiecrustImproperlyConfigured, UnsupportedFormat
+from piecrust.http import RequestWrapper
+from piecrust import serializers as piecrust_serializers
+from piecrust.serializers import Serializer as PiecrustSerializer
+from core.tests.mocks import MockRequest
 from core.models import Note
 
 
@@ -379,4 +385,435 @@ class ContentHeaderTest(TestCase):
         serializer = StubbedSerializer()
         serializer.deserialize('', 'text/html; charset=UTF-8')
         self.assertTrue(serializer.from_html_called)
-        
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Point3D(Point):
+    pass
+
+
+class ToSimpleTestCase(TestCase):
+    def test_to_simple(self):
+        serializer = PiecrustSerializer()
+        bundle = PiecrustBundle(data={
+            'name': 'daniel',
+            'count': 3,
+            'rating': 4.5,
+            'is_active': True,
+            'nothing': None,
+            'created': datetime.datetime(2010, 12, 16, 3, 2, 14),
+            'tags': ('a', u'b'),
+            'nested': {'when': datetime.date(2010, 12, 16), 'price': Decimal('1.50')},
+        }, request=RequestWrapper(None))
+        self.assertEqual(serializer.to_simple([bundle], {}), [{
+            'name': u'daniel',
+            'count': 3,
+            'rating': 4.5,
+            'is_active': True,
+            'nothing': None,
+            'created': '2010-12-16T03:02:14',
+            'tags': [u'a', u'b'],
+            'nested': {'when': '2010-12-16', 'price': u'1.50'},
+        }])
+
+    def test_register(self):
+        serializer = PiecrustSerializer()
+        self.assertRaises(TypeError, serializer.to_simple, Point3D(1, 2), {})
+
+        serializer.register(Point, lambda data, options: [data.x, data.y])
+        self.assertEqual(serializer.to_simple({'point': Point(1, 2)}, {}), {'point': [1, 2]})
+        # Subclasses are found via the MRO.
+        self.assertEqual(serializer.to_simple([Point3D(3, 4)], {}), [[3, 4]])
+        # Other serializers are unaffected.
+        self.assertRaises(TypeError, PiecrustSerializer().to_simple, Point(1, 2), {})
+
+    def test_overridden_to_simple(self):
+        import json
+
+        class SetSerializer(PiecrustSerializer):
+            def to_simple(self, data, options):
+                if isinstance(data, set):
+                    return sorted(data)
+
+                return super(SetSerializer, self).to_simple(data, options)
+
+        serializer = SetSerializer()
+        bundle = PiecrustBundle(data={'tags': set(['b', 'a'])}, request=RequestWrapper(None))
+        # Nested data goes through the override too.
+        self.assertEqual(serializer.to_simple({'a': set([2, 1]), 'b': [set([3])], 'c': bundle}, {}), {'a': [1, 2], 'b': [[3]], 'c': {'tags': ['a', 'b']}})
+        self.assertEqual(json.loads(serializer.to_json({'a': set([1, 2])})), {'a': [1, 2]})
+
+
+
+class IterJSONTestCase(TestCase):
+    def setUp(self):
+        request = RequestWrapper(None)
+        self.data = {
+            'meta': {'limit': 20, 'offset': 0, 1: None},
+            'objects': [PiecrustBundle(data={
+                'name': 'daniel',
+                'title': u'Caf\xe9 "quoted"',
+                'rating': 4.5,
+                'count': 3L,
+                'is_active': False,
+                'created': datetime.datetime(2010, 12, 16, 3, 2, 14),
+                'price': Decimal('1.50'),
+                'tags': ('a', u'b'),
+                'author': PiecrustBundle(data={'name': 'cody', 'id': 2}, request=request),
+            }, request=request) for i in range(3)],
+        }
+
+    def test_to_json(self):
+        import json
+        serializer = PiecrustSerializer()
+        expected = json.dumps(serializer.to_simple(self.data, {}), sort_keys=True)
+        self.assertEqual(serializer.to_json(self.data), expected)
+        self.assertEqual(serializer.to_json(self.data['objects'][0]), json.dumps(serializer.to_simple(self.data['objects'][0], {}), sort_keys=True))
+        self.assertEqual(serializer.to_json(None), 'null')
+        self.assertEqual(serializer.to_json([]), '[]')
+        self.assertEqual(serializer.to_json({}), '{}')
+
+    def test_iter_json(self):
+        serializer = PiecrustSerializer()
+        chunks = list(serializer.iter_json(self.data))
+        # One chunk per object in the list.
+        self.assertEqual(len([chunk for chunk in chunks if '"daniel"' in chunk]), 3)
+        self.assertEqual(''.join(chunks), serializer.to_json(self.data))
+
+    def test_sort_keys(self):
+        import json
+        serializer = PiecrustSerializer(sort_keys=False)
+        output = serializer.to_json(self.data)
+        self.assertEqual(json.loads(output), json.loads(PiecrustSerializer().to_json(self.data)))
+
+    def test_register(self):
+        serializer = PiecrustSerializer()
+        serializer.register(int, lambda data, options: data * 2)
+        self.assertEqual(serializer.to_json({'count': 2}), '{"count": 4}')
+
+
+class SerializeIterTestCase(TestCase):
+    def setUp(self):
+        request = RequestWrapper(None)
+        self.objects = [PiecrustBundle(data={'name': 'daniel', 'id': i}, request=request) for i in range(3)]
+        self.meta = {'limit': 20, 'offset': 0}
+
+    def get_data(self):
+        return {'meta': self.meta, 'objects': (bundle for bundle in self.objects)}
+
+    def test_serialize_iter(self):
+        serializer = PiecrustSerializer()
+        expected = serializer.serialize({'meta': self.meta, 'objects': self.objects}, 'application/json')
+        self.assertEqual(''.join(serializer.serialize_iter(self.get_data(), 'application/json')), expected)
+
+        expected = serializer.serialize({'meta': self.meta, 'objects': self.objects}, 'text/javascript', {'callback': 'cb'})
+        self.assertEqual(''.join(serializer.serialize_iter(self.get_data(), 'text/javascript', {'callback': 'cb'})), expected)
+
+        # Formats without an ``iter_*`` method still handle generators.
+        self.assertEqual(list(serializer.serialize_iter(self.get_data(), 'text/html')), [serializer.to_html(None)])
+        self.assertEqual(serializer.to_simple(self.get_data(), {})['objects'][2], {'name': u'daniel', 'id': 2})
+
+    def test_iter_xml(self):
+        serializer = PiecrustSerializer()
+        chunks = list(serializer.iter_xml(self.get_data()))
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(serializer.from_xml(''.join(chunks)), serializer.from_xml(serializer.to_xml({'meta': self.meta, 'objects': self.objects})))
+
+
+class JSONBackendTestCase(TestCase):
+    def test_get_json_backend_class(self):
+        self.assertTrue(piecrust_serializers.get_json_backend_class() in piecrust_serializers.JSON_BACKENDS)
+        self.assertEqual(piecrust_serializers.get_json_backend_class((piecrust_serializers.StdlibJSONBackend,)), piecrust_serializers.StdlibJSONBackend)
+        self.assertRaises(PiecrustImproperlyConfigured, piecrust_serializers.get_json_backend_class, ())
+
+    def test_backends(self):
+        data = {
+            'name': u'Caf\xe9',
+            'count': 3,
+            'rating': 4.5,
+            'tags': [u'a', None, True],
+        }
+        available = [backend_class for backend_class in (piecrust_serializers.StdlibJSONBackend, piecrust_serializers.SimpleJSONBackend, piecrust_serializers.UJSONBackend) if backend_class.is_available()]
+        self.assertTrue(piecrust_serializers.StdlibJSONBackend in available)
+
+        for backend_class in available:
+            serializer = PiecrustSerializer(json_backend_class=backend_class)
+            self.assertTrue(isinstance(serializer.json_backend, backend_class))
+            self.assertEqual(serializer.from_json(serializer.to_json(data)), data)
+
+        backend = piecrust_serializers.StdlibJSONBackend()
+        self.assertEqual(backend.dumps({'b': datetime.date(2010, 12, 16), 'a': Decimal('1.50')}), '{"a": "1.50", "b": "2010-12-16"}')
+        self.assertRaises(TypeError, backend.dumps, object())
+
+
+class FormatIndexTestCase(TestCase):
+    def test_build_format_index(self):
+        serializer = PiecrustSerializer(formats=['json', 'xml'])
+        self.assertEqual(serializer.supported_formats, ['application/json', 'application/xml'])
+        self.assertEqual(serializer.best_match_formats, ['application/xml', 'application/json'])
+        self.assertEqual(serializer.mimes_by_format, {'json': 'application/json', 'xml': 'application/xml'})
+        self.assertEqual(serializer.serializers_by_mime['application/json'], serializer.to_json)
+        self.assertEqual(serializer.deserializers_by_mime['text/yaml'], serializer.from_yaml)
+        self.assertEqual(serializer.stream_serializers_by_mime['text/javascript'], serializer.iter_jsonp)
+        self.assertFalse('text/yaml' in serializer.stream_serializers_by_mime)
+
+        # Reassigning rebuilds it.
+        serializer.formats = ['json']
+        serializer.content_types = {'json': 'text/json'}
+        self.assertEqual(serializer.supported_formats, ['text/json'])
+        self.assertEqual(serializer.serialize({'a': 1}, 'text/json'), '{"a": 1}')
+        self.assertRaises(UnsupportedFormat, serializer.serialize, {'a': 1}, 'application/json')
+        self.assertRaises(UnsupportedFormat, serializer.deserialize, '{}', 'application/json')
+        self.assertEqual(serializer.deserialize('{"a": 1}', 'text/json; charset=UTF-8'), {'a': 1})
+
+        self.assertRaises(PiecrustImproperlyConfigured, setattr, serializer, 'formats', ['json', 'xml'])
+
+
+class IterXMLTestCase(TestCase):
+    def setUp(self):
+        request = RequestWrapper(None)
+        self.data = {
+            'meta': {'limit': 20, 'offset': 0, 'previous': None},
+            'objects': [PiecrustBundle(data={
+                'name': u'Caf\xe9 <&>',
+                'count': i,
+                'rating': 4.5,
+                'is_active': False,
+                'created': datetime.datetime(2010, 12, 16, 3, 2, 14),
+                'tags': [u'a', u'b'],
+                'extra': {'price': Decimal('1.50'), 'empty': None},
+                'author': PiecrustBundle(data={'name': 'cody'}, request=request),
+            }, request=request) for i in range(3)],
+        }
+
+    def assertSameXML(self, data):
+        from lxml import etree
+        serializer = PiecrustSerializer()
+        expected = etree.tostring(serializer.to_etree(data, {}))
+        self.assertEqual(etree.tostring(etree.fromstring(serializer.to_xml(data))), expected)
+
+    def test_to_xml(self):
+        self.assertSameXML(self.data)
+        self.assertSameXML(self.data['objects'])
+        self.assertSameXML(self.data['objects'][0])
+        self.assertSameXML({'meta': {}, 'objects': []})
+
+    def test_iter_xml(self):
+        serializer = PiecrustSerializer()
+        chunks = list(serializer.iter_xml(self.data))
+        self.assertEqual(len(chunks), 4)
+        self.assertTrue(chunks[0].startswith("<?xml version='1.0' encoding='utf-8'?>"))
+        self.assertEqual(serializer.from_xml(''.join(chunks)), serializer.from_xml(serializer.to_xml(self.data)))
+
+    def test_empty_elements(self):
+        from lxml import etree
+        serializer = PiecrustSerializer()
+        request = RequestWrapper(None)
+
+        # Byte for byte the same, empty & null elements included.
+        for data in ({'meta': {}, 'objects': [], 'next': None}, {'objects': [{'tags': [], 'extra': {}, 'empty': None, 'blank': ''}, PiecrustBundle(data={}, request=request)]}, {}, []):
+            expected = etree.tostring(serializer.to_etree(data, {}), xml_declaration=True, encoding='utf-8')
+            self.assertEqual(''.join(serializer.iter_xml(data)), expected)
+            self.assertEqual(serializer.to_xml(data), expected)
+
+
+class XMLStreamTestCase(TestCase):
+    def test_from_xml_stream(self):
+        serializer = PiecrustSerializer()
+        content = """<?xml version='1.0' encoding='utf-8'?>
+<request>
+  <meta type="hash"><limit type="integer">2</limit></meta>
+  <objects type="list">
+    <object><name>daniel</name><count type="integer">1</count></object>
+    <object><name>cody</name><tags type="list"><value>a</value></tags></object>
+  </objects>
+  <deleted_objects type="list"><value>/api/v1/notes/1/</value></deleted_objects>
+</request>"""
+        data = serializer.deserialize_stream(content, 'application/xml; charset=UTF-8')
+        self.assertEqual(data['meta'], {'limit': 2})
+        # Not parsed yet.
+        self.assertFalse('deleted_objects' in data)
+
+        objects = data['objects']
+        self.assertFalse(isinstance(objects, list))
+        self.assertEqual(objects.next(), {'name': 'daniel', 'count': 1})
+        self.assertEqual(objects.next(), {'name': 'cody', 'tags': ['a']})
+        self.assertRaises(StopIteration, objects.next)
+        self.assertEqual(data['deleted_objects'], ['/api/v1/notes/1/'])
+
+    def test_from_xml_stream_list(self):
+        from StringIO import StringIO
+        serializer = PiecrustSerializer()
+        data = serializer.deserialize_stream(StringIO('<objects><object><name>daniel</name></object></objects>'), 'application/xml')
+        self.assertEqual(list(data['objects']), [{'name': 'daniel'}])
+
+        # No ``objects`` means no key.
+        data = serializer.deserialize_stream('<request><meta type="hash"></meta></request>', 'application/xml')
+        self.assertEqual(data, {'meta': {}})
+
+    def test_deserialize_stream_fallback(self):
+        serializer = PiecrustSerializer()
+        self.assertEqual(serializer.deserialize_stream('<p>Hi</p>', 'text/html'), None)
+
+
+class JSONStreamTestCase(TestCase):
+    def test_from_json_stream(self):
+        from StringIO import StringIO
+        content = '{"meta": {"limit": 2}, "objects": [{"name": "daniel", "count": 1}, {"name": "caf\\u00e9", "tags": ["a", 12345]}] , "deleted_objects": ["/api/v1/notes/1/"]}'
+
+        for chunk_size in (1, 7, 64 * 1024):
+            serializer = PiecrustSerializer()
+            reader = piecrust_serializers.JSONStreamReader(StringIO(content), serializer.json_backend, chunk_size=chunk_size)
+            data = serializer.build_stream({}, serializer.iter_json_stream(reader, {}))
+            self.assertEqual(list(data['objects']), [{'name': 'daniel', 'count': 1}, {'name': u'caf\xe9', 'tags': ['a', 12345]}])
+
+        serializer = PiecrustSerializer()
+        data = serializer.deserialize_stream(content, 'application/json; charset=UTF-8')
+        self.assertEqual(data['meta'], {'limit': 2})
+        # Not parsed yet.
+        self.assertFalse('deleted_objects' in data)
+
+        objects = data['objects']
+        self.assertFalse(isinstance(objects, list))
+        self.assertEqual(objects.next(), {'name': 'daniel', 'count': 1})
+        self.assertEqual(objects.next(), {'name': u'caf\xe9', 'tags': ['a', 12345]})
+        self.assertRaises(StopIteration, objects.next)
+        self.assertEqual(data['deleted_objects'], ['/api/v1/notes/1/'])
+
+    def test_from_json_stream_edge_cases(self):
+        serializer = PiecrustSerializer()
+        self.assertEqual(list(serializer.deserialize_stream('[1, 2, 3]', 'application/json')['objects']), [1, 2, 3])
+        self.assertEqual(list(serializer.deserialize_stream('{"objects": []}', 'application/json')['objects']), [])
+        # No ``objects`` means no key.
+        self.assertEqual(serializer.deserialize_stream('{}', 'application/json'), {})
+        self.assertEqual(serializer.deserialize_stream(' {"meta": null} ', 'application/json'), {'meta': None})
+
+        data = serializer.deserialize_stream('{"objects": [{"name": "daniel"}, {"name": ', 'application/json')
+        objects = data['objects']
+        self.assertEqual(objects.next(), {'name': 'daniel'})
+        self.assertRaises(ValueError, objects.next)
+
+    def test_from_json_stream_trailing_data(self):
+        serializer = PiecrustSerializer()
+        self.assertEqual(list(serializer.deserialize_stream('{"objects": [1]} \n', 'application/json')['objects']), [1])
+
+        # Like ``json.loads``, anything else after the value is rejected.
+        objects = serializer.deserialize_stream('{"objects": [1]} garbage', 'application/json')['objects']
+        self.assertEqual(objects.next(), 1)
+        self.assertRaises(ValueError, objects.next)
+        self.assertRaises(ValueError, list, serializer.deserialize_stream('[1] [2]', 'application/json')['objects'])
+        self.assertRaises(ValueError, serializer.deserialize_stream, '{"meta": null}}', 'application/json')
+        self.assertRaises(ValueError, serializer.deserialize_stream, '{} {}', 'application/json')
+
+    def test_from_json_stream_malformed(self):
+        from StringIO import StringIO
+        serializer = PiecrustSerializer()
+        tail = ', '.join(['{"name": "x"}'] * 1000) + ']}'
+
+        # Errors surface without reading (& holding onto) the rest.
+        for bad in ('{"name": nope}', '{"name": "x"]', '{"name": "a\\"b\\\\", "x": }'):
+            source = StringIO('{"objects": [{"name": "daniel"}, %s, %s' % (bad, tail))
+            reader = piecrust_serializers.JSONStreamReader(source, serializer.json_backend, chunk_size=16)
+            objects = serializer.build_stream({}, serializer.iter_json_stream(reader, {}))['objects']
+            self.assertEqual(objects.next(), {'name': 'daniel'})
+            self.assertRaises(ValueError, objects.next)
+            self.assertTrue(source.tell() < 100)
+
+        # Values split across many chunks are fine.
+        content = '{"objects": [{"name": "%s", "tags": [[1], {"a": "]\\\\"}]}, 12345]}' % ('x' * 500)
+        reader = piecrust_serializers.JSONStreamReader(StringIO(content), serializer.json_backend, chunk_size=3)
+        objects = list(serializer.build_stream({}, serializer.iter_json_stream(reader, {}))['objects'])
+        self.assertEqual(objects, [{'name': 'x' * 500, 'tags': [[1], {'a': ']\\'}]}, 12345])
+
+
+class MsgpackTestCase(TestCase):
+    def setUp(self):
+        request = RequestWrapper(None)
+        self.data = {
+            'meta': {'limit': 20, 'next': None},
+            'objects': [PiecrustBundle(data={
+                'name': u'Caf\xe9',
+                'slug': 'cafe',
+                'count': -3,
+                'big': 2 ** 40,
+                'rating': 4.5,
+                'is_active': True,
+                'created': datetime.datetime(2010, 12, 16, 3, 2, 14, 123),
+                'published': datetime.date(2010, 12, 16),
+                'at': datetime.time(3, 2, 14),
+                'price': Decimal('1.50'),
+                'tags': ('a', u'b'),
+            }, request=request)],
+        }
+        self.expected = {
+            'meta': {'limit': 20, 'next': None},
+            'objects': [{
+                'name': u'Caf\xe9',
+                'slug': u'cafe',
+                'count': -3,
+                'big': 2 ** 40,
+                'rating': 4.5,
+                'is_active': True,
+                'created': datetime.datetime(2010, 12, 16, 3, 2, 14, 123),
+                'published': datetime.date(2010, 12, 16),
+                'at': datetime.time(3, 2, 14),
+                'price': Decimal('1.50'),
+                'tags': [u'a', u'b'],
+            }],
+        }
+
+    def test_round_trip(self):
+        serializer = PiecrustSerializer()
+        content = serializer.serialize(self.data, 'application/x-msgpack')
+        self.assertEqual(serializer.deserialize(content, 'application/x-msgpack'), self.expected)
+
+    def test_pure_python(self):
+        serializer = PiecrustSerializer()
+        msgpack = piecrust_serializers.msgpack
+        piecrust_serializers.msgpack = None
+
+        try:
+            content = serializer.to_msgpack(self.data)
+            self.assertEqual(serializer.from_msgpack(content), self.expected)
+        finally:
+            piecrust_serializers.msgpack = msgpack
+
+        if msgpack is not None:
+            # Interoperable with the ``msgpack`` package.
+            self.assertEqual(serializer.from_msgpack(content), self.expected)
+            self.assertEqual(len(content), len(serializer.to_msgpack(self.data)))
+
+    def test_pure_python_subclasses(self):
+        from piecrust.utils.packing import Packer, Unpacker
+
+        class SafeText(unicode):
+            pass
+
+        class Count(int):
+            pass
+
+        serializer = PiecrustSerializer()
+        msgpack = piecrust_serializers.msgpack
+        piecrust_serializers.msgpack = None
+
+        try:
+            content = serializer.to_msgpack({'name': SafeText(u'caf\xe9'), 'count': Count(3)})
+        finally:
+            piecrust_serializers.msgpack = msgpack
+
+        self.assertEqual(serializer.from_msgpack(content), {'name': u'caf\xe9', 'count': 3})
+
+        # A ``default`` handing back the same thing doesn't recurse forever.
+        self.assertRaises(TypeError, Packer(default=lambda data: data).packb, object())
+        self.assertEqual(Unpacker().unpackb(Packer().packb([SafeText(u'a')])), [u'a'])
+
+    def test_determine_format(self):
+        from piecrust.utils.mime import determine_format
+        request = MockRequest()
+        request.META = {'HTTP_ACCEPT': 'application/x-msgpack'}
+        self.assertEqual(determine_format(request, PiecrustSerializer()), 'application/x-msgpack')
@@ -3,6 +3,8 @@ from django.core.cache import cache
 from django.test import TestCase
 from tastypie.models import ApiAccess
 from tastypie.throttle import BaseThrottle, CacheThrottle, CacheDBThrottle
+from piecrust.cache import LocalCache as PiecrustLocalCache
+from piecrust.throttle import FixedWindowThrottle as PiecrustFixedWindowThrottle, SlidingWindowThrottle as PiecrustSlidingWindowThrottle, TokenBucketThrottle as PiecrustTokenBucketThrottle
 
 
 class NoThrottleTestCase(TestCase):
@@ -129,3 +131,83 @@ class CacheDBThrottleTestCase(TestCase):
         self.assertEqual(len(cache.get('daniel_accesses')), 0)
         self.assertEqual(ApiAccess.objects.count(), 7)
         self.assertEqual(ApiAccess.objects.filter(identifier='daniel').count(), 4)
+
+
+class PiecrustThrottleTestCase(TestCase):
+    def build(self, throttle_class, **kwargs):
+        throttle = throttle_class(throttle_at=2, timeframe=10, cache=PiecrustLocalCache(), **kwargs)
+        throttle.now = 1000.0
+        throttle.get_time = lambda: throttle.now
+        return throttle
+
+    def access(self, throttle, identifier):
+        throttled = throttle.should_be_throttled(identifier)
+
+        if not throttled:
+            throttle.accessed(identifier)
+
+        return throttled
+
+    def test_fixed_window(self):
+        throttle = self.build(PiecrustFixedWindowThrottle)
+        self.assertEqual([self.access(throttle, 'daniel') for i in range(3)], [False, False, True])
+        self.assertEqual(self.access(throttle, 'cody'), False)
+        self.assertEqual(throttle.cache.get('daniel_accesses:100'), 2)
+
+        # The next window starts from scratch.
+        throttle.now = 1010.0
+        self.assertEqual([self.access(throttle, 'daniel') for i in range(3)], [False, False, True])
+
+    def test_sliding_window(self):
+        throttle = self.build(PiecrustSlidingWindowThrottle)
+        throttle.now = 1008.0
+        self.assertEqual([self.access(throttle, 'daniel') for i in range(3)], [False, False, True])
+
+        # The previous window's 2 still count for 80%, then 30%.
+        throttle.now = 1012.0
+        self.assertEqual(throttle.get_accesses('daniel', throttle.now), 1.6)
+        self.assertEqual(self.access(throttle, 'daniel'), False)
+        self.assertEqual(self.access(throttle, 'daniel'), True)
+
+        throttle.now = 1017.0
+        self.assertAlmostEqual(throttle.get_accesses('daniel', throttle.now), 1.6)
+        self.assertEqual(self.access(throttle, 'daniel'), False)
+        self.assertEqual(self.access(throttle, 'daniel'), True)
+
+        # Two windows later, all is forgotten.
+        throttle.now = 1030.0
+        self.assertEqual(throttle.get_accesses('daniel', throttle.now), 0)
+
+    def test_token_bucket(self):
+        throttle = self.build(PiecrustTokenBucketThrottle)
+        self.assertEqual([self.access(throttle, 'daniel') for i in range(3)], [False, False, True])
+        self.assertEqual(self.access(throttle, 'cody'), False)
+
+        # A token every 5 seconds.
+        throttle.now = 1004.0
+        self.assertEqual(self.access(throttle, 'daniel'), True)
+        throttle.now = 1005.0
+        self.assertEqual(self.access(throttle, 'daniel'), False)
+        self.assertEqual(self.access(throttle, 'daniel'), True)
+
+        # Never more than ``throttle_at`` saved up.
+        throttle.now = 2000.0
+        self.assertEqual(throttle.get_tokens('daniel', throttle.now), 2.0)
+
+    def test_expiration(self):
+        throttle = self.build(PiecrustSlidingWindowThrottle, expiration=5)
+        self.assertEqual(throttle.get_timeout(20), 5)
+        self.assertEqual(throttle.get_timeout(0.2), 1)
+
+    def test_default_cache(self):
+        # Other identifiers can't push one off its throttle.
+        for throttle_class in (PiecrustFixedWindowThrottle, PiecrustSlidingWindowThrottle, PiecrustTokenBucketThrottle):
+            throttle = throttle_class(throttle_at=2, timeframe=10)
+            throttle.accessed('victim')
+            throttle.accessed('victim')
+            self.assertEqual(throttle.should_be_throttled('victim'), True)
+
+            for i in range(1500):
+                throttle.accessed('other-%s' % i)
+
+            self.assertEqual(throttle.should_be_throttled('victim'), True)
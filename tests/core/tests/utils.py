@@ -1,7 +1,14 @@
+import datetime
+from decimal import Decimal
 from django.http import HttpRequest
 from django.test import TestCase
 from tastypie.serializers import Serializer
 from tastypie.utils.mime import determine_format, build_content_type
+from piecrust.serializers import Serializer as PiecrustSerializer
+from piecrust.utils import mime as piecrust_mime
+from piecrust.utils.lru import LRUCache
+from piecrust.utils import packing
+from core.tests.mocks import MockRequest
 
 
 class MimeTestCase(TestCase):
@@ -69,3 +76,151 @@ class MimeTestCase(TestCase):
         
         request.META = {'HTTP_ACCEPT': 'text/javascript,application/json'}
         self.assertEqual(determine_format(request, serializer), 'application/json')
+
+
+class PiecrustMimeTestCase(TestCase):
+    def test_determine_format(self):
+        serializer = PiecrustSerializer()
+        request = MockRequest()
+
+        # Default.
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/json')
+
+        request.GET = {'format': 'xml'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/xml')
+
+        request.GET = {'format': 'foo'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/json')
+
+        request.GET = {'callback': 'cb'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'text/javascript')
+
+        request.GET = {}
+        request.META = {'HTTP_ACCEPT': 'text/plain,application/xml,application/json;q=0.9,*/*;q=0.8'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/xml')
+
+        request.META = {'HTTP_ACCEPT': 'text/javascript,application/json'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/json')
+
+        # Picks up changes to the formats.
+        serializer.formats = ['xml']
+        request.META = {'HTTP_ACCEPT': 'application/json'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/json')
+        request.META = {'HTTP_ACCEPT': 'application/json,application/xml;q=0.9'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/xml')
+
+    def test_format_cache(self):
+        serializer = PiecrustSerializer()
+        request = MockRequest()
+        request.META = {'HTTP_ACCEPT': 'application/xml,application/json;q=0.9'}
+        piecrust_mime.format_cache.clear()
+
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/xml')
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/xml')
+        self.assertEqual((piecrust_mime.format_cache.hits, piecrust_mime.format_cache.misses), (1, 1))
+
+        # Keyed on the parameters too.
+        request.GET = {'format': 'json'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/json')
+        request.GET = {'callback': 'cb'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'text/javascript')
+        self.assertEqual(piecrust_mime.determine_format(request, serializer, default_format='application/xml'), 'text/javascript')
+        self.assertEqual((piecrust_mime.format_cache.hits, piecrust_mime.format_cache.misses), (1, 4))
+
+    def test_custom_serializer(self):
+        # Not a ``Serializer`` subclass, so it isn't cached.
+        class CustomSerializer(object):
+            formats = ['json', 'xml']
+            supported_formats = ['application/json', 'application/xml']
+
+            def get_mime_for_format(self, format):
+                return 'application/%s' % format
+
+        serializer = CustomSerializer()
+        request = MockRequest()
+        piecrust_mime.format_cache.clear()
+
+        request.GET = {'format': 'xml'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/xml')
+        request.GET = {}
+        request.META = {'HTTP_ACCEPT': 'application/xml,application/json;q=0.9'}
+        self.assertEqual(piecrust_mime.determine_format(request, serializer), 'application/xml')
+        self.assertEqual(len(piecrust_mime.format_cache), 0)
+
+
+class LRUCacheTestCase(TestCase):
+    def test_lru(self):
+        cache = LRUCache(max_size=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+
+        # ``b`` is the least recently used, so gets evicted.
+        cache.set('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('b', 'nope'), 'nope')
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual((cache.hits, cache.misses), (3, 2))
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+
+class PackingTestCase(TestCase):
+    def assertRoundTrip(self, value, expected=None):
+        content = packing.Packer().packb(value)
+        self.assertEqual(packing.Unpacker().unpackb(content), value if expected is None else expected)
+        return content
+
+    def test_scalars(self):
+        self.assertEqual(self.assertRoundTrip(None), '\xc0')
+        self.assertEqual(self.assertRoundTrip(True), '\xc3')
+        self.assertEqual(self.assertRoundTrip(5), '\x05')
+        self.assertEqual(self.assertRoundTrip(-1), '\xff')
+
+        for value in (127, 128, 255, 256, 65535, 65536, 2 ** 32, 2 ** 64 - 1, -33, -129, -32769, -2 ** 31 - 1, -2 ** 63, 1.5, -0.25):
+            self.assertRoundTrip(value)
+
+        self.assertRaises(OverflowError, packing.Packer().packb, 2 ** 64)
+
+    def test_strings(self):
+        for length in (0, 31, 32, 255, 256, 65536):
+            self.assertRoundTrip(u'x' * length)
+
+        self.assertRoundTrip('caf\xc3\xa9', u'caf\xe9')
+
+    def test_containers(self):
+        self.assertRoundTrip([1, [2, 3], {'a': None}], [1, [2, 3], {u'a': None}])
+        self.assertRoundTrip(range(16))
+        self.assertRoundTrip(range(70000))
+        self.assertRoundTrip(dict((i, i) for i in range(16)))
+        self.assertRoundTrip((1, 2), [1, 2])
+
+    def test_ext(self):
+        tz = packing.FixedOffset(-330)
+        self.assertRoundTrip(datetime.datetime(2010, 12, 16, 3, 2, 14, 999999))
+        self.assertRoundTrip(datetime.date(2010, 12, 16))
+        self.assertRoundTrip(datetime.time(3, 2, 14))
+        self.assertRoundTrip(Decimal('-1.5E+10'))
+
+        aware = packing.Unpacker().unpackb(packing.Packer().packb(datetime.datetime(2010, 12, 16, 3, 2, 14, tzinfo=tz)))
+        self.assertEqual(aware, datetime.datetime(2010, 12, 16, 3, 2, 14, tzinfo=tz))
+        self.assertEqual(aware.utcoffset(), datetime.timedelta(minutes=-330))
+        aware = packing.Unpacker().unpackb(packing.Packer().packb(datetime.time(3, 2, 14, tzinfo=tz)))
+        self.assertEqual(aware.utcoffset(), datetime.timedelta(minutes=-330))
+
+        # Unknown extension types are passed through.
+        self.assertEqual(packing.Unpacker().unpackb('\xd4\x7f\x01'), (127, '\x01'))
+
+    def test_default(self):
+        self.assertRaises(TypeError, packing.Packer().packb, object())
+        self.assertEqual(packing.Unpacker().unpackb(packing.Packer(default=lambda obj: 'obj').packb([object()])), [u'obj'])
+
+    def test_errors(self):
+        self.assertRaises(ValueError, packing.Unpacker().unpackb, '\x92\x01')
+        self.assertRaises(ValueError, packing.Unpacker().unpackb, '\x01\x01')
+        self.assertRaises(ValueError, packing.Unpacker().unpackb, '\xc1')
+